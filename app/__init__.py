@@ -1,4 +1,5 @@
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate, upgrade, stamp
 from dotenv import load_dotenv
@@ -7,6 +8,8 @@ import logging
 import subprocess
 from sqlalchemy import inspect
 
+from app.storage import database_url, engine_options, configure_engine, sqlite_config
+
 load_dotenv()
 
 db = SQLAlchemy()
@@ -31,10 +34,22 @@ def create_app():
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///mempush.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+    app.config.update(sqlite_config())
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['ONION_URL'] = os.getenv('ONION_URL', 'your-onion-url')
     app.config['VERSION'] = get_app_version()
+    app.config['BATCH_MAX_ITEMS'] = int(os.getenv('BATCH_MAX_ITEMS', '1000'))
+    app.config['BATCH_PARSE_WORKERS'] = int(os.getenv('BATCH_PARSE_WORKERS', '0')) or None
+    app.config['PUSH_MODE'] = os.getenv('PUSH_MODE', 'inline')
+    app.config['STATS_COUNTERS'] = os.getenv('STATS_COUNTERS', 'false').lower() in ('1', 'true', 'yes')
+    app.config['TRUSTED_PROXIES'] = int(os.getenv('TRUSTED_PROXIES', '0'))
+
+    # Behind a reverse proxy, take the client address (used for rate
+    # limiting) from X-Forwarded-For
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
 
     @app.context_processor
     def inject_globals():
@@ -43,9 +58,21 @@ def create_app():
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
+
+    from app import metrics
+    metrics.init_app(app)
 
     # Register blueprints
     from app.routes import bp
     app.register_blueprint(bp)
+
+    from app.stats import rebuild_counters_command, rollup_stats_command
+    app.cli.add_command(rebuild_counters_command)
+    app.cli.add_command(rollup_stats_command)
+
+    from app.analysis import backfill_analysis_command
+    app.cli.add_command(backfill_analysis_command)
     
     return app 
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Async upstream calls of the routes served on the event loop (app.asgi).
+
+AsyncMempoolClient is MempoolClient on httpx: the same timeouts, retries
+and metrics, and the same upstream request slots and cache as the
+threads. Networks whose client is not the plain mempool.space one
+(broadcast fan-out, a test or benchmark backend) go through their
+synchronous client in a thread instead.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+from app import mempool
+from app.audit import push_backend
+from app.cache import MISS, CachedMempoolClient
+from app.mempool import (BACKOFF, CONNECT_TIMEOUT, POOL_SIZE, READ_TIMEOUT, RETRIES, MempoolClient, MempoolError,
+                         NotSent, get_client, upstream_limiter)
+from app.metrics import UPSTREAM_ERRORS, UPSTREAM_LATENCY, record_push
+
+
+class AsyncMempoolClient:
+    """MempoolClient on httpx, for one event loop"""
+
+    def __init__(self, base_url, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE, network=''):
+        self.base_url = base_url.rstrip('/')
+        self.network = network
+        self.retries = retries
+        self.backoff = backoff
+        self.loop = asyncio.get_running_loop()
+        # Concurrency is capped by the upstream request slots, not the pool
+        self.session = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=pool_size),
+        )
+
+    async def _request(self, method, path, endpoint, idempotent=True, **kwargs):
+        """Send a request, retrying connection errors and 5xx responses.
+
+        A request that is not ``idempotent`` is only retried while it never
+        reached the backend, see MempoolClient._request.
+        """
+        url = f'{self.base_url}{path}'
+        last_error = None
+        sent = False
+        labels = {'network': self.network, 'endpoint': endpoint}
+        for attempt in range(self.retries + 1):
+            if sent and not idempotent:
+                break
+            if attempt:
+                await asyncio.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+            started = time.perf_counter()
+            try:
+                async with upstream_limiter.async_slot():
+                    response = await self.session.request(method, url, **kwargs)
+            except httpx.ReadTimeout as e:
+                UPSTREAM_ERRORS.inc(kind='read_timeout', **labels)
+                last_error = e
+                sent = True
+                continue
+            except httpx.TransportError as e:
+                UPSTREAM_ERRORS.inc(kind='connection', **labels)
+                last_error = e
+                sent = sent or not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                continue
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - started, **labels)
+            if response.status_code < 500:
+                return response
+            UPSTREAM_ERRORS.inc(kind='http_5xx', **labels)
+            last_error = f'HTTP {response.status_code}: {response.text}'
+            sent = True
+        raise (MempoolError if sent else NotSent)(f'{method} {url} failed: {last_error}')
+
+    async def get_tx(self, txid):
+        """Return the upstream transaction JSON, or None if it is unknown"""
+        response = await self._request('GET', f'/api/tx/{txid}', 'tx')
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise MempoolError(f'Unexpected status {response.status_code}: {response.text}')
+        return response.json()
+
+    async def get_tx_hex(self, txid):
+        """Return the raw transaction hex, or None if it is unknown"""
+        response = await self._request('GET', f'/api/tx/{txid}/hex', 'tx_hex')
+        return response.text if response.status_code == 200 else None
+
+    async def broadcast(self, raw_tx):
+        """Broadcast a raw transaction, returning ``(accepted, response_text)``"""
+        response = await self._request('POST', '/api/tx', 'broadcast', idempotent=False,
+                                       content=raw_tx, headers={'Content-Type': 'text/plain'})
+        return response.status_code == 200, response.text
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+# Async client of each network, for the event loop they were created on
+_clients = {}
+
+
+def _async_client(network):
+    """``(async client, cache wrapper or None)`` of a network, or ``(None, None)``
+    when its client can only be called synchronously"""
+    client = get_client(network)
+    cached = client if isinstance(client, CachedMempoolClient) else None
+    upstream = cached.client if cached is not None else client
+    if type(upstream) is not MempoolClient:
+        return None, None
+    async_client = _clients.get(network)
+    if (async_client is None or async_client.loop is not asyncio.get_running_loop()
+            or async_client.base_url != upstream.base_url):
+        async_client = _clients[network] = AsyncMempoolClient(
+            upstream.base_url, connect_timeout=upstream.timeout[0], read_timeout=upstream.timeout[1],
+            retries=upstream.retries, backoff=upstream.backoff, network=network)
+    return async_client, cached
+
+
+async def close_clients():
+    """Close the connection pools of the clients of the running loop"""
+    loop = asyncio.get_running_loop()
+    for network, client in list(_clients.items()):
+        if client.loop is loop:
+            del _clients[network]
+            await client.aclose()
+
+
+async def _get_tx(client, cached, txid):
+    data = cached.lookup(txid, 'tx') if cached is not None else MISS
+    if data is MISS:
+        data = await client.get_tx(txid)
+        if cached is not None:
+            cached.store(txid, 'tx', data)
+    return data
+
+
+async def _broadcast(client, cached, raw_tx):
+    accepted, response_text = await client.broadcast(raw_tx)
+    if accepted and cached is not None:
+        cached.forget(response_text)
+    return accepted, response_text
+
+
+async def _check_and_push(client, cached, txid, raw_tx):
+    # Same steps as app.mempool._check_and_push
+    try:
+        status_data = await _get_tx(client, cached, txid)
+    except NotSent:
+        raise
+    except Exception as e:
+        # Nothing was broadcast yet
+        raise NotSent(str(e)) from e
+    if status_data is not None:
+        if status_data.get('status', {}).get('confirmed'):
+            return 'confirmed', 'Transaction is already confirmed in the blockchain', False
+        return 'success', 'Transaction is already present in mempool', False
+
+    accepted, response_text = await _broadcast(client, cached, raw_tx)
+    return ('success' if accepted else 'failed'), response_text, True
+
+
+async def get_tx_hex(network, txid):
+    """Async get_client(network).get_tx_hex()"""
+    client, cached = _async_client(network)
+    if client is None:
+        return await asyncio.to_thread(get_client(network).get_tx_hex, txid)
+    raw_tx = cached.lookup(txid, 'hex') if cached is not None else MISS
+    if raw_tx is MISS:
+        raw_tx = await client.get_tx_hex(txid)
+        if cached is not None:
+            cached.store(txid, 'hex', raw_tx)
+    return raw_tx
+
+
+def _sync_broadcast(network, raw_tx):
+    # Runs in the thread, where the fan-out records its winner
+    return (*get_client(network).broadcast(raw_tx), push_backend(network, True))
+
+
+async def broadcast(network, raw_tx):
+    """Async get_client(network).broadcast(): ``(accepted, response_text, backend)``"""
+    client, cached = _async_client(network)
+    if client is None:
+        return await asyncio.to_thread(_sync_broadcast, network, raw_tx)
+    accepted, response_text = await _broadcast(client, cached, raw_tx)
+    return accepted, response_text, push_backend(network, True)
+
+
+def _sync_check_and_push(network, txid, raw_tx):
+    status, analysis_result, attempted = mempool.check_and_push(network, txid, raw_tx)
+    return status, analysis_result, attempted, push_backend(network, attempted)
+
+
+async def check_and_push(network, txid, raw_tx):
+    """Async app.mempool.check_and_push: ``(status, analysis_result, attempted, backend)``"""
+    client, cached = _async_client(network)
+    if client is None:
+        return await asyncio.to_thread(_sync_check_and_push, network, txid, raw_tx)
+    try:
+        status, analysis_result, attempted = await _check_and_push(client, cached, txid, raw_tx)
+    except Exception:
+        record_push(network, 'error', False)
+        raise
+    record_push(network, status, attempted)
+    return status, analysis_result, attempted, push_backend(network, attempted)
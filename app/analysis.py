@@ -0,0 +1,167 @@
+"""Persisted decoded-transaction analysis: sizes, output value, fee and fee rate"""
+from collections import defaultdict
+
+import click
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.blobs import unpack_raw_tx
+from app.models import Transaction, TransactionBlob, TransactionInput, decoded_fields
+from app.network_config import VALID_NETWORKS
+from app.validation import decode_raw_tx, InvalidTransaction
+
+# Keeps IN lists well below the bound parameter limits of every backend
+CHUNK_SIZE = 500
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start:start + CHUNK_SIZE]
+
+
+def _decode_blob(codec, data):
+    try:
+        return decode_raw_tx(unpack_raw_tx(codec, data))
+    except (InvalidTransaction, ValueError):
+        return None
+
+
+def _output_values(connection, network, txids):
+    """``{txid: [output values]}`` of the stored transactions among ``txids``"""
+    transactions, blobs = Transaction.__table__, TransactionBlob.__table__
+    values = {}
+    for chunk in _chunks(txids):
+        rows = connection.execute(
+            select(transactions.c.txid, blobs.c.codec, blobs.c.data)
+            .join(blobs, blobs.c.transaction_id == transactions.c.id)
+            .where(transactions.c.network == network, transactions.c.txid.in_(chunk))
+        )
+        for txid, codec, data in rows:
+            summary = _decode_blob(codec, data)
+            if summary is not None:
+                values[txid] = [output.value for output in summary.outputs]
+    return values
+
+
+def update_fees(connection, network, txids):
+    """Compute the fee of stored transactions whose spent outputs are all stored.
+
+    Covers ``txids`` and their stored children that have no fee yet, since
+    a new parent can complete a child's prevouts. Returns ``{txid: (fee,
+    fee_rate)}`` of the rows updated.
+    """
+    transactions, inputs = Transaction.__table__, TransactionInput.__table__
+    targets = set(txids)
+    if not targets:
+        return {}
+    for chunk in _chunks(txids):
+        targets.update(connection.execute(
+            select(transactions.c.txid)
+            .join(inputs, inputs.c.transaction_id == transactions.c.id)
+            .where(transactions.c.network == network, transactions.c.fee.is_(None),
+                   inputs.c.prev_txid.in_(chunk))
+        ).scalars())
+
+    # (id, vsize, output_value) and spent outpoints of every target
+    rows, outpoints = {}, defaultdict(list)
+    for chunk in _chunks(targets):
+        for id, txid, vsize, output_value, prev_txid, prev_vout in connection.execute(
+            select(transactions.c.id, transactions.c.txid, transactions.c.vsize, transactions.c.output_value,
+                   inputs.c.prev_txid, inputs.c.prev_vout)
+            .join(inputs, inputs.c.transaction_id == transactions.c.id)
+            .where(transactions.c.network == network, transactions.c.fee.is_(None),
+                   transactions.c.vsize.isnot(None), transactions.c.txid.in_(chunk))
+        ):
+            rows[txid] = (id, vsize, output_value)
+            outpoints[txid].append((prev_txid, prev_vout))
+
+    parents = _output_values(connection, network, {prev_txid for spent in outpoints.values()
+                                                    for prev_txid, _ in spent})
+    fees, updates = {}, []
+    for txid, (id, vsize, output_value) in rows.items():
+        try:
+            input_value = sum(parents[prev_txid][prev_vout] for prev_txid, prev_vout in outpoints[txid])
+        except (KeyError, IndexError):
+            continue
+        fee = input_value - output_value
+        if fee < 0:
+            continue
+        fees[txid] = (fee, round(fee / vsize, 2))
+        updates.append({'row_id': id, 'fee': fee, 'fee_rate': fees[txid][1]})
+
+    if updates:
+        connection.execute(
+            transactions.update()
+            .where(transactions.c.id == db.bindparam('row_id'))
+            .values(fee=db.bindparam('fee'), fee_rate=db.bindparam('fee_rate')),
+            updates,
+        )
+    return fees
+
+
+@event.listens_for(Session, 'after_flush')
+def _compute_fees(session, flush_context):
+    """Fill in the fee of newly stored transactions and of their stored children"""
+    new = defaultdict(dict)
+    for obj in session.new:
+        if isinstance(obj, Transaction) and obj.network and obj.txid:
+            new[obj.network][obj.txid] = obj
+    for network, objs in new.items():
+        for txid, (fee, fee_rate) in update_fees(session.connection(), network, objs).items():
+            if txid in objs:
+                set_committed_value(objs[txid], 'fee', fee)
+                set_committed_value(objs[txid], 'fee_rate', fee_rate)
+
+
+def backfill_analysis(network=None, batch_size=BACKFILL_BATCH_SIZE):
+    """Decode the stored transactions that predate the analysis columns.
+
+    Returns the number of rows updated.
+    """
+    transactions, blobs = Transaction.__table__, TransactionBlob.__table__
+    connection = db.session.connection()
+    networks = [network] if network else VALID_NETWORKS
+    updated, last_id = 0, 0
+    while True:
+        rows = connection.execute(
+            select(transactions.c.id, transactions.c.network, transactions.c.txid, blobs.c.codec, blobs.c.data)
+            .join(blobs, blobs.c.transaction_id == transactions.c.id)
+            .where(transactions.c.id > last_id, transactions.c.vsize.is_(None),
+                   transactions.c.network.in_(networks))
+            .order_by(transactions.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        decoded = [(row, _decode_blob(row.codec, row.data)) for row in rows]
+        values = [{'row_id': row.id, **decoded_fields(summary)} for row, summary in decoded if summary is not None]
+        if values:
+            connection.execute(
+                transactions.update()
+                .where(transactions.c.id == db.bindparam('row_id'))
+                .values({field: db.bindparam(field) for field in values[0] if field != 'row_id'}),
+                values,
+            )
+            updated += len(values)
+        by_network = defaultdict(list)
+        for row, summary in decoded:
+            if summary is not None:
+                by_network[row.network].append(row.txid)
+        for tx_network, txids in by_network.items():
+            update_fees(connection, tx_network, txids)
+        db.session.commit()
+        connection = db.session.connection()
+    return updated
+
+
+@click.command('backfill-analysis')
+@click.option('--network', type=click.Choice(VALID_NETWORKS), help='Only backfill this network')
+def backfill_analysis_command(network):
+    """Decode sizes, output value and fee of transactions stored before they were persisted."""
+    updated = backfill_analysis(network)
+    click.echo(f'Decoded {updated} transactions.')
@@ -0,0 +1,397 @@
+"""ASGI application: the upstream-bound routes on the event loop, the rest on Flask.
+
+submit_transaction, push_transaction, api_post_txid and api_push_tx are
+answered by the coroutines below, which wait on the mempool backend with
+app.aio: a request waiting upstream holds no thread. Their database work,
+and every other request through the Flask WSGI app, runs on a pool of
+WEB_THREADS threads. Served by ``WEB_SERVER=asgi gunicorn -c gunicorn.conf.py``.
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Response, jsonify, make_response, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import aio, db, metrics
+from app.mempool import UpstreamBusy
+from app.models import Transaction
+from app.network_config import is_valid_network
+from app.push import confirmed_payload, record_broadcast, record_broadcast_error, record_push_error, record_push_outcome
+from app.ratelimit import admission_rejection, upstream_busy_response
+from app.routes import store_fetched_transaction, store_submitted_transaction, stored_transaction
+from app.validation import InvalidHex, compute_txid
+
+WEB_THREADS = int(os.getenv('WEB_THREADS', '16'))
+# Chunks of a streamed WSGI response buffered ahead of a slow client
+STREAM_BUFFER = 16
+
+
+class AsyncRequest:
+    """A request answered on the event loop.
+
+    Every blocking step goes through ``run``; any step may answer the
+    request with a Response instead of its value.
+    """
+
+    def __init__(self, flask_app, executor, environ):
+        self.flask_app = flask_app
+        self.executor = executor
+        self.environ = environ
+
+    def _call(self, func, args):
+        app = self.flask_app
+        with app.request_context(self.environ):
+            try:
+                return func(*args)
+            except Exception as e:
+                # Answer like Flask does for an exception raised by a view
+                try:
+                    return app.make_response(app.handle_user_exception(e))
+                except Exception as e:
+                    return app.handle_exception(e)
+
+    async def run(self, func, *args):
+        """Call ``func(*args)`` in the thread pool, in the context of this request"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, func, args)
+
+    async def respond(self, func, *args):
+        """The response of the view-like ``func(*args)``, called in the thread pool"""
+        return await self.run(_respond, func, *args)
+
+    def answer(self, func, *args):
+        """The response of a view-like ``func(*args)`` that does not block"""
+        return self._call(_respond, (func, *args))
+
+    def error(self, message, status):
+        return self.answer(lambda: (jsonify({'error': message}), status))
+
+
+def _respond(func, *args):
+    return make_response(func(*args))
+
+
+def _admit(network):
+    """Admission control of the view, then the JSON body of the request"""
+    rejection = admission_rejection(network)
+    if rejection is not None:
+        return rejection
+    return request.get_json()
+
+
+async def submit_transaction(req, network):
+    data = await req.run(_admit, network)
+    if isinstance(data, Response):
+        return data
+    raw_tx = data.get('raw_tx')
+    txid = data.get('txid')
+    if txid:
+        try:
+            raw_tx = await aio.get_tx_hex(network, txid)
+        except UpstreamBusy:
+            return req.answer(upstream_busy_response, network)
+        except Exception as e:
+            return req.error(f'Error fetching transaction: {str(e)}', 400)
+        if raw_tx is None:
+            return req.error('Transaction not found', 404)
+    return await req.respond(store_submitted_transaction, network, raw_tx, txid)
+
+
+def _stored_push(network, txid):
+    rejection = admission_rejection(network)
+    if rejection is not None:
+        return rejection
+    tx = Transaction.get_by_txid_and_network(txid, network)
+    if not tx:
+        return make_response(jsonify({'error': 'Transaction not found'}), 404)
+    if tx.status == 'confirmed':
+        payload, status_code = confirmed_payload(tx)
+        return make_response(jsonify(payload), status_code)
+    return tx.id, tx.raw_tx
+
+
+def _record_push(tx_id, outcome, latency):
+    tx = db.session.get(Transaction, tx_id)
+    if tx is None:
+        # Deleted while it was being pushed
+        return make_response(jsonify({'error': 'Transaction not found'}), 404)
+    if isinstance(outcome, Exception):
+        payload, status_code = record_push_error(tx, outcome, latency)
+    else:
+        status, analysis_result, attempted, backend = outcome
+        payload, status_code = record_push_outcome(tx, status, analysis_result, attempted, latency, backend)
+    return make_response(jsonify(payload), status_code)
+
+
+async def push_transaction(req, network, txid):
+    stored = await req.run(_stored_push, network, txid)
+    if isinstance(stored, Response):
+        return stored
+    tx_id, raw_tx = stored
+    started = time.perf_counter()
+    try:
+        outcome = await aio.check_and_push(network, txid, raw_tx)
+    except UpstreamBusy:
+        # Nothing was attempted, leave the transaction as it is
+        return req.answer(upstream_busy_response, network)
+    except Exception as e:
+        outcome = e
+    return await req.run(_record_push, tx_id, outcome, time.perf_counter() - started)
+
+
+async def api_post_txid(req, network):
+    data = await req.run(_admit, network)
+    if isinstance(data, Response):
+        return data
+    txid = data.get('txid')
+    if not txid:
+        return req.error('txid is required', 400)
+    try:
+        raw_tx = await aio.get_tx_hex(network, txid)
+    except UpstreamBusy:
+        return req.answer(upstream_busy_response, network)
+    except Exception as e:
+        return req.error(str(e), 400)
+    if raw_tx is None:
+        return req.error('Transaction not found', 404)
+    return await req.respond(store_fetched_transaction, network, txid, raw_tx)
+
+
+def _stored_broadcast(network):
+    data = _admit(network)
+    if isinstance(data, Response):
+        return data
+    raw_tx = data.get('raw_tx')
+    if not raw_tx:
+        return make_response(jsonify({'error': 'raw_tx is required'}), 400)
+    try:
+        try:
+            txid = compute_txid(raw_tx)
+        except InvalidHex:
+            return make_response(jsonify({'error': 'Invalid hex format'}), 400)
+        tx = stored_transaction(network, raw_tx, txid)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    return tx.id, tx.raw_tx
+
+
+def _record_broadcast(tx_id, outcome, latency):
+    tx = db.session.get(Transaction, tx_id)
+    if tx is None:
+        return make_response(jsonify({'error': 'Transaction not found'}), 404)
+    if isinstance(outcome, Exception):
+        record_broadcast_error(tx, outcome, latency)
+        return make_response(jsonify({'error': str(outcome)}), 400)
+    accepted, response_text, backend = outcome
+    payload, status_code = record_broadcast(tx, accepted, response_text, latency, backend)
+    return make_response(jsonify(payload), status_code)
+
+
+async def api_push_tx(req, network):
+    stored = await req.run(_stored_broadcast, network)
+    if isinstance(stored, Response):
+        return stored
+    tx_id, raw_tx = stored
+    started = time.perf_counter()
+    try:
+        outcome = await aio.broadcast(network, raw_tx)
+    except UpstreamBusy:
+        return req.answer(upstream_busy_response, network)
+    except Exception as e:
+        outcome = e
+    return await req.run(_record_broadcast, tx_id, outcome, time.perf_counter() - started)
+
+
+# Flask endpoint -> coroutine answering it
+ASYNC_VIEWS = {
+    'main.submit_transaction': submit_transaction,
+    'main.push_transaction': push_transaction,
+    'main.api_post_txid': api_post_txid,
+    'main.api_push_tx': api_push_tx,
+}
+# Views that only queue a job with PUSH_MODE=queue, nothing to wait for
+QUEUED_VIEWS = {'main.push_transaction', 'main.api_push_tx'}
+
+
+def _environ(scope, body):
+    """WSGI environ of an ASGI HTTP request"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+class AsgiApp:
+    """Serve ``flask_app`` over ASGI, the upstream-bound views on the event loop"""
+
+    def __init__(self, flask_app, threads=WEB_THREADS):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='web')
+        proxies = flask_app.config['TRUSTED_PROXIES']
+        # The client address the WSGI app gets through ProxyFix (see create_app)
+        self.proxy_fix = ProxyFix(lambda environ, start_response: environ, x_for=proxies) if proxies else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope {scope['type']}")
+        body = await _read_body(receive)
+        if body is None:
+            return
+        environ = _environ(scope, body)
+        match = self._async_view(environ)
+        if match is None:
+            await self._call_wsgi(environ, receive, send)
+        else:
+            await self._call_async(environ, send, *match)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await aio.close_clients()
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _async_view(self, environ):
+        """``(rule, coroutine, view args)`` of a request answered on the event loop, or None"""
+        try:
+            rule, view_args = self.flask_app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return None
+        view = ASYNC_VIEWS.get(rule.endpoint)
+        if view is None or not is_valid_network(view_args['network']):
+            # Flask answers the 404 of an invalid network
+            return None
+        if rule.endpoint in QUEUED_VIEWS and self.flask_app.config['PUSH_MODE'] == 'queue':
+            return None
+        return rule, view, view_args
+
+    async def _call_async(self, environ, send, rule, view, view_args):
+        started = time.perf_counter()
+        if metrics.METRICS_DIR:
+            metrics.start_flusher()
+        if self.proxy_fix is not None:
+            environ = self.proxy_fix(environ, None)
+        response = await view(AsyncRequest(self.flask_app, self.executor, environ), **view_args)
+        metrics.record_request(environ['REQUEST_METHOD'], rule.rule, view_args['network'], response.status_code,
+                               time.perf_counter() - started)
+        await send({'type': 'http.response.start', 'status': response.status_code,
+                    'headers': _headers(response.headers.items())})
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def _call_wsgi(self, environ, receive, send):
+        """Run the request through the Flask WSGI app in the thread pool,
+        streaming its response"""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(STREAM_BUFFER)
+        disconnected = threading.Event()
+
+        def put(item):
+            # Waits while the client is STREAM_BUFFER chunks behind
+            asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+        def run():
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started[:] = [int(status.split(' ', 1)[0]), headers]
+
+            try:
+                body = self.flask_app(environ, start_response)
+                try:
+                    put(tuple(started))
+                    for chunk in body:
+                        if chunk:
+                            put(chunk)
+                        if disconnected.is_set():
+                            break
+                finally:
+                    if hasattr(body, 'close'):
+                        body.close()
+                put(None)
+            except BaseException as e:
+                put(e)
+
+        async def watch():
+            # A streaming response (e.g. /events) stops at its next chunk
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch())
+        loop.run_in_executor(self.executor, run)
+        try:
+            item = await chunks.get()
+            if isinstance(item, BaseException):
+                raise item
+            status, headers = item
+            await send({'type': 'http.response.start', 'status': status, 'headers': _headers(headers)})
+            # Every chunk is held until the next one arrives, so that the last
+            # goes out as the final message: gunicorn's asyncio worker can
+            # miss the next keep-alive request if the client has the whole
+            # body (Content-Length) before the app returns.
+            chunk = b''
+            while (item := await chunks.get()) is not None:
+                if isinstance(item, BaseException):
+                    raise item
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = item
+            await send({'type': 'http.response.body', 'body': chunk})
+        finally:
+            disconnected.set()
+            watcher.cancel()
+            # Unblock the thread if it is waiting for room in the queue
+            while not chunks.empty():
+                chunks.get_nowait()
@@ -0,0 +1,93 @@
+"""Append-only transaction history.
+
+Every submission, check, push and confirmation, eviction or reorg of a stored
+transaction is written as a narrow ``transaction_event`` row; the
+transaction row only keeps the current state. The ORM paths record events
+with the session, the Core bulk paths of scripts/ with insert_events().
+"""
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.broadcast import backend_name, last_broadcast_backend
+from app.models import Transaction, TransactionEvent
+from app.network_config import get_broadcast_urls, get_mempool_url
+
+KINDS = ('submit', 'check', 'push', 'confirm', 'evict', 'reorg')
+# Longer backend responses are cut, the event rows stay narrow
+MAX_RESPONSE_LENGTH = 1000
+
+
+def _truncate(response):
+    return response[:MAX_RESPONSE_LENGTH] if response else response
+
+
+def push_kind(attempted):
+    """Event kind of a push outcome: ``push`` if a broadcast was sent, else ``check``"""
+    return 'push' if attempted else 'check'
+
+
+def push_backend(network, attempted=False):
+    """Backend that answered the last check or push of this thread on ``network``
+
+    With broadcast fan-out the winning backend of the last broadcast,
+    otherwise the mempool service of the network.
+    """
+    if attempted and get_broadcast_urls(network):
+        backend = last_broadcast_backend()
+        if backend:
+            return backend
+    return backend_name(get_mempool_url(network))
+
+
+def record_event(tx, kind, latency=None, backend=None, response=None, status=None):
+    """Append an event to the history of ``tx``, written when the session flushes
+
+    ``status`` and ``response`` default to the current status and analysis
+    result of the transaction.
+    """
+    db.session.add(TransactionEvent(
+        transaction=tx,
+        kind=kind,
+        status=status or tx.status,
+        backend=backend,
+        latency=latency,
+        response=_truncate(response if response is not None else tx.analysis_result),
+    ))
+
+
+def event_row(transaction_id, kind, status, response=None, backend=None, latency=None, created_at=None):
+    """Parameters of one event for insert_events()"""
+    return {
+        'transaction_id': transaction_id,
+        'created_at': created_at or datetime.utcnow(),
+        'kind': kind,
+        'status': status,
+        'backend': backend,
+        'latency': latency,
+        'response': _truncate(response),
+    }
+
+
+def insert_events(connection, rows):
+    """Append event_row() rows in one batched insert"""
+    if rows:
+        connection.execute(TransactionEvent.__table__.insert(), rows)
+
+
+def get_events(tx, limit=None):
+    """History of a transaction, oldest first (the last ``limit`` events if set)"""
+    query = TransactionEvent.query.filter_by(transaction_id=tx.id)
+    if limit:
+        return list(reversed(query.order_by(TransactionEvent.id.desc()).limit(limit).all()))
+    return query.order_by(TransactionEvent.id).all()
+
+
+@event.listens_for(Session, 'before_flush')
+def _record_submissions(session, flush_context, instances):
+    """Start the history of every transaction stored through the ORM"""
+    for obj in list(session.new):
+        if isinstance(obj, Transaction):
+            session.add(TransactionEvent(transaction=obj, kind='submit', status=obj.status or 'pending'))
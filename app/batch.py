@@ -0,0 +1,190 @@
+"""Bulk transaction submission: parse in a pool, dedupe and insert in one go"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.analysis import update_fees
+from app.audit import event_row, insert_events
+from app.models import Transaction, TransactionBlob, TransactionInput, decoded_fields
+from app.blobs import pack_raw_tx
+from app.mempool import get_client
+from app.stats import apply_counter_deltas
+from app.validation import decode_raw_tx, InvalidHex, InvalidTransaction
+
+# Below this many raw transactions parsing inline is cheaper than the pool
+POOL_THRESHOLD = 256
+
+_parse_pool = None
+_parse_workers = 1
+
+
+def _get_parse_pool():
+    """Lazily create the process pool used to parse raw transactions"""
+    global _parse_pool, _parse_workers
+    if _parse_pool is None:
+        _parse_workers = current_app.config.get('BATCH_PARSE_WORKERS') or os.cpu_count() or 1
+        # Spawned, not forked: the web worker already runs request threads
+        # whose locks a forked child would inherit in any state
+        _parse_pool = ProcessPoolExecutor(max_workers=_parse_workers,
+                                          mp_context=multiprocessing.get_context('spawn'))
+    return _parse_pool
+
+
+def parse_raw_tx(raw_tx):
+    """Return ``(txid, inputs, fields, error)`` for a raw transaction hex string
+
+    ``inputs`` are the ``(prev_txid, prev_vout)`` outpoints it spends and
+    ``fields`` the decoded columns of the transaction row.
+    """
+    try:
+        summary = decode_raw_tx(raw_tx)
+    except InvalidHex as e:
+        return None, None, None, str(e)
+    except InvalidTransaction as e:
+        return None, None, None, f'Invalid transaction format: {str(e)}'
+    inputs = [(tx_input.prev_txid, tx_input.prev_vout) for tx_input in summary.inputs]
+    return summary.txid, inputs, decoded_fields(summary), None
+
+
+def _fetch_raw_tx(client, txid):
+    """Return ``(raw_tx, error)`` for a txid fetched from the mempool backend"""
+    try:
+        raw_tx = client.get_tx_hex(txid)
+        if raw_tx is None:
+            return None, 'Transaction not found'
+        return raw_tx, None
+    except Exception as e:
+        return None, f'Error fetching transaction: {str(e)}'
+
+
+def _parse_all(raw_txs):
+    if len(raw_txs) < POOL_THRESHOLD:
+        return [parse_raw_tx(raw_tx) for raw_tx in raw_txs]
+    pool = _get_parse_pool()
+    chunksize = max(1, len(raw_txs) // (4 * _parse_workers))
+    return list(pool.map(parse_raw_tx, raw_txs, chunksize=chunksize))
+
+
+def _insert_transactions(rows):
+    """Insert transaction rows and return ``{txid: id}`` of the inserted ones
+
+    Rows stored meanwhile by a concurrent request are skipped on SQLite and
+    PostgreSQL instead of failing the whole batch.
+    """
+    table = Transaction.__table__
+    dialect = db.session.get_bind().dialect
+    if dialect.name in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialect.name == 'sqlite' else postgresql).insert
+        statement = insert(table).on_conflict_do_nothing(index_elements=['txid', 'network'])
+    else:
+        statement = table.insert()
+    if dialect.insert_returning:
+        inserted = db.session.execute(statement.returning(table.c.id, table.c.txid), rows)
+        return {txid: transaction_id for transaction_id, txid in inserted}
+
+    # No RETURNING (MySQL): read the ids back
+    db.session.execute(statement, rows)
+    inserted = db.session.execute(
+        select(table.c.id, table.c.txid)
+        .where(table.c.network == rows[0]['network'], table.c.txid.in_([row['txid'] for row in rows]))
+    )
+    return {txid: transaction_id for transaction_id, txid in inserted}
+
+
+def submit_batch(network, items, fetch_workers=8):
+    """Store many transactions at once.
+
+    ``items`` are dicts with either a ``raw_tx`` or a ``txid`` key. Returns
+    one result dict per item, in order, with a ``status`` of ``created``,
+    ``exists`` or ``error``.
+    """
+    results = [{'index': index} for index in range(len(items))]
+    raw_txs = [None] * len(items)
+
+    # Fetch the raw hex of txid-only items concurrently
+    to_fetch = [(index, item['txid']) for index, item in enumerate(items) if not item.get('raw_tx') and item.get('txid')]
+    if to_fetch:
+        client = get_client(network)
+        with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+            fetched = executor.map(lambda entry: _fetch_raw_tx(client, entry[1]), to_fetch)
+            for (index, txid), (raw_tx, error) in zip(to_fetch, fetched):
+                results[index]['txid'] = txid
+                if error:
+                    results[index].update(status='error', error=error)
+                else:
+                    raw_txs[index] = raw_tx
+
+    for index, item in enumerate(items):
+        if item.get('raw_tx'):
+            raw_txs[index] = item['raw_tx']
+        elif 'status' not in results[index] and raw_txs[index] is None:
+            results[index].update(status='error', error='raw_tx or txid is required')
+
+    # Parse everything that still needs it in the pool
+    to_parse = [index for index, raw_tx in enumerate(raw_txs) if raw_tx is not None]
+    inputs, fields = {}, {}
+    for index, (txid, outpoints, decoded, error) in zip(to_parse, _parse_all([raw_txs[index] for index in to_parse])):
+        inputs[index] = outpoints
+        fields[index] = decoded
+        expected = items[index].get('txid')
+        if error:
+            results[index].update(status='error', error=error)
+        elif expected and expected != txid:
+            results[index].update(txid=expected, status='error', error='Provided txid does not match calculated txid')
+        else:
+            results[index]['txid'] = txid
+
+    # Dedupe against the database with a single IN query, and within the batch
+    candidates = [index for index in to_parse if 'status' not in results[index]]
+    txids = {results[index]['txid'] for index in candidates}
+    existing = set()
+    if txids:
+        existing = {row.txid for row in db.session.query(Transaction.txid).filter(
+            Transaction.network == network, Transaction.txid.in_(txids)
+        )}
+
+    rows, new = [], []
+    for index in candidates:
+        txid = results[index]['txid']
+        if txid in existing:
+            results[index]['status'] = 'exists'
+            continue
+        existing.add(txid)
+        rows.append({'txid': txid, 'network': network, **fields[index]})
+        new.append(index)
+
+    if rows:
+        ids = _insert_transactions(rows)
+        created = []
+        for index in new:
+            transaction_id = ids.get(results[index]['txid'])
+            if transaction_id is None:
+                # Stored by a concurrent request since the dedupe query
+                results[index]['status'] = 'exists'
+            else:
+                results[index]['status'] = 'created'
+                created.append((transaction_id, index))
+        if created:
+            db.session.execute(TransactionBlob.__table__.insert(), [
+                {'transaction_id': transaction_id, 'codec': codec, 'data': data}
+                for transaction_id, index in created
+                for codec, data in (pack_raw_tx(raw_txs[index]),)
+            ])
+            db.session.execute(TransactionInput.__table__.insert(), [
+                {'transaction_id': transaction_id, 'vin': vin, 'prev_txid': prev_txid, 'prev_vout': prev_vout}
+                for transaction_id, index in created
+                for vin, (prev_txid, prev_vout) in enumerate(inputs[index])
+            ])
+            insert_events(db.session.connection(), [event_row(transaction_id, 'submit', 'pending')
+                                                    for transaction_id, _ in created])
+            update_fees(db.session.connection(), network, [results[index]['txid'] for _, index in created])
+            if current_app.config.get('STATS_COUNTERS'):
+                apply_counter_deltas(db.session.connection(), {(network, 'pending'): [len(created), 0, 0]})
+        db.session.commit()
+
+    return results
@@ -0,0 +1,54 @@
+"""Binary, optionally compressed storage of raw transactions.
+
+Raw transactions live in the transaction_blob side table as bytes rather
+than hex, compressed with zstd (if installed) or zlib when that makes them
+smaller. Signatures and keys barely compress, so most of the saving comes
+from dropping the hex encoding.
+"""
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from app.validation import hex_to_bytes
+
+RAW_TX_CODEC = os.getenv('RAW_TX_CODEC', 'zstd' if zstandard else 'zlib')
+
+
+def _compress(codec, data):
+    if codec == 'zlib':
+        return zlib.compress(data, 9)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('The zstandard package is required for the zstd codec')
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return data
+
+
+def pack_raw_tx(raw_tx, codec=RAW_TX_CODEC):
+    """Encode a raw transaction hex string as ``(codec, bytes)`` for storage"""
+    data = hex_to_bytes(raw_tx)
+    if codec != 'raw':
+        compressed = _compress(codec, data)
+        if len(compressed) < len(data):
+            return codec, compressed
+    return 'raw', data
+
+
+def unpack_raw_tx(codec, data):
+    """Decode a stored ``(codec, bytes)`` pair back into a hex string"""
+    if codec == 'zlib':
+        data = zlib.decompress(data)
+    elif codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('The zstandard package is required to read zstd compressed transactions')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'text':
+        # Legacy rows that were not valid hex are kept verbatim
+        return bytes(data).decode()
+    elif codec != 'raw':
+        raise ValueError(f'Unknown raw transaction codec: {codec}')
+    return bytes(data).hex()
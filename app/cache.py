@@ -0,0 +1,243 @@
+"""In-process LRU+TTL cache for mempool backend lookups, with an optional
+SQLite table shared between workers.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.getenv('MEMPOOL_CACHE_SIZE', '10000'))
+CONFIRMED_TTL = float(os.getenv('MEMPOOL_CACHE_TTL_CONFIRMED', '86400'))
+UNCONFIRMED_TTL = float(os.getenv('MEMPOOL_CACHE_TTL_UNCONFIRMED', '30'))
+SHARED_CACHE_DB = os.getenv('MEMPOOL_CACHE_DB')
+
+MISS = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISS
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return MISS
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """Cache table in a SQLite file, so several worker processes share entries"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS upstream_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(key):
+        return '|'.join(key)
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM upstream_cache WHERE key = ?', (self._key(key),)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return MISS, None
+        return json.loads(row[0]), row[1] - time.time()
+
+    def set(self, key, value, ttl):
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO upstream_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (self._key(key), json.dumps(value), time.time() + ttl),
+            )
+
+    def delete(self, key):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM upstream_cache WHERE key = ?', (self._key(key),))
+
+    def purge_expired(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM upstream_cache WHERE expires_at <= ?', (time.time(),))
+
+
+class UpstreamCache:
+    """Two-level cache: a local LRU in front of an optional shared backend"""
+
+    def __init__(self, maxsize=CACHE_SIZE, shared=None):
+        self.local = LRUCache(maxsize)
+        self.shared = shared
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key, counter):
+        # Keys start with the network, so counters are kept per network
+        with self._lock:
+            counters = self.counters.setdefault(key[0], {'hits': 0, 'shared_hits': 0, 'misses': 0})
+            counters[counter] += 1
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not MISS:
+            self._count(key, 'hits')
+            return value
+        if self.shared is not None:
+            value, remaining = self.shared.get(key)
+            if value is not MISS:
+                self._count(key, 'shared_hits')
+                self.local.set(key, value, remaining)
+                return value
+        self._count(key, 'misses')
+        return MISS
+
+    def set(self, key, value, ttl):
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def stats(self, network=None):
+        """Hit/miss counters of one network (all networks if None) and cache size"""
+        with self._lock:
+            groups = [self.counters.get(network, {})] if network else list(self.counters.values())
+            hits = sum(group.get('hits', 0) for group in groups)
+            shared_hits = sum(group.get('shared_hits', 0) for group in groups)
+            misses = sum(group.get('misses', 0) for group in groups)
+        lookups = hits + shared_hits + misses
+        return {
+            'hits': hits,
+            'shared_hits': shared_hits,
+            'misses': misses,
+            'hit_ratio': (hits + shared_hits) / lookups if lookups else None,
+            'size': len(self.local),
+            'maxsize': self.local.maxsize,
+            'evictions': self.local.evictions,
+            'expirations': self.local.expirations,
+            'shared_backend': self.shared.path if self.shared is not None else None,
+        }
+
+
+class CachedMempoolClient:
+    """Wrap a mempool client so status and hex lookups are served from cache.
+
+    Confirmed transactions never change, so they are kept for
+    ``confirmed_ttl``; unconfirmed ones only for ``unconfirmed_ttl``.
+    Unknown transactions are never cached.
+    """
+
+    def __init__(self, client, network, cache, confirmed_ttl=CONFIRMED_TTL, unconfirmed_ttl=UNCONFIRMED_TTL):
+        self.client = client
+        self.network = network
+        self.cache = cache
+        self.confirmed_ttl = confirmed_ttl
+        self.unconfirmed_ttl = unconfirmed_ttl
+
+    def __getattr__(self, name):
+        # Anything not cached goes straight to the wrapped client
+        return getattr(self.client, name)
+
+    def lookup(self, txid, kind):
+        """Cached ``'tx'`` status or ``'hex'`` of a txid, or MISS"""
+        return self.cache.get((self.network, txid, kind))
+
+    def store(self, txid, kind, data):
+        """Cache an upstream lookup; unknown transactions (None) are not cached"""
+        if data is None:
+            return
+        if kind == 'tx' and not data.get('status', {}).get('confirmed'):
+            ttl = self.unconfirmed_ttl
+        else:
+            # Confirmed statuses and the hex of a txid never change
+            ttl = self.confirmed_ttl
+        self.cache.set((self.network, txid, kind), data, ttl)
+
+    def forget(self, txid):
+        """Drop the cached status of a transaction whose upstream status just changed"""
+        self.cache.delete((self.network, txid.strip(), 'tx'))
+
+    def get_tx(self, txid):
+        data = self.lookup(txid, 'tx')
+        if data is not MISS:
+            return data
+        data = self.client.get_tx(txid)
+        self.store(txid, 'tx', data)
+        return data
+
+    def get_tx_hex(self, txid):
+        raw_tx = self.lookup(txid, 'hex')
+        if raw_tx is not MISS:
+            return raw_tx
+        raw_tx = self.client.get_tx_hex(txid)
+        self.store(txid, 'hex', raw_tx)
+        return raw_tx
+
+    def broadcast(self, raw_tx):
+        accepted, response_text = self.client.broadcast(raw_tx)
+        if accepted:
+            self.forget(response_text)
+        return accepted, response_text
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide upstream cache, or None when disabled"""
+    global _cache
+    if CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            shared = SQLiteCacheBackend(SHARED_CACHE_DB) if SHARED_CACHE_DB else None
+            _cache = UpstreamCache(CACHE_SIZE, shared)
+        return _cache
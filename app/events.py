@@ -0,0 +1,248 @@
+"""Live update stream: in-process pub/sub fed by a single database poller.
+
+Whichever process changes a transaction (web request, push worker or cron
+script), one poller thread per web process picks the change up through the
+network/updated_at index and fans it out to every connected client, so the
+cost of a change does not grow with the number of open pages. Deletions
+leave a row in deleted_transaction for the pollers to find.
+"""
+import json
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_, and_
+from sqlalchemy.orm import Session, load_only
+
+from app import db
+from app.models import DeletedTransaction, Transaction, LIST_FIELDS
+from app.stats import get_network_stats
+
+POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', '1'))
+# Open streams per process; each holds a server thread for as long as the
+# page stays open, so keep this below the threads of a worker (0: no cap)
+MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', '8'))
+# Seconds a client turned away should wait before opening a stream again
+FULL_RETRY_AFTER = 30
+KEEPALIVE_INTERVAL = 15
+SUBSCRIBER_QUEUE_SIZE = 1000
+POLL_BATCH_SIZE = 500
+# Rows committed late with an older updated_at are caught by re-reading
+# a short window behind the watermark
+POLL_OVERLAP = timedelta(seconds=2)
+# Tombstones of deleted transactions are dropped by a later deletion after this
+TOMBSTONE_TTL = timedelta(days=1)
+
+
+class BrokerFull(Exception):
+    """The process already serves its maximum number of event streams"""
+
+
+class EventBroker:
+    """Fan events out to the subscribers of each network"""
+
+    def __init__(self, poll_interval=POLL_INTERVAL, max_subscribers=MAX_SUBSCRIBERS):
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._poller = None
+        self._watermarks = {}
+        self._seen = {}
+        self._deletion_marks = {}
+        self._seen_deletions = {}
+
+    def subscribe(self, network, app=None):
+        """Register a subscriber and return its queue of events
+
+        Raises BrokerFull when ``max_subscribers`` streams are already open.
+        """
+        subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self.max_subscribers and \
+                    sum(len(subscribers) for subscribers in self._subscribers.values()) >= self.max_subscribers:
+                raise BrokerFull(f'{self.max_subscribers} event streams already open')
+            if network not in self._subscribers:
+                self._subscribers[network] = set()
+                self._watermarks[network] = (datetime.utcnow(), 0)
+                self._seen[network] = {}
+                self._deletion_marks[network] = datetime.utcnow()
+                self._seen_deletions[network] = {}
+            self._subscribers[network].add(subscription)
+            if app is not None and (self._poller is None or not self._poller.is_alive()):
+                self._poller = threading.Thread(target=self._poll_loop, args=(app,), daemon=True)
+                self._poller.start()
+        return subscription
+
+    def unsubscribe(self, network, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(network)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[network]
+                self._watermarks.pop(network, None)
+                self._seen.pop(network, None)
+                self._deletion_marks.pop(network, None)
+                self._seen_deletions.pop(network, None)
+
+    def subscriber_count(self, network=None):
+        with self._lock:
+            if network:
+                return len(self._subscribers.get(network, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, network, event_type, data):
+        """Send an event to every subscriber of ``network``"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(network, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait((event_type, data))
+            except queue.Full:
+                # The client is not keeping up: drop its backlog and let it reload
+                _drain(subscription)
+                subscription.put_nowait(('resync', {}))
+
+    def wake(self):
+        """Poll right away instead of waiting for the next interval"""
+        self._wake.set()
+
+    def _poll_loop(self, app):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self._lock:
+                networks = list(self._subscribers)
+            if not networks:
+                continue
+            with app.app_context():
+                for network in networks:
+                    try:
+                        changed = self._poll_network(network) + self._poll_deletions(network)
+                        if changed:
+                            self.publish(network, 'stats', get_network_stats(network))
+                    except Exception as e:
+                        app.logger.warning('Event poller failed for %s: %s', network, e)
+                    finally:
+                        db.session.remove()
+
+    def _poll_network(self, network):
+        """Publish the transactions of ``network`` changed since the last poll"""
+        with self._lock:
+            if network not in self._watermarks:
+                return 0
+            since, since_id = self._watermarks[network]
+            seen = self._seen[network]
+        columns = [getattr(Transaction, field) for field in LIST_FIELDS]
+        cursor_at, cursor_id = since - POLL_OVERLAP, 0
+        changed = 0
+        while True:
+            rows = (Transaction.query
+                    .options(load_only(*columns))
+                    .filter(Transaction.network == network,
+                            or_(Transaction.updated_at > cursor_at,
+                                and_(Transaction.updated_at == cursor_at, Transaction.id > cursor_id)))
+                    .order_by(Transaction.updated_at, Transaction.id)
+                    .limit(POLL_BATCH_SIZE)
+                    .all())
+            for tx in rows:
+                if seen.get(tx.id) == tx.updated_at:
+                    continue
+                seen[tx.id] = tx.updated_at
+                self.publish(network, 'transaction', tx.to_dict(fields=LIST_FIELDS))
+                changed += 1
+            if rows:
+                cursor_at, cursor_id = rows[-1].updated_at, rows[-1].id
+                if (cursor_at, cursor_id) > (since, since_id):
+                    since, since_id = cursor_at, cursor_id
+            if len(rows) < POLL_BATCH_SIZE:
+                break
+        # Forget rows that fell out of the overlap window
+        horizon = since - POLL_OVERLAP
+        for tx_id in [tx_id for tx_id, updated_at in seen.items() if updated_at < horizon]:
+            del seen[tx_id]
+        with self._lock:
+            if network in self._watermarks:
+                self._watermarks[network] = (since, since_id)
+        return changed
+
+    def _poll_deletions(self, network):
+        """Publish the transactions of ``network`` deleted since the last poll"""
+        with self._lock:
+            if network not in self._deletion_marks:
+                return 0
+            since = self._deletion_marks[network]
+            seen = self._seen_deletions[network]
+        rows = (DeletedTransaction.query
+                .filter(DeletedTransaction.network == network,
+                        DeletedTransaction.deleted_at > since - POLL_OVERLAP)
+                .order_by(DeletedTransaction.deleted_at, DeletedTransaction.id)
+                .all())
+        deleted = 0
+        for row in rows:
+            if row.id in seen:
+                continue
+            seen[row.id] = row.deleted_at
+            self.publish(network, 'deleted', {'txid': row.txid})
+            since = max(since, row.deleted_at)
+            deleted += 1
+        horizon = since - POLL_OVERLAP
+        for row_id in [row_id for row_id, deleted_at in seen.items() if deleted_at < horizon]:
+            del seen[row_id]
+        with self._lock:
+            if network in self._deletion_marks:
+                self._deletion_marks[network] = since
+        return deleted
+
+
+def _drain(subscription):
+    try:
+        while True:
+            subscription.get_nowait()
+    except queue.Empty:
+        pass
+
+
+def format_sse(event_type, data):
+    """Serialize an event in the text/event-stream format"""
+    return f'event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+def iter_events(network, subscription, keepalive=KEEPALIVE_INTERVAL):
+    """Yield SSE messages for a subscription, with periodic keepalives"""
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event_type, data = subscription.get(timeout=keepalive)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event_type, data)
+    finally:
+        broker.unsubscribe(network, subscription)
+
+
+def record_deletion(tx):
+    """Delete ``tx`` in the current session, leaving a tombstone that the
+    event pollers of every process announce"""
+    now = datetime.utcnow()
+    DeletedTransaction.query.filter(
+        DeletedTransaction.network == tx.network,
+        DeletedTransaction.deleted_at < now - TOMBSTONE_TTL,
+    ).delete(synchronize_session=False)
+    db.session.add(DeletedTransaction(network=tx.network, txid=tx.txid, deleted_at=now))
+    db.session.delete(tx)
+
+
+broker = EventBroker()
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_poller(session):
+    # Changes committed by this process show up without waiting a full interval
+    broker.wake()
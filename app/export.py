@@ -0,0 +1,66 @@
+"""Streaming serializers for transaction exports"""
+import csv
+import io
+import json
+import zlib
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Rows fetched from the database and written out per chunk
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _ndjson_chunks(txs, fields, chunk_size):
+    for chunk in _chunks(txs, chunk_size):
+        yield ''.join(json.dumps(tx.to_dict(fields)) + '\n' for tx in chunk)
+
+
+def _csv_chunks(txs, fields, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in _chunks(txs, chunk_size):
+        for tx in chunk:
+            data = tx.to_dict(fields)
+            writer.writerow(data[field] for field in fields)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_export(txs, fmt, fields, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Serialize an iterable of transactions chunk by chunk.
+
+    ``txs`` should be a lazily evaluated query (e.g. with ``yield_per``) so
+    memory use stays bounded by ``chunk_size`` whatever the table size.
+    When ``compress`` is true the output is gzip encoded on the fly.
+    """
+    chunks = _ndjson_chunks(txs, fields, chunk_size) if fmt == 'ndjson' else _csv_chunks(txs, fields, chunk_size)
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode()
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
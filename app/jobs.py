@@ -0,0 +1,154 @@
+"""Durable push job queue backed by the push_job table.
+
+Jobs are claimed with a lease: a claimed job stays invisible to other
+workers until its lease expires, so a crashed worker's jobs are picked
+up again once the visibility timeout has passed.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from flask import url_for
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import PushJob, Transaction
+from app.push import push_stored_transaction, broadcast_stored_transaction
+
+VISIBILITY_TIMEOUT = 120
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 5
+
+
+def _active_job(network, txid):
+    return PushJob.query.filter(
+        PushJob.network == network,
+        PushJob.txid == txid,
+        PushJob.status.in_(('queued', 'running')),
+    ).first()
+
+
+def enqueue_push(tx, kind='check'):
+    """Queue a push of a stored transaction, reusing a pending job if any"""
+    job = _active_job(tx.network, tx.txid)
+    if job:
+        return job
+    job = PushJob(network=tx.network, txid=tx.txid, kind=kind)
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        # A concurrent request queued one since the lookup (unique active job index)
+        return _active_job(tx.network, tx.txid) or enqueue_push(tx, kind)
+    db.session.commit()
+    return job
+
+
+def job_accepted_payload(job):
+    """Response body for a request whose push was queued"""
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('main.api_get_job', network=job.network, job_id=job.id),
+    }
+
+
+def queue_depth():
+    """Number of jobs waiting to be claimed"""
+    return PushJob.query.filter_by(status='queued').count()
+
+
+def _claimable(now, max_attempts):
+    return or_(
+        and_(PushJob.status == 'queued', PushJob.available_at <= now),
+        and_(PushJob.status == 'running', PushJob.lease_expires_at < now, PushJob.attempts < max_attempts),
+    )
+
+
+def _fail_abandoned(now, max_attempts):
+    """Fail the jobs whose lease ran out on their last allowed attempt"""
+    result = json.dumps({'http_status': 504, 'response': {'error': f'Lease expired on attempt {max_attempts}'}})
+    db.session.execute(
+        update(PushJob)
+        .where(PushJob.status == 'running', PushJob.lease_expires_at < now, PushJob.attempts >= max_attempts)
+        .values(status='failed', result=result, lease_owner=None, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def claim_jobs(worker_id, limit=1, visibility_timeout=VISIBILITY_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+    """Lease up to ``limit`` jobs for ``worker_id`` and return them.
+
+    Each candidate is taken with a conditional UPDATE, so concurrent
+    workers never claim the same job even without row locks. Jobs whose
+    lease expired ``max_attempts`` times are failed instead.
+    """
+    now = datetime.utcnow()
+    _fail_abandoned(now, max_attempts)
+    candidates = [row.id for row in db.session.query(PushJob.id)
+                  .filter(_claimable(now, max_attempts))
+                  .order_by(PushJob.available_at, PushJob.id)
+                  .limit(limit * 4)]
+    claimed = []
+    for job_id in candidates:
+        result = db.session.execute(
+            update(PushJob)
+            .where(PushJob.id == job_id, _claimable(now, max_attempts))
+            .values(
+                status='running',
+                lease_owner=worker_id,
+                lease_expires_at=now + timedelta(seconds=visibility_timeout),
+                attempts=PushJob.attempts + 1,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            claimed.append(job_id)
+            if len(claimed) >= limit:
+                break
+    db.session.commit()
+    if not claimed:
+        return []
+    return PushJob.query.filter(PushJob.id.in_(claimed)).order_by(PushJob.id).all()
+
+
+def _finish(job, worker_id, **values):
+    """Update a job only if ``worker_id`` still holds its lease"""
+    result = db.session.execute(
+        update(PushJob)
+        .where(PushJob.id == job.id, PushJob.lease_owner == worker_id, PushJob.status == 'running')
+        .values(updated_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return bool(result.rowcount)
+
+
+def process_job(job, worker_id, max_attempts=MAX_ATTEMPTS):
+    """Run a claimed job and record its result"""
+    tx = Transaction.get_by_txid_and_network(job.txid, job.network)
+    if not tx:
+        result = {'http_status': 404, 'response': {'error': 'Transaction not found'}}
+        return _finish(job, worker_id, status='failed', result=json.dumps(result), lease_owner=None)
+
+    try:
+        if job.kind == 'broadcast':
+            payload, status_code = broadcast_stored_transaction(tx)
+        else:
+            payload, status_code = push_stored_transaction(tx)
+    except Exception as e:
+        db.session.rollback()
+        result = json.dumps({'http_status': 502, 'response': {'error': str(e)}})
+        if job.attempts >= max_attempts:
+            return _finish(job, worker_id, status='failed', result=result, lease_owner=None)
+        # Retry later with jittered exponential backoff
+        delay = random.uniform(0, RETRY_BACKOFF * (2 ** job.attempts))
+        return _finish(
+            job, worker_id, status='queued', result=result, lease_owner=None, lease_expires_at=None,
+            available_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+
+    result = json.dumps({'http_status': status_code, 'response': payload})
+    return _finish(job, worker_id, status='done', result=result, lease_owner=None)
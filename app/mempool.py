@@ -0,0 +1,537 @@
+"""Clients for the mempool.space backend of each network"""
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from app.network_config import get_broadcast_urls, get_mempool_url, VALID_NETWORKS
+from app.validation import compute_txid
+from app.cache import CachedMempoolClient, get_cache
+from app.metrics import UPSTREAM_LATENCY, UPSTREAM_ERRORS, record_push
+
+CONNECT_TIMEOUT = float(os.getenv('MEMPOOL_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('MEMPOOL_READ_TIMEOUT', '10'))
+RETRIES = int(os.getenv('MEMPOOL_RETRIES', '2'))
+BACKOFF = float(os.getenv('MEMPOOL_BACKOFF', '0.25'))
+POOL_SIZE = int(os.getenv('MEMPOOL_POOL_SIZE', '16'))
+# Upstream requests in flight per process (0 disables the cap)
+UPSTREAM_CONCURRENCY = int(os.getenv('UPSTREAM_CONCURRENCY', '64'))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', '5'))
+UPSTREAM_MAX_WAITING = int(os.getenv('UPSTREAM_MAX_WAITING', '256'))
+# How often a coroutine waiting for an upstream slot checks for a free one
+SLOT_POLL_INTERVAL = 0.005
+
+
+class MempoolError(Exception):
+    """The mempool backend could not be reached or kept failing"""
+
+
+class PackageNotSupported(MempoolError):
+    """The backend has no package submission endpoint"""
+
+
+class NotSent(MempoolError):
+    """The call failed before anything was sent to the backend"""
+
+
+class UpstreamBusy(NotSent):
+    """No upstream request slot became free in time"""
+
+
+class UpstreamLimiter:
+    """Cap the upstream requests in flight in this process.
+
+    Callers wait up to ``timeout`` for a slot; ``overloaded()`` tells the
+    web layer to shed new work while ``max_waiting`` callers are queued.
+    """
+
+    def __init__(self, limit=UPSTREAM_CONCURRENCY, timeout=UPSTREAM_QUEUE_TIMEOUT, max_waiting=UPSTREAM_MAX_WAITING):
+        self.limit = limit
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+
+    def overloaded(self):
+        return self._semaphore is not None and self.waiting >= self.max_waiting
+
+    def _busy(self):
+        return UpstreamBusy(f'All {self.limit} upstream request slots stayed busy for {self.timeout}s')
+
+    @contextmanager
+    def _held(self):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    @contextmanager
+    def slot(self):
+        if self._semaphore is None:
+            yield
+            return
+        with self._lock:
+            self.waiting += 1
+        try:
+            acquired = self._semaphore.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            raise self._busy()
+        with self._held():
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """slot() for coroutines: the same slots, waited for without blocking the event loop"""
+        if self._semaphore is None:
+            yield
+            return
+        if not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while not self._semaphore.acquire(blocking=False):
+                    if time.monotonic() >= deadline:
+                        raise self._busy()
+                    await asyncio.sleep(SLOT_POLL_INTERVAL)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        with self._held():
+            yield
+
+
+upstream_limiter = UpstreamLimiter()
+
+
+def _never_connected(error):
+    """Whether a requests connection error happened before the request went out"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class MempoolClient:
+    """HTTP client for an Esplora/mempool.space API with a persistent
+    connection pool, explicit timeouts and retries with jittered backoff.
+    """
+
+    def __init__(self, base_url, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE, network=''):
+        self.base_url = base_url.rstrip('/')
+        # Label of the upstream metrics
+        self.network = network
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter: spread retries of concurrent callers over the window
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def _request(self, method, path, endpoint, idempotent=True, **kwargs):
+        """Send a request, retrying connection errors and 5xx responses.
+
+        ``endpoint`` names the API call in the upstream metrics. A request
+        that is not ``idempotent`` is only retried while it never reached
+        the backend.
+        """
+        url = f'{self.base_url}{path}'
+        last_error = None
+        # Whether any attempt may have reached the backend
+        sent = False
+        labels = {'network': self.network, 'endpoint': endpoint}
+        for attempt in range(self.retries + 1):
+            if sent and not idempotent:
+                break
+            if attempt:
+                self._sleep_before_retry(attempt - 1)
+            started = time.perf_counter()
+            try:
+                with upstream_limiter.slot():
+                    response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.ReadTimeout as e:
+                UPSTREAM_ERRORS.inc(kind='read_timeout', **labels)
+                last_error = e
+                sent = True
+                continue
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                UPSTREAM_ERRORS.inc(kind='connection', **labels)
+                last_error = e
+                sent = sent or not _never_connected(e)
+                continue
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - started, **labels)
+            if response.status_code < 500:
+                return response
+            UPSTREAM_ERRORS.inc(kind='http_5xx', **labels)
+            last_error = f'HTTP {response.status_code}: {response.text}'
+            sent = True
+        raise (MempoolError if sent else NotSent)(f'{method} {url} failed: {last_error}')
+
+    def get_tx(self, txid):
+        """Return the upstream transaction JSON, or None if it is unknown"""
+        response = self._request('GET', f'/api/tx/{txid}', 'tx')
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise MempoolError(f'Unexpected status {response.status_code}: {response.text}')
+        return response.json()
+
+    def get_tx_hex(self, txid):
+        """Return the raw transaction hex, or None if it is unknown"""
+        response = self._request('GET', f'/api/tx/{txid}/hex', 'tx_hex')
+        return response.text if response.status_code == 200 else None
+
+    def _get_ok(self, path, endpoint):
+        response = self._request('GET', path, endpoint)
+        if response.status_code != 200:
+            raise MempoolError(f'Unexpected status {response.status_code}: {response.text}')
+        return response
+
+    def get_tip_height(self):
+        """Height of the current chain tip"""
+        return int(self._get_ok('/api/blocks/tip/height', 'tip_height').text)
+
+    def get_block_hash(self, height):
+        """Hash of the block at ``height`` in the current best chain"""
+        return self._get_ok(f'/api/block-height/{height}', 'block_hash').text.strip()
+
+    def get_block_txids(self, block_hash):
+        """All txids of a block, in block order"""
+        return self._get_ok(f'/api/block/{block_hash}/txids', 'block_txids').json()
+
+    def get_mempool_txids(self):
+        """Txids of every transaction currently in the mempool"""
+        return self._get_ok('/api/mempool/txids', 'mempool_txids').json()
+
+    def broadcast(self, raw_tx):
+        """Broadcast a raw transaction, returning ``(accepted, response_text)``"""
+        # A timeout, a dropped connection or a 5xx may come after the node
+        # accepted the transaction, so only retry when it was never sent
+        response = self._request(
+            'POST', '/api/tx', 'broadcast', idempotent=False,
+            data=raw_tx, headers={'Content-Type': 'text/plain'},
+        )
+        return response.status_code == 200, response.text
+
+    def broadcast_package(self, raw_txs):
+        """Submit parents and children together (bitcoind ``submitpackage``)
+
+        ``raw_txs`` must be in topological order. Returns one
+        ``(accepted, response_text)`` per transaction, in the same order.
+        """
+        response = self._request('POST', '/api/txs/package', 'broadcast_package',
+                                 idempotent=False, json=raw_txs)
+        if response.status_code in (404, 405, 501):
+            raise PackageNotSupported(f'{self.base_url} does not accept packages')
+        if response.status_code != 200:
+            return [(False, response.text)] * len(raw_txs)
+        return package_outcomes(raw_txs, response.json())
+
+
+def package_outcomes(raw_txs, result):
+    """Per-transaction ``(accepted, response_text)`` of a submitpackage result"""
+    if result.get('package_msg') == 'success':
+        return [(True, compute_txid(raw_tx)) for raw_tx in raw_txs]
+    by_txid = {entry.get('txid'): entry for entry in result.get('tx-results', {}).values()}
+    outcomes = []
+    for raw_tx in raw_txs:
+        txid = compute_txid(raw_tx)
+        entry = by_txid.get(txid)
+        if entry is None:
+            outcomes.append((False, f"submitpackage error: {result.get('package_msg')}"))
+        elif entry.get('error'):
+            outcomes.append((False, f"submitpackage error: {entry['error']}"))
+        else:
+            outcomes.append((True, txid))
+    return outcomes
+
+
+class FakeMempoolBackend:
+    """In-process stand-in for MempoolClient, for tests and benchmarks.
+
+    Transactions are kept in memory; ``reject_with`` makes every broadcast
+    fail with the given message and ``fail_with`` raises MempoolError.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.transactions = {}
+        self.confirmed = set()
+        self.broadcasts = []
+        self.blocks = []
+        self.reject_with = None
+        self.fail_with = None
+        self._lock = threading.Lock()
+
+    def _call(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_with:
+            raise MempoolError(self.fail_with)
+
+    def add_tx(self, raw_tx, confirmed=False):
+        """Make a transaction known upstream and return its txid"""
+        txid = compute_txid(raw_tx)
+        with self._lock:
+            self.transactions[txid] = raw_tx
+            if confirmed:
+                self.confirmed.add(txid)
+        return txid
+
+    def confirm(self, txid):
+        with self._lock:
+            self.confirmed.add(txid)
+
+    def mine(self, txids=None):
+        """Append a block confirming ``txids`` (default: every unconfirmed
+        known transaction) and return its hash"""
+        with self._lock:
+            if txids is None:
+                txids = [txid for txid in self.transactions if txid not in self.confirmed]
+            self.confirmed.update(txids)
+            block_hash = hashlib.sha256(f'{len(self.blocks)}:{",".join(txids)}'.encode()).hexdigest()
+            self.blocks.append((block_hash, list(txids)))
+        return block_hash
+
+    def reorg(self, depth=1):
+        """Drop the last ``depth`` blocks, their transactions going back to the mempool"""
+        with self._lock:
+            for _, txids in self.blocks[-depth:]:
+                self.confirmed.difference_update(txids)
+            del self.blocks[-depth:]
+
+    def get_tip_height(self):
+        self._call()
+        return len(self.blocks) - 1
+
+    def get_block_hash(self, height):
+        self._call()
+        if not 0 <= height < len(self.blocks):
+            raise MempoolError(f'Block height {height} out of range')
+        return self.blocks[height][0]
+
+    def get_block_txids(self, block_hash):
+        self._call()
+        for candidate, txids in self.blocks:
+            if candidate == block_hash:
+                return list(txids)
+        raise MempoolError(f'Unknown block {block_hash}')
+
+    def get_mempool_txids(self):
+        self._call()
+        with self._lock:
+            return [txid for txid in self.transactions if txid not in self.confirmed]
+
+    def evict(self, txids=None):
+        """Drop unconfirmed transactions (default: all of them) as if the
+        mempool had evicted them, returning their txids"""
+        with self._lock:
+            if txids is None:
+                txids = [txid for txid in self.transactions if txid not in self.confirmed]
+            evicted = [txid for txid in txids if txid in self.transactions and txid not in self.confirmed]
+            for txid in evicted:
+                del self.transactions[txid]
+        return evicted
+
+    def get_tx(self, txid):
+        self._call()
+        if txid not in self.transactions:
+            return None
+        return {'txid': txid, 'status': {'confirmed': txid in self.confirmed}}
+
+    def get_tx_hex(self, txid):
+        self._call()
+        return self.transactions.get(txid)
+
+    def broadcast(self, raw_tx):
+        self._call()
+        with self._lock:
+            self.broadcasts.append(raw_tx)
+        if self.reject_with:
+            return False, self.reject_with
+        return True, self.add_tx(raw_tx)
+
+    def broadcast_package(self, raw_txs):
+        self._call()
+        with self._lock:
+            self.broadcasts.extend(raw_txs)
+        if self.reject_with:
+            return [(False, self.reject_with)] * len(raw_txs)
+        return [(True, self.add_tx(raw_tx)) for raw_tx in raw_txs]
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_client_factory = None
+# Networks whose backend answered that it has no package endpoint
+_no_package_support = set()
+
+
+def get_client(network):
+    """Return the shared client of a network, creating it on first use"""
+    if network not in VALID_NETWORKS:
+        raise ValueError(f"Invalid network: {network}. Valid networks are: {VALID_NETWORKS}")
+    with _clients_lock:
+        if network not in _clients:
+            factory = _client_factory or _default_client
+            _clients[network] = factory(network)
+        return _clients[network]
+
+
+def _default_client(network):
+    """A pooled client for the network, fanning broadcasts out to the extra
+    targets and behind the upstream cache, when configured"""
+    client = MempoolClient(get_mempool_url(network), network=network)
+    targets = get_broadcast_urls(network)
+    if targets:
+        from app.broadcast import FanoutClient
+        client = FanoutClient(client, network, targets)
+    cache = get_cache()
+    return CachedMempoolClient(client, network, cache) if cache is not None else client
+
+
+def set_client_factory(factory):
+    """Install a ``factory(network) -> client`` (None restores the default).
+
+    Existing clients are dropped, e.g.
+    ``set_client_factory(lambda network: FakeMempoolBackend())``.
+    """
+    global _client_factory
+    with _clients_lock:
+        _client_factory = factory
+        _clients.clear()
+        _no_package_support.clear()
+
+
+def check_and_push(network, txid, raw_tx):
+    """Check a transaction on the mempool backend and broadcast it if unknown.
+
+    Returns a ``(status, analysis_result, attempted)`` tuple where
+    ``attempted`` tells whether a broadcast was actually sent.
+    Network errors are propagated to the caller, as NotSent when no
+    broadcast went out.
+    """
+    try:
+        result = _check_and_push(get_client(network), txid, raw_tx)
+    except Exception:
+        record_push(network, 'error', False)
+        raise
+    record_push(network, result[0], result[2])
+    return result
+
+
+def check_and_push_package(network, items, parents):
+    """Check and push a group of dependent transactions, parents first.
+
+    ``items`` are ``(txid, raw_tx)`` pairs in topological order and
+    ``parents`` maps a txid to the txids of the group it spends from.
+    The transactions unknown upstream are submitted as one package when
+    the backend supports it, otherwise one by one; children of a
+    transaction that was not accepted or could not be checked are not
+    sent. Returns ``(txid, status, analysis_result, attempted)`` tuples
+    in order.
+    """
+    client = get_client(network)
+    outcomes = {}
+    unknown = []
+    for txid, raw_tx in items:
+        try:
+            status_data = client.get_tx(txid)
+        except Exception as e:
+            outcomes[txid] = ('error', str(e), False)
+            continue
+        if status_data is None:
+            unknown.append((txid, raw_tx))
+        elif status_data.get('status', {}).get('confirmed'):
+            outcomes[txid] = ('confirmed', 'Transaction is already confirmed in the blockchain', False)
+        else:
+            outcomes[txid] = ('success', 'Transaction is already present in mempool', False)
+
+    # Children of a transaction that could not be checked would be sent
+    # without knowing whether their inputs exist: retry them with it later
+    unchecked = {txid for txid, (status, _, _) in outcomes.items() if status == 'error'}
+    ready = []
+    for txid, raw_tx in unknown:
+        parent = next((parent for parent in parents.get(txid, ()) if parent in unchecked), None)
+        if parent is None:
+            ready.append((txid, raw_tx))
+        else:
+            unchecked.add(txid)
+            outcomes[txid] = ('error', f'Parent transaction {parent} could not be checked', False)
+    unknown = ready
+
+    if len(unknown) > 1 and network not in _no_package_support and hasattr(client, 'broadcast_package'):
+        try:
+            accepted = client.broadcast_package([raw_tx for _, raw_tx in unknown])
+        except PackageNotSupported:
+            _no_package_support.add(network)
+        except Exception as e:
+            accepted = [e] * len(unknown)
+        if network not in _no_package_support:
+            for (txid, _), outcome in zip(unknown, accepted):
+                if isinstance(outcome, Exception):
+                    outcomes[txid] = ('error', str(outcome), not isinstance(outcome, NotSent))
+                else:
+                    outcomes[txid] = ('success' if outcome[0] else 'failed', outcome[1], True)
+            unknown = []
+
+    for txid, raw_tx in unknown:
+        missing = [parent for parent in parents.get(txid, ()) if outcomes.get(parent, ('failed',))[0] not in
+                   ('success', 'confirmed')]
+        if missing:
+            outcomes[txid] = ('failed', f'Parent transaction {missing[0]} was not accepted', False)
+            continue
+        try:
+            accepted, response_text = client.broadcast(raw_tx)
+            outcomes[txid] = ('success' if accepted else 'failed', response_text, True)
+        except Exception as e:
+            outcomes[txid] = ('error', str(e), not isinstance(e, NotSent))
+
+    results = []
+    for txid, _ in items:
+        status, analysis_result, attempted = outcomes[txid]
+        record_push(network, status, attempted)
+        results.append((txid, status, analysis_result, attempted))
+    return results
+
+
+def _check_and_push(client, txid, raw_tx):
+    # First check if transaction is already known upstream
+    try:
+        status_data = client.get_tx(txid)
+    except NotSent:
+        raise
+    except Exception as e:
+        # Nothing was broadcast yet
+        raise NotSent(str(e)) from e
+    if status_data is not None:
+        if status_data.get('status', {}).get('confirmed'):
+            return 'confirmed', 'Transaction is already confirmed in the blockchain', False
+        return 'success', 'Transaction is already present in mempool', False
+
+    # Unknown upstream, proceed with pushing
+    accepted, response_text = client.broadcast(raw_tx)
+    return ('success' if accepted else 'failed'), response_text, True
@@ -0,0 +1,482 @@
+"""Prometheus-style metrics: counters, gauges and histograms rendered in the
+text exposition format on ``/metrics`` or to a file for the CLI scripts.
+
+Metrics are kept per process. When METRICS_DIR is set (gunicorn.conf.py
+sets it for its workers) every process writes a snapshot of its metrics
+there, and ``/metrics`` adds up the counters and histograms of all of them,
+so whichever worker answers a scrape reports the totals of the server.
+Gauges of process state are reported per process with a ``pid`` label.
+"""
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+# Directory of the snapshots of the processes /metrics aggregates (unset: this process only)
+METRICS_DIR = os.getenv('METRICS_DIR')
+# Seconds between two snapshots of a process
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# Counts of the processes that exited, folded into one file
+ARCHIVE_FILE = 'archive.json'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+    # How the samples of several processes combine: 'sum', 'pid' (a series
+    # per process, labelled with its pid) or 'local' (the scraping process only)
+    multiprocess = 'sum'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, multiprocess=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        if multiprocess:
+            self.multiprocess = multiprocess
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def values(self):
+        """``{label_values: value}`` of this process"""
+        with self._lock:
+            return dict(self._values)
+
+    def combine(self, value, other):
+        """Value of a series over two processes"""
+        return value + other
+
+    def samples(self, values=None):
+        """``(suffix, label_values, extra_labels, value)`` tuples to render"""
+        values = self.values() if values is None else values
+        return [('', key, (), value) for key, value in values.items()]
+
+    def render(self, values=None, labelnames=None):
+        labelnames = labelnames or self.labelnames
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, key, extra, value in self.samples(values):
+            lines.append(f'{self.name}{suffix}{_format_labels(labelnames, key, extra)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down; ``function`` computes it at render time"""
+    kind = 'gauge'
+    multiprocess = 'pid'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, function=None, multiprocess=None):
+        super().__init__(name, documentation, labelnames, registry, multiprocess)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def values(self):
+        if self.function is None:
+            return super().values()
+        try:
+            values = self.function()
+        except Exception:
+            # A failing collector must not break the whole scrape
+            return {}
+        if not isinstance(values, dict):
+            values = {(): values}
+        return {tuple(str(v) for v in key): value for key, value in values.items()}
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def values(self):
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    def combine(self, value, other):
+        return [a + b for a, b in zip(value[0], other[0])], value[1] + other[1]
+
+    def samples(self, values=None):
+        values = self.values() if values is None else values
+        samples = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(('_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics)
+
+    def render(self, merged=None):
+        """All metrics in the Prometheus text exposition format
+
+        ``merged`` holds the ``{name: {label_values: value}}`` of several
+        processes, see read_snapshots(); by default this process is rendered.
+        """
+        lines = []
+        for metric in self.metrics():
+            if merged is None or metric.multiprocess == 'local':
+                lines.extend(metric.render())
+            elif metric.multiprocess == 'pid':
+                lines.extend(metric.render(merged.get(metric.name, {}), metric.labelnames + ('pid',)))
+            else:
+                lines.extend(metric.render(merged.get(metric.name, {})))
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """JSON-serializable values of this process for the other processes to merge"""
+        return {metric.name: [[list(key), value] for key, value in metric.values().items()]
+                for metric in self.metrics() if metric.multiprocess != 'local'}
+
+    def write_textfile(self, path):
+        """Atomically write the metrics for the node_exporter textfile collector"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _write_json(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _locked(directory):
+    """Hold the lock of a snapshot directory while its files are read or folded"""
+    with open(os.path.join(directory, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _add_snapshot(merged, snapshot, registry, pid=None):
+    """Add a snapshot to ``merged``; per-process series only when ``pid`` is given"""
+    metrics = {metric.name: metric for metric in registry.metrics()}
+    for name, series in snapshot.items():
+        metric = metrics.get(name)
+        if metric is None or metric.multiprocess == 'local' or (metric.multiprocess == 'pid' and pid is None):
+            continue
+        values = merged.setdefault(name, {})
+        for key, value in series:
+            key = tuple(key) + ((str(pid),) if metric.multiprocess == 'pid' else ())
+            values[key] = metric.combine(values[key], value) if key in values else value
+
+
+def _archive(directory, paths, registry):
+    """Fold the counts of exited processes into the archive and drop their files"""
+    archive = {}
+    _add_snapshot(archive, _read_json(os.path.join(directory, ARCHIVE_FILE)) or {}, registry)
+    for path in paths:
+        _add_snapshot(archive, (_read_json(path) or {}).get('metrics', {}), registry)
+    _write_json(os.path.join(directory, ARCHIVE_FILE),
+                {name: [[list(key), value] for key, value in values.items()] for name, values in archive.items()})
+    for path in paths:
+        os.remove(path)
+
+
+def _snapshot_files(directory):
+    """``{pid: path}`` of the process snapshots in ``directory``"""
+    return {int(os.path.basename(path)[:-len('.json')]): path
+            for path in glob.glob(os.path.join(directory, '[0-9]*.json'))}
+
+
+def write_snapshot(directory=None, registry=None):
+    """Write the metrics of this process to the snapshot directory"""
+    directory = directory or METRICS_DIR
+    registry = registry or REGISTRY
+    _write_json(os.path.join(directory, f'{os.getpid()}.json'), {'pid': os.getpid(), 'metrics': registry.snapshot()})
+
+
+def read_snapshots(directory=None, registry=None):
+    """``{name: {label_values: value}}`` of every process of the snapshot directory
+
+    Counters and histograms are summed, including those of exited
+    processes; gauges are only kept for live processes, keyed by pid.
+    """
+    directory = directory or METRICS_DIR
+    registry = registry or REGISTRY
+    merged = {}
+    with _locked(directory):
+        files = _snapshot_files(directory)
+        exited = [path for pid, path in files.items() if pid != os.getpid() and not _alive(pid)]
+        if exited:
+            _archive(directory, exited, registry)
+        _add_snapshot(merged, _read_json(os.path.join(directory, ARCHIVE_FILE)) or {}, registry)
+        for pid, path in files.items():
+            if path not in exited:
+                _add_snapshot(merged, (_read_json(path) or {}).get('metrics', {}), registry, pid=pid)
+    return merged
+
+
+def render_metrics():
+    """Metrics of this process or, with METRICS_DIR set, of every process writing there"""
+    if not METRICS_DIR:
+        return REGISTRY.render()
+    write_snapshot()
+    return REGISTRY.render(read_snapshots())
+
+
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def start_flusher(directory=None, interval=FLUSH_INTERVAL):
+    """Write a snapshot of this process every ``interval`` seconds
+
+    A snapshot left under this pid by an exited process is archived first.
+    """
+    global _flusher_pid
+    directory = directory or METRICS_DIR
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    os.makedirs(directory, exist_ok=True)
+    with _locked(directory):
+        stale = _snapshot_files(directory).get(os.getpid())
+        if stale:
+            _archive(directory, [stale], REGISTRY)
+
+    def flush():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot(directory)
+            except OSError:
+                pass
+
+    threading.Thread(target=flush, name='metrics-flush', daemon=True).start()
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = Counter(
+    'mempush_http_requests_total', 'HTTP requests by route, network and status code',
+    ('method', 'route', 'network', 'status'))
+HTTP_LATENCY = Histogram(
+    'mempush_http_request_duration_seconds', 'HTTP request latency by route and network',
+    ('method', 'route', 'network'))
+UPSTREAM_LATENCY = Histogram(
+    'mempush_upstream_request_duration_seconds', 'Mempool backend request latency by endpoint',
+    ('network', 'endpoint'))
+UPSTREAM_ERRORS = Counter(
+    'mempush_upstream_errors_total', 'Failed mempool backend requests by endpoint and error kind',
+    ('network', 'endpoint', 'kind'))
+DB_QUERY_LATENCY = Histogram(
+    'mempush_db_query_duration_seconds', 'Database statement latency by statement type',
+    ('operation',), buckets=DB_BUCKETS)
+STAGE_LATENCY = Histogram(
+    'mempush_stage_duration_seconds', 'Latency of internal processing stages',
+    ('stage',))
+BROADCAST_LATENCY = Histogram(
+    'mempush_broadcast_backend_duration_seconds', 'Broadcast latency per fan-out backend and outcome',
+    ('network', 'backend', 'outcome'))
+BROADCAST_WINS = Counter(
+    'mempush_broadcast_wins_total', 'Fan-out broadcasts won by each backend',
+    ('network', 'backend'))
+EVICTIONS = Counter(
+    'mempush_evictions_total', 'Accepted transactions found missing from the mempool',
+    ('network',))
+ADMISSION_REJECTED = Counter(
+    'mempush_admission_rejected_total', 'Submission requests turned away by network and reason',
+    ('network', 'reason'))
+RATE_LIMIT_ERRORS = Counter(
+    'mempush_rate_limit_errors_total', 'Requests admitted unchecked because the shared rate limit store failed',
+    ('network',))
+PUSH_RESULTS = Counter(
+    'mempush_push_results_total', 'Push outcomes by network and status',
+    ('network', 'status', 'attempted'))
+
+
+def _queue_depth():
+    from app.jobs import queue_depth
+    return queue_depth()
+
+
+def _cache_lookups():
+    from app.cache import get_cache
+    cache = get_cache()
+    if cache is None:
+        return {}
+    return {
+        (network, result): count
+        for network, counters in list(cache.counters.items())
+        for result, count in counters.items()
+    }
+
+
+def _upstream_slots():
+    from app.mempool import upstream_limiter
+    return {('in_flight',): upstream_limiter.in_flight, ('waiting',): upstream_limiter.waiting}
+
+
+def _backend_health():
+    from app.broadcast import all_backend_health
+    return {(health.network, health.name): 1 if health.available() else 0 for health in all_backend_health()}
+
+
+# Read from the database, the same for every process
+QUEUE_DEPTH = Gauge('mempush_push_queue_depth', 'Push jobs waiting to be claimed', function=_queue_depth,
+                  multiprocess='local')
+CACHE_LOOKUPS = Gauge(
+    'mempush_cache_lookups', 'Upstream cache lookups by network and result since start',
+    ('network', 'result'), function=_cache_lookups)
+UPSTREAM_SLOTS = Gauge(
+    'mempush_upstream_requests', 'Upstream requests in flight or waiting for a slot in this process',
+    ('state',), function=_upstream_slots)
+BACKEND_HEALTHY = Gauge(
+    'mempush_broadcast_backend_healthy', 'Whether a fan-out broadcast backend is currently used (1) or skipped (0)',
+    ('network', 'backend'), function=_backend_health)
+
+
+def record_push(network, status, attempted):
+    PUSH_RESULTS.inc(network=network, status=status, attempted='true' if attempted else 'false')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+    DB_QUERY_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _query_failed(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_started'):
+        conn.info['query_started'].pop()
+
+
+def record_request(method, route, network, status, latency):
+    """Count a served request and its latency"""
+    from app.network_config import is_valid_network
+
+    if network and not is_valid_network(network):
+        network = 'invalid'
+    HTTP_LATENCY.observe(latency, method=method, route=route, network=network)
+    HTTP_REQUESTS.inc(method=method, route=route, network=network, status=status)
+
+
+def init_app(app):
+    """Time every request by route and network"""
+
+    @app.before_request
+    def _start_timer():
+        if METRICS_DIR:
+            start_flusher()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        network = (request.view_args or {}).get('network', '')
+        record_request(request.method, route, network, response.status_code, time.perf_counter() - started)
+        return response
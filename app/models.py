@@ -1,10 +1,60 @@
 from app import db
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only, selectinload
+from app.blobs import pack_raw_tx, unpack_raw_tx
 from app.network_config import VALID_NETWORKS, is_valid_network
+from app.validation import decode_raw_tx, InvalidTransaction
+
+# Fields returned by Transaction.to_dict(), in order
+TRANSACTION_FIELDS = ('id', 'raw_tx', 'txid', 'network', 'status', 'created_at',
+                      'updated_at', 'push_attempts', 'analysis_result', 'failure_class', 'next_attempt_at',
+                      'size', 'vsize', 'weight', 'input_count', 'output_count', 'output_value', 'fee', 'fee_rate',
+                      'evicted_at', 'eviction_count')
+
+# Decoded once when the raw transaction is stored, see decoded_fields()
+DECODED_FIELDS = ('size', 'vsize', 'weight', 'input_count', 'output_count', 'output_value')
+
+# Orders accepted by Transaction.page_by_network(), newest or highest first
+SORT_KEYS = ('created_at', 'fee_rate')
+
+# Fields used by list views: everything except the raw transaction and analysis text
+LIST_FIELDS = tuple(f for f in TRANSACTION_FIELDS if f not in ('raw_tx', 'analysis_result'))
+
+
+def encode_cursor(value, id):
+    """Encode a (sort value, id) keyset position as an opaque cursor"""
+    value = value.isoformat() if isinstance(value, datetime) else repr(value)
+    return urlsafe_b64encode(f'{value}|{id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort='created_at'):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, id = urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(value) if sort == 'created_at' else float(value), int(id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def decoded_fields(summary):
+    """Persisted fields of a decoded TxSummary (all None if it could not be decoded)"""
+    if summary is None:
+        return dict.fromkeys(DECODED_FIELDS)
+    return {
+        'size': summary.size,
+        'vsize': summary.vsize,
+        'weight': summary.weight,
+        'input_count': len(summary.inputs),
+        'output_count': len(summary.outputs),
+        'output_value': sum(output.value for output in summary.outputs),
+    }
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    raw_tx = db.Column(db.Text(), nullable=False)
     txid = db.Column(db.String(64), nullable=False)
     network = db.Column(db.String(20), nullable=False, default='mainchain')
     status = db.Column(db.String(20), default='pending')
@@ -12,8 +62,55 @@ class Transaction(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     push_attempts = db.Column(db.Integer, default=0)
     analysis_result = db.Column(db.Text)
+    # 'retryable' or 'terminal' after a failed push, see app.scheduling
+    failure_class = db.Column(db.String(20))
+    # When the transaction is next due for a rebroadcast; NULL once confirmed or parked
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Decoded at submit time so list views never parse raw transactions
+    size = db.Column(db.Integer)
+    vsize = db.Column(db.Integer)
+    weight = db.Column(db.Integer)
+    input_count = db.Column(db.Integer)
+    output_count = db.Column(db.Integer)
+    # Satoshis; the fee is only known once every spent output is stored too
+    output_value = db.Column(db.BigInteger)
+    fee = db.Column(db.BigInteger)
+    # sat/vB
+    fee_rate = db.Column(db.Float)
+    # Last time an accepted transaction was found missing from the mempool
+    evicted_at = db.Column(db.DateTime)
+    eviction_count = db.Column(db.Integer, default=0)
+    # Block a confirmed transaction was found in, to revert it if a reorg drops that block
+    block_height = db.Column(db.Integer)
+    block_hash = db.Column(db.String(64))
+    # The raw transaction lives in a side table, loaded only when needed
+    blob = db.relationship('TransactionBlob', uselist=False, lazy='select', cascade='all, delete-orphan')
+    # Outpoints spent by the transaction, to push parents before children
+    inputs = db.relationship('TransactionInput', lazy='select', cascade='all, delete-orphan',
+                             order_by='TransactionInput.vin')
+    # Append-only history of submissions, pushes and state changes
+    events = db.relationship('TransactionEvent', lazy='select', cascade='all, delete-orphan',
+                             order_by='TransactionEvent.id', back_populates='transaction')
 
-    __table_args__ = (db.UniqueConstraint('txid', 'network', name='_txid_network_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('txid', 'network', name='_txid_network_uc'),
+        # Newest-first listing and keyset pagination per network
+        db.Index('ix_transaction_network_created_at', 'network', 'created_at', 'id'),
+        # Rebroadcast scans by status, least recently updated first
+        db.Index('ix_transaction_network_status_updated_at', 'network', 'status', 'updated_at'),
+        # Covers the grouped stats query so it never touches the table rows
+        db.Index('ix_transaction_network_stats', 'network', 'status', 'push_attempts', 'created_at'),
+        # Incremental exports ordered by last update
+        db.Index('ix_transaction_network_updated_at', 'network', 'updated_at', 'id'),
+        # Rebroadcast picks only due rows
+        db.Index('ix_transaction_next_attempt_at', 'next_attempt_at', 'network'),
+        # Listing and filtering by fee rate
+        db.Index('ix_transaction_network_fee_rate', 'network', 'fee_rate', 'id'),
+        # Hourly rollup of evictions
+        db.Index('ix_transaction_network_evicted_at', 'network', 'evicted_at'),
+        # Confirmations rescanned after a reorg
+        db.Index('ix_transaction_network_block_height', 'network', 'block_height'),
+    )
 
     def __init__(self, **kwargs):
         # Validate network if provided
@@ -23,18 +120,47 @@ class Transaction(db.Model):
                 raise ValueError(f"Invalid network: {network}. Valid networks are: {VALID_NETWORKS}")
         super(Transaction, self).__init__(**kwargs)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'raw_tx': self.raw_tx,
-            'txid': self.txid,
-            'network': self.network,
-            'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'push_attempts': self.push_attempts,
-            'analysis_result': self.analysis_result
-        } 
+    @property
+    def raw_tx(self):
+        """Raw transaction hex, decoded from the blob table on first access"""
+        if self.blob is None:
+            return None
+        return unpack_raw_tx(self.blob.codec, self.blob.data)
+
+    @raw_tx.setter
+    def raw_tx(self, raw_tx):
+        codec, data = pack_raw_tx(raw_tx)
+        if self.blob is None:
+            self.blob = TransactionBlob(codec=codec, data=data)
+        else:
+            self.blob.codec, self.blob.data = codec, data
+        try:
+            summary = decode_raw_tx(raw_tx)
+        except InvalidTransaction:
+            summary = None
+        self.inputs = [TransactionInput(vin=vin, prev_txid=tx_input.prev_txid, prev_vout=tx_input.prev_vout)
+                       for vin, tx_input in enumerate(summary.inputs if summary else ())]
+        for field, value in decoded_fields(summary).items():
+            setattr(self, field, value)
+
+    @classmethod
+    def load_options(cls, fields, always=('id',)):
+        """Loader options fetching only ``fields``, with blobs batch-loaded if needed"""
+        columns = (set(fields) | set(always)) - {'raw_tx'}
+        options = [load_only(*(getattr(cls, field) for field in columns))]
+        if 'raw_tx' in fields:
+            options.append(selectinload(cls.blob))
+        return options
+
+    def to_dict(self, fields=None):
+        """Serialize the transaction, optionally restricted to ``fields``"""
+        data = {}
+        for field in fields or TRANSACTION_FIELDS:
+            value = getattr(self, field)
+            if field in ('created_at', 'updated_at', 'next_attempt_at', 'evicted_at') and value is not None:
+                value = value.isoformat()
+            data[field] = value
+        return data
 
     @classmethod
     def get_by_network(cls, network):
@@ -43,6 +169,41 @@ class Transaction(db.Model):
             raise ValueError(f"Invalid network: {network}. Valid networks are: {VALID_NETWORKS}")
         return cls.query.filter_by(network=network).order_by(cls.created_at.desc())
 
+    @classmethod
+    def page_by_network(cls, network, limit, cursor=None, status=None, fields=None,
+                        sort='created_at', min_fee_rate=None, max_fee_rate=None):
+        """Get one page of transactions for a network, newest (or highest fee rate) first.
+
+        Pages are keyed on (sort key, id) so every page is an index range
+        scan; sorting by fee rate leaves out transactions with an unknown
+        fee. Returns the page and the cursor of the next one (or None).
+        """
+        if not is_valid_network(network):
+            raise ValueError(f"Invalid network: {network}. Valid networks are: {VALID_NETWORKS}")
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+        key = getattr(cls, sort)
+        query = cls.query.filter_by(network=network)
+        if status:
+            query = query.filter_by(status=status)
+        if sort == 'fee_rate':
+            query = query.filter(cls.fee_rate.isnot(None))
+        if min_fee_rate is not None:
+            query = query.filter(cls.fee_rate >= min_fee_rate)
+        if max_fee_rate is not None:
+            query = query.filter(cls.fee_rate <= max_fee_rate)
+        if fields:
+            query = query.options(*cls.load_options(fields, always=('id', sort)))
+        if cursor:
+            value, id = decode_cursor(cursor, sort)
+            query = query.filter(or_(key < value, and_(key == value, cls.id < id)))
+        txs = query.order_by(key.desc(), cls.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(txs) > limit:
+            txs = txs[:limit]
+            next_cursor = encode_cursor(getattr(txs[-1], sort), txs[-1].id)
+        return txs, next_cursor
+
     @classmethod
     def get_by_txid_and_network(cls, txid, network):
         """Get a transaction by txid and network"""
@@ -62,4 +223,191 @@ class Transaction(db.Model):
         return self.network == network
 
     def __repr__(self):
-        return f'<Transaction {self.txid[:16]}... on {self.network}>' 
\ No newline at end of file
+        return f'<Transaction {self.txid[:16]}... on {self.network}>'
+
+class TransactionBlob(db.Model):
+    """Raw transaction bytes of a Transaction, see app.blobs"""
+    __tablename__ = 'transaction_blob'
+
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id', ondelete='CASCADE'), primary_key=True)
+    # 'raw', 'zlib' or 'zstd' ('text' for legacy rows that were not hex)
+    codec = db.Column(db.String(10), nullable=False, default='raw')
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f'<TransactionBlob {self.transaction_id} {self.codec} {len(self.data)} bytes>'
+
+class TransactionInput(db.Model):
+    """An outpoint spent by a stored Transaction"""
+    __tablename__ = 'transaction_input'
+
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id', ondelete='CASCADE'), primary_key=True)
+    vin = db.Column(db.Integer, primary_key=True)
+    prev_txid = db.Column(db.String(64), nullable=False)
+    prev_vout = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        # Finds the stored children of a transaction
+        db.Index('ix_transaction_input_prev_txid', 'prev_txid'),
+    )
+
+    def __repr__(self):
+        return f'<TransactionInput {self.transaction_id}:{self.vin} spends {self.prev_txid[:16]}...:{self.prev_vout}>'
+
+class TransactionEvent(db.Model):
+    """One thing that happened to a stored Transaction, never updated, see app.audit"""
+    __tablename__ = 'transaction_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # 'submit', 'check', 'push', 'confirm' or 'evict'
+    kind = db.Column(db.String(20), nullable=False)
+    # Status of the transaction after the event
+    status = db.Column(db.String(20))
+    # Backend that answered, for checks and pushes
+    backend = db.Column(db.String(255))
+    # Seconds spent talking to the backend
+    latency = db.Column(db.Float)
+    response = db.Column(db.Text)
+    transaction = db.relationship('Transaction', back_populates='events')
+
+    __table_args__ = (
+        # History of one transaction, oldest first
+        db.Index('ix_transaction_event_transaction_id', 'transaction_id', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'kind': self.kind,
+            'status': self.status,
+            'backend': self.backend,
+            'latency': self.latency,
+            'response': self.response,
+        }
+
+    def __repr__(self):
+        return f'<TransactionEvent {self.transaction_id} {self.kind} {self.status}>'
+
+class NetworkCounter(db.Model):
+    """Materialized per-network, per-status transaction counters"""
+    __tablename__ = 'network_counter'
+
+    network = db.Column(db.String(20), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    tx_count = db.Column(db.Integer, nullable=False, default=0)
+    attempted_count = db.Column(db.Integer, nullable=False, default=0)
+    push_attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<NetworkCounter {self.network}/{self.status}: {self.tx_count}>'
+
+
+class HourlyStats(db.Model):
+    """Per-network activity rolled up by hour, see app.stats.rollup_stats"""
+    __tablename__ = 'hourly_stats'
+
+    network = db.Column(db.String(20), primary_key=True)
+    # Start of the hour, UTC
+    hour = db.Column(db.DateTime, primary_key=True)
+    submitted = db.Column(db.Integer, nullable=False, default=0)
+    accepted = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Integer, nullable=False, default=0)
+    confirmed = db.Column(db.Integer, nullable=False, default=0)
+    evicted = db.Column(db.Integer, nullable=False, default=0)
+    # Sum of the submit-to-confirmation delays of the confirmed transactions
+    confirmation_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<HourlyStats {self.network} {self.hour.isoformat()}>'
+
+
+class PushJob(db.Model):
+    """A queued push of a stored transaction, drained by scripts/push_worker.py"""
+    __tablename__ = 'push_job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    network = db.Column(db.String(20), nullable=False)
+    txid = db.Column(db.String(64), nullable=False)
+    # 'check' looks the transaction up before pushing, 'broadcast' pushes directly
+    kind = db.Column(db.String(20), nullable=False, default='check')
+    # queued -> running -> done | failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = db.Column(db.String(64))
+    lease_expires_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_push_job_status_available_at', 'status', 'available_at'),
+        db.Index('ix_push_job_network_txid', 'network', 'txid'),
+        # At most one queued or running job per transaction
+        db.Index('uq_push_job_active_network_txid', 'network', 'txid', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')"),
+                 postgresql_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'network': self.network,
+            'txid': self.txid,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+        }
+
+    def __repr__(self):
+        return f'<PushJob {self.id} {self.kind} {self.txid[:16]}... {self.status}>'
+
+
+class SyncCheckpoint(db.Model):
+    """Last block scanned for confirmations on each network"""
+    __tablename__ = 'sync_checkpoint'
+
+    network = db.Column(db.String(20), primary_key=True)
+    height = db.Column(db.Integer, nullable=False)
+    block_hash = db.Column(db.String(64), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SyncCheckpoint {self.network} at {self.height}>'
+
+
+class RollupCheckpoint(db.Model):
+    """Last transaction event rolled up into hourly_stats on each network"""
+    __tablename__ = 'rollup_checkpoint'
+
+    network = db.Column(db.String(20), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RollupCheckpoint {self.network} at event {self.last_event_id}>'
+
+
+class DeletedTransaction(db.Model):
+    """Tombstone of a deleted transaction, so the event pollers of every
+    process can announce the deletion"""
+    __tablename__ = 'deleted_transaction'
+
+    id = db.Column(db.Integer, primary_key=True)
+    network = db.Column(db.String(20), nullable=False)
+    txid = db.Column(db.String(64), nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_deleted_transaction_network_deleted_at', 'network', 'deleted_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<DeletedTransaction {self.txid[:16]}... on {self.network}>'
@@ -0,0 +1,123 @@
+"""Push stored transactions to the mempool backend and record the outcome"""
+import time
+
+from app import db
+from app.audit import push_backend, push_kind, record_event
+from app.mempool import NotSent, UpstreamBusy, check_and_push, get_client
+from app.metrics import record_push
+from app.scheduling import apply_schedule
+
+
+def confirmed_payload(tx):
+    """Outcome of pushing a transaction that is already confirmed: nothing to do"""
+    return {
+        'status': tx.status,
+        'analysis_result': tx.analysis_result
+    }, 200
+
+
+def record_push_outcome(tx, status, analysis_result, attempted, latency, backend):
+    """Store the outcome of a check and push and commit it"""
+    tx.status = status
+    tx.analysis_result = analysis_result
+    if attempted:
+        tx.push_attempts += 1
+    apply_schedule(tx)
+    record_event(tx, push_kind(attempted), latency, backend)
+    db.session.commit()
+
+    response = {
+        'status': tx.status,
+        'analysis_result': tx.analysis_result
+    }
+    if attempted:
+        response['push_attempts'] = tx.push_attempts
+    return response, 200
+
+
+def record_push_error(tx, error, latency):
+    """Store a check and push that failed with ``error`` and commit it"""
+    attempted = not isinstance(error, NotSent)
+    tx.status = 'error'
+    tx.analysis_result = str(error)
+    if attempted:
+        tx.push_attempts += 1
+    apply_schedule(tx)
+    record_event(tx, push_kind(attempted), latency, push_backend(tx.network))
+    db.session.commit()
+    return {
+        'status': 'error',
+        'error': str(error),
+        'analysis_result': tx.analysis_result
+    }, 500
+
+
+def push_stored_transaction(tx):
+    """Check a stored transaction upstream and broadcast it if needed.
+
+    Updates and commits the transaction and appends the outcome to its
+    history. Returns a ``(payload, http_status)`` tuple describing the outcome.
+    """
+    if tx.status == 'confirmed':
+        return confirmed_payload(tx)
+
+    started = time.perf_counter()
+    try:
+        status, analysis_result, attempted = check_and_push(tx.network, tx.txid, tx.raw_tx)
+        return record_push_outcome(tx, status, analysis_result, attempted, time.perf_counter() - started,
+                                   push_backend(tx.network, attempted))
+    except UpstreamBusy:
+        # Nothing was attempted, leave the transaction as it is
+        raise
+    except Exception as e:
+        return record_push_error(tx, e, time.perf_counter() - started)
+
+
+def record_broadcast(tx, accepted, response_text, latency, backend):
+    """Store the answer to a broadcast and commit it"""
+    record_push(tx.network, 'success' if accepted else 'failed', True)
+
+    if accepted:
+        tx.status = 'success'
+        tx.analysis_result = 'Transaction pushed successfully'
+    else:
+        tx.status = 'failed'
+        tx.analysis_result = response_text
+
+    tx.push_attempts += 1
+    apply_schedule(tx)
+    record_event(tx, 'push', latency, backend, response=response_text)
+    db.session.commit()
+    return tx.to_dict(), 201
+
+
+def record_broadcast_error(tx, error, latency):
+    """Store a broadcast that failed with ``error`` and commit it"""
+    attempted = not isinstance(error, NotSent)
+    record_push(tx.network, 'error', attempted)
+    tx.status = 'error'
+    tx.analysis_result = str(error)
+    if attempted:
+        tx.push_attempts += 1
+    apply_schedule(tx)
+    record_event(tx, push_kind(attempted), latency, push_backend(tx.network))
+    db.session.commit()
+
+
+def broadcast_stored_transaction(tx):
+    """Broadcast a stored transaction without checking upstream first.
+
+    Updates and commits the transaction and returns ``(payload, http_status)``.
+    Errors reaching the backend are stored on the transaction like a failed
+    push and propagated to the caller.
+    """
+    started = time.perf_counter()
+    try:
+        accepted, response_text = get_client(tx.network).broadcast(tx.raw_tx)
+    except UpstreamBusy:
+        raise
+    except Exception as e:
+        record_broadcast_error(tx, e, time.perf_counter() - started)
+        raise
+    return record_broadcast(tx, accepted, response_text, time.perf_counter() - started,
+                            push_backend(tx.network, True))
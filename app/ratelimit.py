@@ -0,0 +1,208 @@
+"""Admission control for the submission endpoints: a token bucket per client
+and network, with an optional SQLite table shared between workers, and load
+shedding while the upstream request slots are saturated.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import partial, wraps
+
+from flask import jsonify, request
+
+from app.mempool import upstream_limiter
+from app.metrics import ADMISSION_REJECTED, RATE_LIMIT_ERRORS
+from app.network_config import is_valid_network
+
+# Tokens added per second and bucket size, per client and network (0, the
+# default, disables rate limiting)
+RATE = float(os.getenv('RATE_LIMIT_RATE', '0'))
+BURST = float(os.getenv('RATE_LIMIT_BURST', '20'))
+SHARED_DB = os.getenv('RATE_LIMIT_DB')
+# Buckets kept in memory; the least recently used are dropped (a full bucket)
+MAX_BUCKETS = int(os.getenv('RATE_LIMIT_MAX_BUCKETS', '100000'))
+# Shared buckets idle long enough to be full again are deleted every this many takes
+PURGE_EVERY = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def _refill(tokens, updated_at, now, rate, burst):
+    return min(burst, tokens + (now - updated_at) * rate)
+
+
+def _take(tokens, rate, burst, cost):
+    """Return the tokens left and the seconds to wait after taking ``cost``
+
+    A request costing more than ``burst`` is admitted on a full bucket and
+    leaves it in debt, so it is still charged in full.
+    """
+    needed = min(cost, burst)
+    if tokens >= needed:
+        return tokens - cost, 0.0
+    return tokens, (needed - tokens) / rate
+
+
+class LocalBuckets:
+    """Token buckets of this process, in an LRU of bounded size"""
+
+    def __init__(self, maxsize=MAX_BUCKETS):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1, now=None):
+        """Take ``cost`` tokens, returning 0 or the seconds until they are available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens, retry_after = _take(_refill(tokens, updated_at, now, rate, burst), rate, burst, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file, so every worker process draws from
+    the same bucket of a client"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        self._connection().execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_bucket (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode, transactions are opened explicitly
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, cost=1, now=None):
+        """Take ``cost`` tokens, returning 0 or the seconds until they are available
+
+        A request is admitted when the database cannot be used (locked past
+        the busy timeout, disk full): rate limiting must not fail submissions.
+        """
+        try:
+            return self._take(key, rate, burst, cost, time.time() if now is None else now)
+        except sqlite3.OperationalError as e:
+            RATE_LIMIT_ERRORS.inc(network=key[0])
+            logger.warning('Rate limit store failed, admitting the request: %s', e)
+            return 0.0
+
+    def _take(self, key, rate, burst, cost, now):
+        key = '|'.join(key)
+        conn = self._connection()
+        # Write lock up front: read and update the bucket atomically
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_limit_bucket WHERE key = ?', (key,)).fetchone()
+            tokens, retry_after = _take(_refill(*row, now, rate, burst) if row else burst, rate, burst, cost)
+            conn.execute('INSERT OR REPLACE INTO rate_limit_bucket (key, tokens, updated_at) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            self._takes += 1
+            if self._takes % PURGE_EVERY == 0:
+                conn.execute('DELETE FROM rate_limit_bucket WHERE tokens + (? - updated_at) * ? >= ?',
+                             (now, rate, burst))
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        return retry_after
+
+
+class RateLimiter:
+    """Token bucket of ``burst`` requests refilled at ``rate`` per second"""
+
+    def __init__(self, rate=RATE, burst=BURST, buckets=None):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = buckets or LocalBuckets()
+
+    def check(self, network, client, cost=1):
+        """Return 0 if the request is admitted, else the seconds to wait"""
+        return self.buckets.take((network, client), self.rate, self.burst, cost)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process-wide rate limiter, or None when disabled"""
+    global _limiter
+    if RATE <= 0:
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(RATE, BURST, SQLiteBuckets(SHARED_DB) if SHARED_DB else None)
+        return _limiter
+
+
+def client_key():
+    """Identify the client of the current request by its address"""
+    return request.remote_addr or 'unknown'
+
+
+def _reject(network, reason, message, status_code, retry_after):
+    ADMISSION_REJECTED.inc(network=network, reason=reason)
+    response = jsonify({'error': message})
+    response.status_code = status_code
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission_control(view=None, cost=None):
+    """Rate limit a ``/<network>/...`` view per client and shed load while
+    the upstream is saturated, answering 429 or 503 with Retry-After
+
+    ``cost`` returns the tokens a request takes, 1 by default.
+    """
+    if view is None:
+        return partial(admission_control, cost=cost)
+
+    @wraps(view)
+    def wrapper(network, *args, **kwargs):
+        if not is_valid_network(network):
+            # Let the view answer 404
+            return view(network, *args, **kwargs)
+        rejection = admission_rejection(network, cost() if cost else 1)
+        if rejection is not None:
+            return rejection
+        return view(network, *args, **kwargs)
+    return wrapper
+
+
+def admission_rejection(network, cost=1):
+    """The 429 or 503 response turning the current request away, or None to admit it"""
+    if upstream_limiter.overloaded():
+        return _reject(network, 'overloaded', 'Server is overloaded, retry later',
+                       503, upstream_limiter.timeout)
+    limiter = get_limiter()
+    if limiter is not None:
+        retry_after = limiter.check(network, client_key(), cost)
+        if retry_after:
+            return _reject(network, 'rate_limited', 'Too many requests, retry later', 429, retry_after)
+    return None
+
+
+def upstream_busy_response(network):
+    """503 response for a request that found no free upstream slot"""
+    return _reject(network, 'upstream_busy', 'Mempool backend is busy, retry later',
+                   503, upstream_limiter.timeout)
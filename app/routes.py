@@ -1,55 +1,73 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, abort
-from app.models import Transaction
+from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, abort, Response, stream_with_context
+from app.models import Transaction, PushJob, TRANSACTION_FIELDS, LIST_FIELDS, SORT_KEYS
 from app import db
 from app.network_config import get_mempool_url, get_explorer_url, is_valid_network, VALID_NETWORKS
-import requests
+from app.mempool import UpstreamBusy, get_client
+from app.cache import get_cache
+from app.broadcast import backend_health
+from app.push import push_stored_transaction, broadcast_stored_transaction
+from app.audit import get_events
+from app.jobs import enqueue_push, job_accepted_payload
+from app.stats import get_network_stats, get_network_stats_fallback, get_timeseries
+from app.export import EXPORT_FORMATS, EXPORT_CHUNK_SIZE, iter_export
+from app.batch import submit_batch
+from app.events import FULL_RETRY_AFTER, BrokerFull, broker, iter_events, record_deletion
+from app.metrics import render_metrics
+from app.ratelimit import admission_control, upstream_busy_response
+from datetime import datetime, timedelta
+from functools import wraps
 from sqlalchemy.exc import OperationalError
-from bitcoinlib.transactions import Transaction as BtcTransaction
-from collections import Counter
+from app.validation import compute_txid, analyze_raw_tx, InvalidHex
 
 bp = Blueprint('main', __name__)
 
-def get_service_url(network):
-    """Get mempool service URL for a given network"""
-    return get_mempool_url(network)
-
-def get_network_stats_fallback(network):
-    """Return empty stats when the database is not ready yet."""
-    return {
-        'network': network,
-        'total_transactions': 0,
-        'attempted_transactions': 0,
-        'pending_transactions': 0,
-        'successful_transactions': 0,
-        'confirmed_transactions': 0,
-        'failed_transactions': 0,
-        'error_transactions': 0,
-        'total_push_attempts': 0,
-        'latest_transaction_at': None,
-        'latest_transaction_txid': None,
-    }
-
-def get_network_stats(network, txs=None):
-    """Build aggregate stats for a specific network."""
-    txs = txs if txs is not None else Transaction.get_by_network(network).all()
-    status_counts = Counter(tx.status for tx in txs)
-    total_transactions = len(txs)
-    attempted_transactions = sum(1 for tx in txs if tx.push_attempts > 0)
-    latest_transaction = txs[0] if txs else None
-
-    return {
-        'network': network,
-        'total_transactions': total_transactions,
-        'attempted_transactions': attempted_transactions,
-        'pending_transactions': status_counts.get('pending', 0),
-        'successful_transactions': status_counts.get('success', 0),
-        'confirmed_transactions': status_counts.get('confirmed', 0),
-        'failed_transactions': status_counts.get('failed', 0),
-        'error_transactions': status_counts.get('error', 0),
-        'total_push_attempts': sum(tx.push_attempts for tx in txs),
-        'latest_transaction_at': latest_transaction.created_at.isoformat() if latest_transaction else None,
-        'latest_transaction_txid': latest_transaction.txid if latest_transaction else None,
-    }
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+HTML_PAGE_SIZE = 50
+# Latest events shown on the transaction page
+HTML_EVENT_LIMIT = 50
+
+def parse_page_args(default_limit=DEFAULT_PAGE_SIZE):
+    """Read limit, cursor, status and fields from the query string.
+
+    Raises ValueError on invalid values.
+    """
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit, request.args.get('cursor') or None, request.args.get('status') or None, parse_fields_arg()
+
+def parse_fields_arg():
+    """Read the comma separated fields from the query string, or None for all of them.
+
+    Raises ValueError on unknown fields.
+    """
+    if not request.args.get('fields'):
+        return None
+    fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+    unknown = [f for f in fields if f not in TRANSACTION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def parse_sort_args():
+    """Read sort, min_fee_rate and max_fee_rate as page_by_network() keyword arguments.
+
+    Raises ValueError on invalid values.
+    """
+    options = {'sort': request.args.get('sort') or 'created_at'}
+    if options['sort'] not in SORT_KEYS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+    for name in ('min_fee_rate', 'max_fee_rate'):
+        if request.args.get(name):
+            try:
+                options[name] = float(request.args[name])
+            except ValueError:
+                raise ValueError(f'{name} must be a number')
+    return options
 
 # Redirect root to mainchain
 @bp.route('/')
@@ -93,33 +111,52 @@ def api_docs(network):
 def transactions(network):
     if not is_valid_network(network):
         abort(404)
+    cursor = request.args.get('cursor') or None
+    status = request.args.get('status') or None
     try:
-        txs = Transaction.get_by_network(network).all()
-        stats = get_network_stats(network, txs)
+        sort_options = parse_sort_args()
+        txs, next_cursor = Transaction.page_by_network(
+            network, HTML_PAGE_SIZE, cursor=cursor, status=status, fields=LIST_FIELDS, **sort_options
+        )
+        stats = get_network_stats(network)
+    except ValueError:
+        abort(400)
     except OperationalError:
         # Database not initialized yet: show the page as empty
         # instead of failing with a 500 error
-        txs = []
+        txs, next_cursor = [], None
         stats = get_network_stats_fallback(network)
+        sort_options = {'sort': 'created_at'}
     return render_template('transaction_list.html',
                          transactions=txs, 
                          network=network,
                          networks=VALID_NETWORKS,
                          stats=stats,
+                         status_filter=status,
+                         sort=sort_options['sort'],
+                         cursor=cursor,
+                         next_cursor=next_cursor,
                          onion_url=current_app.config['ONION_URL'])
 
 @bp.route('/<network>/stats')
 def stats(network):
     if not is_valid_network(network):
         abort(404)
+    bucket = 'day' if request.args.get('bucket') == 'day' else 'hour'
+    end = datetime.utcnow()
+    start = end - (timedelta(days=30) if bucket == 'day' else timedelta(hours=24))
     try:
         network_stats = get_network_stats(network)
+        points = get_timeseries(network, start, end, bucket)
     except OperationalError:
         network_stats = get_network_stats_fallback(network)
+        points = []
     return render_template('stats.html',
                          network=network,
                          networks=VALID_NETWORKS,
                          stats=network_stats,
+                         bucket=bucket,
+                         points=points[::-1],
                          onion_url=current_app.config['ONION_URL'])
 
 @bp.route('/<network>/transaction/<txid>')
@@ -133,6 +170,7 @@ def transaction_detail(network, txid):
     mempool_url = get_mempool_url(network)
     return render_template('transaction_detail.html', 
                          tx=tx, 
+                         events=get_events(tx, limit=HTML_EVENT_LIMIT),
                          network=network,
                          networks=VALID_NETWORKS,
                          explorer_url=explorer_url,
@@ -140,6 +178,7 @@ def transaction_detail(network, txid):
                          onion_url=current_app.config['ONION_URL'])
 
 @bp.route('/<network>/transaction/submit', methods=['POST'])
+@admission_control
 def submit_transaction(network):
     if not is_valid_network(network):
         abort(404)
@@ -147,33 +186,33 @@ def submit_transaction(network):
     data = request.get_json()
     raw_tx = data.get('raw_tx')
     txid = data.get('txid')
-    service = get_service_url(network)
+    client = get_client(network)
     
     # Handle txid submission
     if txid:
         try:
             # Fetch transaction from service API
-            response = requests.get(f'{service}/api/tx/{txid}/hex')
-            if response.status_code != 200:
+            raw_tx = client.get_tx_hex(txid)
+            if raw_tx is None:
                 return jsonify({'error': 'Transaction not found'}), 404
-            raw_tx = response.text
+        except UpstreamBusy:
+            return upstream_busy_response(network)
         except Exception as e:
             return jsonify({'error': f'Error fetching transaction: {str(e)}'}), 400
-    
+
+    return store_submitted_transaction(network, raw_tx, txid)
+
+def store_submitted_transaction(network, raw_tx, txid=None):
+    """Validate and store the transaction of submit_transaction, fetched
+    upstream when only ``txid`` was submitted"""
     # Basic validation
     if not raw_tx:
         return jsonify({'error': 'Raw transaction is required'}), 400
 
     # Validate hex format
     try:
-        # Check if string contains only valid hex characters
-        if not all(c in '0123456789abcdefABCDEF' for c in raw_tx):
-            return jsonify({'error': 'Raw transaction must contain only hexadecimal characters'}), 400
-        
-        # Parse transaction using bitcoinlib
-        tx = BtcTransaction.parse_hex(raw_tx)
-        # Get txid using the library's built-in function
-        calculated_txid = tx.txid
+        # Check the serialization and compute the txid without a full parse
+        calculated_txid = compute_txid(raw_tx)
         
         # If txid was provided, verify it matches
         if txid and txid != calculated_txid:
@@ -191,12 +230,15 @@ def submit_transaction(network):
 
         return jsonify(tx.to_dict()), 201
     
+    except InvalidHex as e:
+        return jsonify({'error': str(e)}), 400
     except ValueError as e:
         return jsonify({'error': f'Invalid transaction format: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'Error processing transaction: {str(e)}'}), 400
 
 @bp.route('/<network>/transaction/<txid>/push', methods=['POST'])
+@admission_control
 def push_transaction(network, txid):
     if not is_valid_network(network):
         return jsonify({'error': 'Invalid network'}), 404
@@ -204,70 +246,16 @@ def push_transaction(network, txid):
     tx = Transaction.get_by_txid_and_network(txid, network)
     if not tx:
         return jsonify({'error': 'Transaction not found'}), 404
-    service = get_service_url(network)
-    
-    if tx.status == 'confirmed':
-        return jsonify({
-            'status': tx.status,
-            'analysis_result': tx.analysis_result
-        })
+
+    if current_app.config['PUSH_MODE'] == 'queue':
+        job = enqueue_push(tx, kind='check')
+        return jsonify(job_accepted_payload(job)), 202
 
     try:
-        # First check if transaction is already confirmed
-        status_response = requests.get(f'{service}/api/tx/{txid}')
-        if status_response.status_code == 200:
-            status_data = status_response.json()
-            if status_data.get('status', {}).get('confirmed'):
-                tx.status = 'confirmed'
-                tx.analysis_result = 'Transaction is already confirmed in the blockchain'
-                db.session.commit()
-                return jsonify({
-                    'status': tx.status,
-                    'analysis_result': tx.analysis_result
-                })
-            else:
-                tx.status = 'success'
-                tx.analysis_result = 'Transaction is already present in mempool'
-                db.session.commit()
-                return jsonify({
-                    'status': tx.status,
-                    'analysis_result': tx.analysis_result
-                })
-        elif status_response.status_code == 404:
-            # If not confirmed, proceed with pushing
-            response = requests.post(
-                f'{service}/api/tx',
-                data=tx.raw_tx,
-                headers={'Content-Type': 'text/plain'}
-            )
-
-            # Store the API response
-            tx.analysis_result = response.text
-        
-            if response.status_code == 200:
-                tx.status = 'success'
-            else:
-                tx.status = 'failed'
-        
-            tx.push_attempts += 1
-            db.session.commit()
-        
-            return jsonify({
-                'status': tx.status,
-                'push_attempts': tx.push_attempts,
-                'analysis_result': tx.analysis_result
-            })
-        
-    except Exception as e:
-        tx.status = 'error'
-        tx.analysis_result = str(e)
-        tx.push_attempts += 1
-        db.session.commit()
-        return jsonify({
-            'status': 'error',
-            'error': str(e),
-            'analysis_result': tx.analysis_result
-        }), 500
+        payload, status_code = push_stored_transaction(tx)
+    except UpstreamBusy:
+        return upstream_busy_response(network)
+    return jsonify(payload), status_code
 
 @bp.route('/<network>/transaction/<txid>/delete', methods=['POST'])
 def delete_transaction(network, txid):
@@ -285,17 +273,177 @@ def delete_transaction(network, txid):
             'error': 'Only confirmed or failed transactions can be deleted'
         }), 403
     
-    db.session.delete(tx)
+    record_deletion(tx)
     db.session.commit()
     return jsonify({'status': 'success'})
 
+@bp.route('/<network>/events')
+def events(network):
+    if not is_valid_network(network):
+        abort(404)
+    try:
+        subscription = broker.subscribe(network, current_app._get_current_object())
+    except BrokerFull as e:
+        # Pages keep working without live updates; the worker threads stay free for requests
+        response = jsonify({'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(FULL_RETRY_AFTER)
+        return response
+    # Start every stream with a fresh snapshot, so reconnecting clients catch up
+    try:
+        stats = get_network_stats(network)
+    except OperationalError:
+        stats = get_network_stats_fallback(network)
+    subscription.put_nowait(('stats', stats))
+    return Response(
+        iter_events(network, subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 # API Routes
 @bp.route('/<network>/api/transactions', methods=['GET'])
 def api_get_transactions(network):
     if not is_valid_network(network):
         abort(404)
-    txs = Transaction.get_by_network(network).all()
-    return jsonify([tx.to_dict() for tx in txs])
+    try:
+        limit, cursor, status, fields = parse_page_args()
+        txs, next_cursor = Transaction.page_by_network(
+            network, limit, cursor=cursor, status=status, fields=fields, **parse_sort_args()
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify([tx.to_dict(fields) for tx in txs])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        next_url = url_for('main.api_get_transactions', network=network, _external=True,
+                           **{**request.args.to_dict(), 'cursor': next_cursor})
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+@bp.route('/<network>/api/transactions/export', methods=['GET'])
+def api_export_transactions(network):
+    if not is_valid_network(network):
+        abort(404)
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    # limit and cursor are paging arguments, the export streams every row
+    status = request.args.get('status') or None
+    try:
+        fields = parse_fields_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+    fields = fields or list(TRANSACTION_FIELDS)
+    compress = request.args.get('compress') == 'gzip'
+
+    # Oldest update first, so the last row's updated_at is the next since=
+    query = Transaction.query.filter_by(network=network)
+    if status:
+        query = query.filter_by(status=status)
+    if since:
+        query = query.filter(Transaction.updated_at >= since)
+    query = query.options(*Transaction.load_options(fields))
+    query = query.order_by(Transaction.updated_at, Transaction.id).yield_per(EXPORT_CHUNK_SIZE)
+
+    filename = f"mempush-{network}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{fmt}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(
+        stream_with_context(iter_export(query, fmt, fields, compress=compress)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers=headers,
+    )
+
+def _batch_body_error():
+    """Why the batch body is malformed, or None: it must be an object whose
+    transactions are objects and whose raw_txs and txids are strings"""
+    data = request.get_json(silent=True)
+    if data is None:
+        return None
+    if not isinstance(data, dict):
+        return 'Body must be a JSON object'
+    for field, kind in (('transactions', dict), ('raw_txs', str), ('txids', str)):
+        value = data.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, list):
+            return f'{field} must be a list'
+        if not all(isinstance(item, kind) for item in value):
+            return f"{field} must be a list of {'objects' if kind is dict else 'strings'}"
+    return None
+
+def validate_batch_body(view):
+    """Answer 400 to a malformed batch body before its cost is charged"""
+    @wraps(view)
+    def wrapper(network, *args, **kwargs):
+        error = _batch_body_error()
+        if error and is_valid_network(network):
+            return jsonify({'error': error}), 400
+        return view(network, *args, **kwargs)
+    return wrapper
+
+def _batch_items():
+    """Items of a batch submission, from any of its three list fields"""
+    data = request.get_json(silent=True) or {}
+    items = list(data.get('transactions') or [])
+    items += [{'raw_tx': raw_tx} for raw_tx in data.get('raw_txs') or []]
+    items += [{'txid': txid} for txid in data.get('txids') or []]
+    return items
+
+def _batch_cost():
+    """A batch takes one rate limit token per transaction"""
+    return max(1, min(len(_batch_items()), current_app.config['BATCH_MAX_ITEMS']))
+
+@bp.route('/<network>/api/transactions/batch', methods=['POST'])
+@validate_batch_body
+@admission_control(cost=_batch_cost)
+def api_post_transactions_batch(network):
+    if not is_valid_network(network):
+        abort(404)
+
+    items = _batch_items()
+    if not items:
+        return jsonify({'error': 'transactions, raw_txs or txids is required'}), 400
+    max_items = current_app.config['BATCH_MAX_ITEMS']
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} transactions per batch'}), 413
+
+    results = submit_batch(network, items)
+    return jsonify({
+        'created': sum(1 for result in results if result['status'] == 'created'),
+        'existing': sum(1 for result in results if result['status'] == 'exists'),
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'results': results,
+    })
+
+@bp.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/<network>/api/cache/stats', methods=['GET'])
+def api_get_cache_stats(network):
+    if not is_valid_network(network):
+        abort(404)
+    cache = get_cache()
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **cache.stats(network)})
+
+@bp.route('/<network>/api/broadcast/backends', methods=['GET'])
+def api_get_broadcast_backends(network):
+    if not is_valid_network(network):
+        abort(404)
+    # Creating the client registers its fan-out backends, if any
+    get_client(network)
+    return jsonify([health.to_dict() for health in backend_health(network)])
 
 @bp.route('/<network>/api/stats', methods=['GET'])
 def api_get_stats(network):
@@ -307,6 +455,25 @@ def api_get_stats(network):
         stats = get_network_stats_fallback(network)
     return jsonify(stats)
 
+@bp.route('/<network>/api/stats/timeseries', methods=['GET'])
+def api_get_stats_timeseries(network):
+    if not is_valid_network(network):
+        abort(404)
+    bucket = request.args.get('bucket', 'hour')
+    try:
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow()
+        if request.args.get('start'):
+            start = datetime.fromisoformat(request.args['start'])
+        else:
+            start = end - (timedelta(days=30) if bucket == 'day' else timedelta(hours=24))
+        points = get_timeseries(network, start, end, bucket)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except OperationalError:
+        # Not rolled up yet
+        points = []
+    return jsonify({'network': network, 'bucket': bucket, 'points': points})
+
 @bp.route('/<network>/api/transaction/<txid>', methods=['GET'])
 def api_get_transaction(network, txid):
     if not is_valid_network(network):
@@ -314,9 +481,34 @@ def api_get_transaction(network, txid):
     tx = Transaction.get_by_txid_and_network(txid, network)
     if not tx:
         return jsonify({'error': 'Transaction not found'}), 404
-    return jsonify(tx.to_dict())
+    data = tx.to_dict()
+    # Full decoding is comparatively expensive, only do it on request
+    if request.args.get('decode') in ('1', 'true'):
+        try:
+            data['decoded'] = analyze_raw_tx(tx.raw_tx)
+        except Exception as e:
+            data['decoded'] = None
+            data['decode_error'] = str(e)
+    return jsonify(data)
+
+@bp.route('/<network>/api/transaction/<txid>/events', methods=['GET'])
+def api_get_transaction_events(network, txid):
+    if not is_valid_network(network):
+        abort(404)
+    tx = Transaction.get_by_txid_and_network(txid, network)
+    if not tx:
+        return jsonify({'error': 'Transaction not found'}), 404
+    try:
+        limit = int(request.args.get('limit', 0))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 0:
+        return jsonify({'error': 'limit must be positive'}), 400
+    return jsonify({'txid': tx.txid, 'network': network,
+                    'events': [event.to_dict() for event in get_events(tx, limit=limit)]})
 
 @bp.route('/<network>/api/transaction', methods=['POST'])
+@admission_control
 def api_post_txid(network):
     if not is_valid_network(network):
         abort(404)
@@ -326,17 +518,24 @@ def api_post_txid(network):
     if not txid:
         return jsonify({'error': 'txid is required'}), 400
     
-    service = get_service_url(network)
+    client = get_client(network)
     
     try:
-        response = requests.get(f'{service}/api/tx/{txid}/hex')
-        if response.status_code != 200:
+        raw_tx = client.get_tx_hex(txid)
+        if raw_tx is None:
             return jsonify({'error': 'Transaction not found'}), 404
-        raw_tx = response.text
-        
+    except UpstreamBusy:
+        return upstream_busy_response(network)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    return store_fetched_transaction(network, txid, raw_tx)
+
+def store_fetched_transaction(network, txid, raw_tx):
+    """Check and store the transaction api_post_txid fetched upstream"""
+    try:
         # Parse and validate
-        tx = BtcTransaction.parse_hex(raw_tx)
-        calculated_txid = tx.txid
+        calculated_txid = compute_txid(raw_tx)
         
         if txid != calculated_txid:
             return jsonify({'error': 'Invalid txid'}), 400
@@ -357,6 +556,7 @@ def api_post_txid(network):
         return jsonify({'error': str(e)}), 400
 
 @bp.route('/<network>/api/transaction/push', methods=['POST'])
+@admission_control
 def api_push_tx(network):
     if not is_valid_network(network):
         abort(404)
@@ -366,46 +566,46 @@ def api_push_tx(network):
     if not raw_tx:
         return jsonify({'error': 'raw_tx is required'}), 400
     
-    service = get_service_url(network)
-    
     try:
-        # Validate hex format
-        if not all(c in '0123456789abcdefABCDEF' for c in raw_tx):
+        # Validate hex format and parse transaction
+        try:
+            txid = compute_txid(raw_tx)
+        except InvalidHex:
             return jsonify({'error': 'Invalid hex format'}), 400
         
-        # Parse transaction
-        tx = BtcTransaction.parse_hex(raw_tx)
-        txid = tx.txid
-        
-        # Check if transaction already exists for this network
-        existing_tx = Transaction.get_by_txid_and_network(txid, network)
-        if existing_tx:
-            # Update existing transaction
-            new_tx = existing_tx
-        else:
-            # Save to database
-            new_tx = Transaction(raw_tx=raw_tx, txid=txid, network=network)
-            db.session.add(new_tx)
-            db.session.commit()
+        new_tx = stored_transaction(network, raw_tx, txid)
         
+        if current_app.config['PUSH_MODE'] == 'queue':
+            job = enqueue_push(new_tx, kind='broadcast')
+            return jsonify({**job_accepted_payload(job), 'transaction': new_tx.to_dict()}), 202
+
         # Push to mempool
-        response = requests.post(
-            f'{service}/api/tx',
-            data=raw_tx,
-            headers={'Content-Type': 'text/plain'}
-        )
-        
-        if response.status_code == 200:
-            new_tx.status = 'success'
-            new_tx.analysis_result = 'Transaction pushed successfully'
-        else:
-            new_tx.status = 'failed'
-            new_tx.analysis_result = response.text
-        
-        new_tx.push_attempts += 1
-        db.session.commit()
-        
-        return jsonify(new_tx.to_dict()), 201
+        payload, status_code = broadcast_stored_transaction(new_tx)
+        return jsonify(payload), status_code
         
+    except UpstreamBusy:
+        return upstream_busy_response(network)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
+
+def stored_transaction(network, raw_tx, txid):
+    """The stored transaction ``txid`` of api_push_tx, stored first if it is new"""
+    # Check if transaction already exists for this network
+    existing_tx = Transaction.get_by_txid_and_network(txid, network)
+    if existing_tx:
+        # Update existing transaction
+        return existing_tx
+    # Save to database
+    new_tx = Transaction(raw_tx=raw_tx, txid=txid, network=network)
+    db.session.add(new_tx)
+    db.session.commit()
+    return new_tx
+
+@bp.route('/<network>/api/jobs/<int:job_id>', methods=['GET'])
+def api_get_job(network, job_id):
+    if not is_valid_network(network):
+        abort(404)
+    job = db.session.get(PushJob, job_id)
+    if not job or job.network != network:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
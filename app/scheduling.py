@@ -0,0 +1,94 @@
+"""Rebroadcast scheduling: failure classification and per-transaction backoff.
+
+Every stored transaction carries the time it is next due for a rebroadcast
+(``next_attempt_at``) and the class of its last failure. Retryable
+failures back off exponentially with the number of push attempts, terminal
+ones (double spends, invalid scripts...) are parked with no next attempt.
+"""
+import os
+import random
+import re
+from datetime import datetime, timedelta
+
+RETRYABLE = 'retryable'
+TERMINAL = 'terminal'
+
+BACKOFF_BASE = float(os.getenv('REBROADCAST_BACKOFF_BASE', '300'))
+BACKOFF_MAX = float(os.getenv('REBROADCAST_BACKOFF_MAX', '86400'))
+MAX_ATTEMPTS = int(os.getenv('REBROADCAST_MAX_ATTEMPTS', '20'))
+# Accepted transactions are checked again this often (0: never, the
+# eviction watcher brings them back if the mempool drops them)
+RECHECK_INTERVAL = float(os.getenv('REBROADCAST_RECHECK_INTERVAL', '0'))
+
+# Reject reasons that will never succeed by pushing the same bytes again
+TERMINAL_PATTERNS = re.compile('|'.join((
+    r'txn-mempool-conflict',
+    r'txn-same-nonwitness-data-in-mempool',
+    r'insufficient fee',
+    r'mandatory-script-verify-flag-failed',
+    r'non-mandatory-script-verify-flag',
+    r'bad-txns-(?!inputs-missingorspent)',
+    r'bad-witness',
+    r'scriptsig-',
+    r'scriptpubkey',
+    r'dust',
+    r'tx-size',
+    r'\bversion\b',
+    r'non-final',
+    r'non-bip68-final',
+    r'absurdly-high-fee|max-fee-exceeded',
+    r'TX decode failed',
+    r'Invalid hex',
+)), re.IGNORECASE)
+
+
+def classify_failure(status, analysis_result):
+    """Failure class of a push outcome: None, ``RETRYABLE`` or ``TERMINAL``
+
+    ``error`` outcomes (the backend could not be reached) are always
+    retryable; unrecognized rejections are retried until MAX_ATTEMPTS.
+    """
+    if status not in ('failed', 'error'):
+        return None
+    if status == 'error':
+        return RETRYABLE
+    if TERMINAL_PATTERNS.search(analysis_result or ''):
+        return TERMINAL
+    # Fee floor, missing parent, mempool full, backend trouble...
+    return RETRYABLE
+
+
+def backoff_delay(attempts):
+    """Seconds to wait after ``attempts`` pushes, jittered between half and the full delay"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def schedule(status, analysis_result, attempts, now=None):
+    """Return ``(next_attempt_at, failure_class)`` for a push outcome
+
+    Args:
+        status (str): Status after the push
+        analysis_result (str): Backend response or error text
+        attempts (int): Push attempts so far, including this one
+        now (datetime): Current time (default: utcnow)
+    """
+    now = now or datetime.utcnow()
+    failure_class = classify_failure(status, analysis_result)
+    if status == 'confirmed' or failure_class == TERMINAL:
+        return None, failure_class
+    if failure_class == RETRYABLE:
+        if attempts >= MAX_ATTEMPTS:
+            # Park transactions that keep failing, whatever the reason
+            return None, TERMINAL
+        return now + timedelta(seconds=backoff_delay(attempts)), failure_class
+    if status == 'success':
+        if RECHECK_INTERVAL <= 0:
+            return None, None
+        return now + timedelta(seconds=RECHECK_INTERVAL), None
+    return now, None
+
+
+def apply_schedule(tx, now=None):
+    """Set the next attempt time and failure class of a Transaction from its state"""
+    tx.next_attempt_at, tx.failure_class = schedule(tx.status, tx.analysis_result, tx.push_attempts or 0, now)
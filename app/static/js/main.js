@@ -35,6 +35,23 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Poll a queued push job until the worker has processed it
+    window.waitForPushJob = async function(statusUrl, intervalMs = 1000, timeoutMs = 120000) {
+        const deadline = Date.now() + timeoutMs;
+        while (Date.now() < deadline) {
+            const response = await fetch(statusUrl);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const job = await response.json();
+            if (job.status === 'done' || job.status === 'failed') {
+                return job.result ? job.result.response : { status: 'error', error: 'Push job failed' };
+            }
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+        throw new Error('Timed out waiting for the push job');
+    };
+
     // Handle push to mempool buttons
     window.pushTransaction = async function(txid) {
         // Extract network from current URL path
@@ -56,10 +73,17 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
             }
             
-            const result = await response.json();
+            let result = await response.json();
+            if (response.status === 202) {
+                // Push was queued: wait for the worker to process it
+                result = await window.waitForPushJob(result.status_url);
+            }
             if (result.status === 'success' || result.status === 'confirmed') {
                 alert('Transaction pushed successfully');
-                location.reload();
+                // With live updates the row is patched in place by the event stream
+                if (!window.liveUpdatesConnected) {
+                    location.reload();
+                }
             } else {
                 alert(`Error: ${result.error || result.analysis_result || 'Unknown error'}`);
             }
@@ -93,7 +117,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 const result = await response.json();
                 if (result.status === 'success') {
-                    location.reload();
+                    if (!window.liveUpdatesConnected) {
+                        location.reload();
+                    }
                 } else {
                     alert(`Error: ${result.error || 'Unknown error'}`);
                 }
@@ -114,4 +140,59 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         });
     }
+
+    // Live updates: patch stats and transaction rows from the event stream
+    const statusBadgeClasses = {
+        confirmed: 'bg-success',
+        success: 'bg-primary',
+        failed: 'bg-danger',
+        error: 'bg-warning',
+    };
+
+    function updateStats(stats) {
+        document.querySelectorAll('[data-stat]').forEach(el => {
+            const total = el.dataset.stat.split('+').reduce((sum, key) => sum + (stats[key] || 0), 0);
+            el.textContent = total;
+        });
+    }
+
+    function updateRow(tx) {
+        const row = document.querySelector(`tr[data-txid="${tx.txid}"]`);
+        if (!row) {
+            return;
+        }
+        row.dataset.status = tx.status;
+        const badge = row.querySelector('.tx-status');
+        if (badge) {
+            badge.className = `badge tx-status ${statusBadgeClasses[tx.status] || 'bg-secondary'}`;
+            badge.textContent = tx.status;
+        }
+        const attempts = row.querySelector('.tx-push-attempts');
+        if (attempts) {
+            attempts.textContent = tx.push_attempts;
+        }
+        if (hideConfirmedToggle && hideConfirmedToggle.checked && tx.status === 'confirmed') {
+            row.style.display = 'none';
+        }
+    }
+
+    if (window.EventSource && document.querySelector('[data-stat], tr[data-txid]')) {
+        const pathParts = window.location.pathname.split('/').filter(p => p);
+        const validNetworks = ['mainchain', 'testnetv3', 'testnetv4', 'signet'];
+        const network = validNetworks.includes(pathParts[0]) ? pathParts[0] : 'mainchain';
+        const source = new EventSource(`/${network}/events`);
+
+        source.onopen = () => { window.liveUpdatesConnected = true; };
+        source.onerror = () => { window.liveUpdatesConnected = false; };
+        source.addEventListener('stats', e => updateStats(JSON.parse(e.data)));
+        source.addEventListener('transaction', e => updateRow(JSON.parse(e.data)));
+        source.addEventListener('deleted', e => {
+            const row = document.querySelector(`tr[data-txid="${JSON.parse(e.data).txid}"]`);
+            if (row) {
+                row.remove();
+            }
+        });
+        // The server dropped events because this page fell behind
+        source.addEventListener('resync', () => location.reload());
+    }
 }); 
\ No newline at end of file
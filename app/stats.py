@@ -0,0 +1,380 @@
+"""Aggregate statistics for the transactions stored on each network"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, func, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Transaction, TransactionEvent, NetworkCounter, HourlyStats, RollupCheckpoint
+from app.network_config import VALID_NETWORKS
+from app.metrics import STAGE_LATENCY
+
+def get_network_stats_fallback(network):
+    """Return empty stats when the database is not ready yet."""
+    return {
+        'network': network,
+        'total_transactions': 0,
+        'attempted_transactions': 0,
+        'pending_transactions': 0,
+        'successful_transactions': 0,
+        'confirmed_transactions': 0,
+        'failed_transactions': 0,
+        'error_transactions': 0,
+        'total_push_attempts': 0,
+        'latest_transaction_at': None,
+        'latest_transaction_txid': None,
+    }
+
+
+def _build_stats(network, rows, latest):
+    """Build the stats dict from (status, count, attempted, push_attempts) rows"""
+    stats = get_network_stats_fallback(network)
+    status_counts = defaultdict(int)
+    for status, count, attempted, push_attempts in rows:
+        status_counts[status] += count or 0
+        stats['total_transactions'] += count or 0
+        stats['attempted_transactions'] += attempted or 0
+        stats['total_push_attempts'] += push_attempts or 0
+    stats['pending_transactions'] = status_counts['pending']
+    stats['successful_transactions'] = status_counts['success']
+    stats['confirmed_transactions'] = status_counts['confirmed']
+    stats['failed_transactions'] = status_counts['failed']
+    stats['error_transactions'] = status_counts['error']
+    if latest:
+        stats['latest_transaction_txid'], latest_at = latest
+        stats['latest_transaction_at'] = latest_at.isoformat() if latest_at else None
+    return stats
+
+
+def _latest_transaction(network, latest_at=None):
+    """Return the (txid, created_at) of the newest transaction of a network"""
+    query = db.session.query(Transaction.txid, Transaction.created_at).filter(Transaction.network == network)
+    if latest_at is not None:
+        query = query.filter(Transaction.created_at == latest_at)
+    return query.order_by(Transaction.created_at.desc()).first()
+
+
+def get_network_stats(network):
+    """Build aggregate stats for a specific network."""
+    with STAGE_LATENCY.time(stage='stats'):
+        return _get_network_stats(network)
+
+
+def _get_network_stats(network):
+    if current_app.config.get('STATS_COUNTERS'):
+        return get_network_stats_from_counters(network)
+
+    rows = db.session.query(
+        Transaction.status,
+        func.count(Transaction.id),
+        func.sum(case((Transaction.push_attempts > 0, 1), else_=0)),
+        func.sum(Transaction.push_attempts),
+        func.max(Transaction.created_at),
+    ).filter(Transaction.network == network).group_by(Transaction.status).all()
+
+    latest_at = max((row[4] for row in rows if row[4] is not None), default=None)
+    latest = _latest_transaction(network, latest_at) if latest_at else None
+    return _build_stats(network, [row[:4] for row in rows], latest)
+
+
+def get_network_stats_from_counters(network):
+    """Build aggregate stats from the materialized network_counter table."""
+    rows = db.session.query(
+        NetworkCounter.status,
+        NetworkCounter.tx_count,
+        NetworkCounter.attempted_count,
+        NetworkCounter.push_attempts,
+    ).filter(NetworkCounter.network == network).all()
+    return _build_stats(network, rows, _latest_transaction(network))
+
+
+def rebuild_counters(network=None):
+    """Recompute the network_counter rows from the transaction table."""
+    networks = [network] if network else VALID_NETWORKS
+    NetworkCounter.query.filter(NetworkCounter.network.in_(networks)).delete(synchronize_session=False)
+    rows = db.session.query(
+        Transaction.network,
+        Transaction.status,
+        func.count(Transaction.id),
+        func.sum(case((Transaction.push_attempts > 0, 1), else_=0)),
+        func.sum(Transaction.push_attempts),
+    ).filter(Transaction.network.in_(networks)).group_by(Transaction.network, Transaction.status).all()
+    for network_name, status, count, attempted, push_attempts in rows:
+        db.session.add(NetworkCounter(
+            network=network_name,
+            status=status or 'pending',
+            tx_count=count or 0,
+            attempted_count=attempted or 0,
+            push_attempts=push_attempts or 0,
+        ))
+    db.session.commit()
+
+
+COUNTED_ATTRS = ('network', 'status', 'push_attempts')
+
+
+def _normalize(network, status, push_attempts):
+    return network, status or 'pending', push_attempts or 0
+
+
+def _counter_keys(obj):
+    """Return the (network, status, push_attempts) of a row before and after the flush"""
+    old, new = [], []
+    for attr in COUNTED_ATTRS:
+        history = sa_inspect(obj).attrs[attr].history
+        old.append((history.deleted or history.unchanged or [None])[0])
+        new.append((history.added or history.unchanged or [None])[0])
+    return tuple(_normalize(*values) for values in (old, new))
+
+
+def _collect_counter_deltas(session):
+    """Compute counter deltas for the Transaction rows about to be flushed"""
+    deltas = defaultdict(lambda: [0, 0, 0])
+
+    def apply(key, sign):
+        network, status, push_attempts = key
+        delta = deltas[(network, status)]
+        delta[0] += sign
+        delta[1] += sign if push_attempts > 0 else 0
+        delta[2] += sign * push_attempts
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            apply(_counter_keys(obj)[1], 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            apply(_counter_keys(obj)[0], -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and obj not in session.deleted:
+            old, new = _counter_keys(obj)
+            if old != new:
+                apply(old, -1)
+                apply(new, 1)
+
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+
+def apply_counter_deltas(connection, deltas):
+    """Add ``{(network, status): [count, attempted, push_attempts]}`` to the counters"""
+    table = NetworkCounter.__table__
+    for (network, status), (count, attempted, push_attempts) in deltas.items():
+        result = connection.execute(
+            table.update()
+            .where(table.c.network == network, table.c.status == status)
+            .values(
+                tx_count=table.c.tx_count + count,
+                attempted_count=table.c.attempted_count + attempted,
+                push_attempts=table.c.push_attempts + push_attempts,
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(
+                network=network,
+                status=status,
+                tx_count=count,
+                attempted_count=attempted,
+                push_attempts=push_attempts,
+            ))
+
+
+@event.listens_for(Session, 'before_flush')
+def _maintain_counters(session, flush_context, instances):
+    """Keep network_counter in sync with ORM changes when counters are enabled"""
+    if not has_app_context() or not current_app.config.get('STATS_COUNTERS'):
+        return
+    deltas = _collect_counter_deltas(session)
+    if deltas:
+        apply_counter_deltas(session.connection(), deltas)
+
+
+@click.command('rebuild-counters')
+@click.option('--network', type=click.Choice(VALID_NETWORKS), help='Only rebuild this network')
+def rebuild_counters_command(network):
+    """Recompute the materialized per-network counters."""
+    rebuild_counters(network)
+    click.echo('Network counters rebuilt.')
+
+
+ROLLUP_FIELDS = ('submitted', 'accepted', 'failed', 'errors', 'confirmed', 'evicted')
+# Field counting an event of each kind, regardless of its status
+KIND_FIELDS = {'submit': 'submitted', 'confirm': 'confirmed', 'evict': 'evicted'}
+# Field counting a check or push by the status it left the transaction in;
+# a check that only found the transaction in the mempool counts nothing
+OUTCOME_FIELDS = {
+    ('push', 'success'): 'accepted',
+    ('push', 'failed'): 'failed',
+    ('push', 'error'): 'errors',
+    ('check', 'error'): 'errors',
+    ('push', 'confirmed'): 'confirmed',
+    ('check', 'confirmed'): 'confirmed',
+}
+# Events read per rollup transaction
+ROLLUP_BATCH = 10000
+# Seconds an event waits before being rolled up, so that writes which took
+# a lower event id have committed by then
+ROLLUP_LAG = 60
+BUCKETS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+MAX_POINTS = 2000
+
+
+def _floor(timestamp, bucket='hour'):
+    timestamp = timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0) if bucket == 'day' else timestamp
+
+
+def _empty_hour():
+    return dict.fromkeys(ROLLUP_FIELDS, 0) | {'confirmation_seconds': 0.0}
+
+
+def _collect_hours(network, after, until):
+    """Count the events of a network after event id ``after`` by hour, kind and status
+
+    Reads at most ROLLUP_BATCH events created before ``until``, in id order.
+    Returns ``(hours, last_event_id, events_read)``.
+    """
+    rows = db.session.query(
+        TransactionEvent.id,
+        TransactionEvent.kind,
+        TransactionEvent.status,
+        TransactionEvent.created_at,
+        Transaction.created_at,
+    ).join(Transaction, TransactionEvent.transaction_id == Transaction.id).filter(
+        Transaction.network == network, TransactionEvent.id > after, TransactionEvent.created_at < until,
+    ).order_by(TransactionEvent.id).limit(ROLLUP_BATCH).all()
+
+    counts = defaultdict(int)
+    delays = defaultdict(float)
+    for _, kind, status, created_at, submitted_at in rows:
+        key = (_floor(created_at), kind, status)
+        counts[key] += 1
+        if status == 'confirmed' and submitted_at is not None:
+            delays[key] += max(0.0, (created_at - submitted_at).total_seconds())
+
+    hours = defaultdict(_empty_hour)
+    for (hour, kind, status), count in counts.items():
+        field = KIND_FIELDS.get(kind) or OUTCOME_FIELDS.get((kind, status))
+        if field:
+            hours[hour][field] += count
+        if field == 'confirmed':
+            hours[hour]['confirmation_seconds'] += delays[(hour, kind, status)]
+    return hours, rows[-1][0] if rows else after, len(rows)
+
+
+def _add_hours(connection, network, hours):
+    """Add ``{hour: counts}`` to the hourly_stats rows of a network"""
+    table = HourlyStats.__table__
+    for hour, counts in hours.items():
+        result = connection.execute(
+            table.update()
+            .where(table.c.network == network, table.c.hour == hour)
+            .values({field: table.c[field] + value for field, value in counts.items()})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(network=network, hour=hour, **counts))
+
+
+def _advance_checkpoint(connection, network, previous, last_event_id):
+    """Move the checkpoint of a network from ``previous`` to ``last_event_id``
+
+    Returns False if another run moved it first.
+    """
+    table = RollupCheckpoint.__table__
+    now = datetime.utcnow()
+    if previous is None:
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(
+                    network=network, last_event_id=last_event_id, updated_at=now))
+        except IntegrityError:
+            return False
+        return True
+    result = connection.execute(
+        table.update()
+        .where(table.c.network == network, table.c.last_event_id == previous)
+        .values(last_event_id=last_event_id, updated_at=now)
+    )
+    return result.rowcount == 1
+
+
+def rollup_stats(network=None):
+    """Add the transaction events recorded since the last run to hourly_stats.
+
+    Each network keeps the id of the last event it rolled up in
+    rollup_checkpoint, moved in the same transaction as the counts, so every
+    event is counted once. Events younger than ROLLUP_LAG seconds wait for
+    the next run. Returns the number of events rolled up.
+    """
+    until = datetime.utcnow() - timedelta(seconds=ROLLUP_LAG)
+    rolled = 0
+    for network_name in [network] if network else VALID_NETWORKS:
+        while True:
+            previous = db.session.query(RollupCheckpoint.last_event_id).filter(
+                RollupCheckpoint.network == network_name).scalar()
+            hours, last_event_id, read = _collect_hours(network_name, previous or 0, until)
+            if not read:
+                db.session.rollback()
+                break
+            connection = db.session.connection()
+            if not _advance_checkpoint(connection, network_name, previous, last_event_id):
+                # A concurrent run rolled these events up already
+                db.session.rollback()
+                break
+            _add_hours(connection, network_name, hours)
+            db.session.commit()
+            rolled += read
+            if read < ROLLUP_BATCH:
+                break
+    return rolled
+
+
+def get_timeseries(network, start, end, bucket='hour'):
+    """Activity of a network per hour or day in ``[start, end)``, from hourly_stats
+
+    Every bucket of the range is present, with zeros where nothing happened.
+    Raises ValueError on an invalid range or bucket.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    start, step = _floor(start, bucket), BUCKETS[bucket]
+    if end <= start:
+        raise ValueError('end must be after start')
+    if (end - start) / step > MAX_POINTS:
+        raise ValueError(f'At most {MAX_POINTS} {bucket}s per request')
+
+    totals = {}
+    moment = start
+    while moment < end:
+        totals[moment] = _empty_hour()
+        moment += step
+    rows = HourlyStats.query.filter(
+        HourlyStats.network == network, HourlyStats.hour >= start, HourlyStats.hour < end)
+    for row in rows:
+        total = totals[_floor(row.hour, bucket)]
+        for field in ROLLUP_FIELDS + ('confirmation_seconds',):
+            total[field] += getattr(row, field)
+
+    points = []
+    for moment, total in totals.items():
+        pushes = total['accepted'] + total['failed'] + total['errors']
+        confirmation_seconds = total.pop('confirmation_seconds')
+        points.append({
+            'time': moment.isoformat(),
+            **total,
+            'failure_rate': (total['failed'] + total['errors']) / pushes if pushes else None,
+            'avg_confirmation_seconds': confirmation_seconds / total['confirmed'] if total['confirmed'] else None,
+        })
+    return points
+
+
+@click.command('rollup-stats')
+@click.option('--network', type=click.Choice(VALID_NETWORKS), help='Only roll up this network')
+def rollup_stats_command(network):
+    """Aggregate transaction activity into hourly buckets."""
+    rolled = rollup_stats(network)
+    click.echo(f'Rolled up {rolled} events.')
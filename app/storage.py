@@ -0,0 +1,102 @@
+"""Database engine configuration shared by the web app and the scripts.
+
+SQLite is tuned for a web process and cron scripts writing concurrently:
+WAL journal, ``synchronous=NORMAL``, a busy timeout instead of immediate
+"database is locked" errors and memory-mapped reads. PostgreSQL gets a
+pre-pinged, recycled connection pool.
+"""
+import os
+from functools import partial
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URL = 'sqlite:///mempush.db'
+
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+PG_STATEMENT_TIMEOUT = int(os.getenv('PG_STATEMENT_TIMEOUT', '30000'))
+
+
+def sqlite_config():
+    """SQLite tuning settings from the environment, as app config keys"""
+    return {
+        'SQLITE_TUNING': os.getenv('SQLITE_TUNING', 'true').lower() in ('1', 'true', 'yes'),
+        'SQLITE_BUSY_TIMEOUT': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+        'SQLITE_SYNCHRONOUS': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'SQLITE_MMAP_SIZE': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    }
+
+
+def database_url(url=None):
+    """The configured database URL, with ``postgres://`` normalized"""
+    url = url or os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def backend(url):
+    """``'sqlite'``, ``'postgresql'`` or the dialect name of another backend"""
+    return make_url(url).get_backend_name()
+
+
+def engine_options(url, config):
+    """Keyword arguments for ``create_engine`` (SQLALCHEMY_ENGINE_OPTIONS)
+
+    ``config`` holds the keys of sqlite_config(), e.g. the app config.
+    """
+    name = backend(url)
+    if name == 'sqlite':
+        if not config['SQLITE_TUNING'] or make_url(url).database in (None, '', ':memory:'):
+            return {}
+        return {
+            'pool_size': POOL_SIZE,
+            'max_overflow': MAX_OVERFLOW,
+            # Connections are pooled across threads, but never used by two at once
+            'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000, 'check_same_thread': False},
+        }
+    if name == 'postgresql':
+        return {
+            'pool_size': POOL_SIZE,
+            'max_overflow': MAX_OVERFLOW,
+            'pool_recycle': POOL_RECYCLE,
+            'pool_pre_ping': True,
+            'connect_args': {
+                'application_name': 'mempush',
+                'options': f'-c statement_timeout={PG_STATEMENT_TIMEOUT}',
+            },
+        }
+    return {'pool_pre_ping': True}
+
+
+def _set_sqlite_pragmas(config, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT']}")
+        cursor.execute(f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}")
+        cursor.execute('PRAGMA temp_store=MEMORY')
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine, config):
+    """Install the per-connection settings of the engine's backend"""
+    if engine.dialect.name == 'sqlite' and config['SQLITE_TUNING']:
+        # Read once here, not on every new connection
+        settings = {key: config[key] for key in ('SQLITE_SYNCHRONOUS', 'SQLITE_BUSY_TIMEOUT', 'SQLITE_MMAP_SIZE')}
+        event.listen(engine, 'connect', partial(_set_sqlite_pragmas, settings))
+    return engine
+
+
+def create_storage_engine(url=None, config=None):
+    """Create an engine configured like the web app's, for scripts
+
+    ``config`` defaults to sqlite_config().
+    """
+    url = database_url(url)
+    config = config or sqlite_config()
+    return configure_engine(create_engine(url, **engine_options(url, config)), config)
@@ -0,0 +1,25 @@
+"""Small helpers to summarize latency samples"""
+import math
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile (0-100) of ``values`` using nearest-rank"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(values):
+    """Build a dict with count, mean and p50/p95/p99/max of latency samples"""
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values),
+    }
@@ -0,0 +1,166 @@
+"""Fast validation and txid computation for raw transactions.
+
+Parses the consensus serialization directly instead of going through
+bitcoinlib, which is only needed for detailed analysis.
+"""
+import binascii
+import hashlib
+from collections import namedtuple
+
+from app.metrics import STAGE_LATENCY
+
+# Sanity limits: a standard transaction is at most 400k weight units,
+# blocks are at most 4M, and no output can exceed the 21M BTC supply
+MAX_TX_SIZE = 4000000
+MAX_MONEY = 21000000 * 100000000
+
+TxInput = namedtuple('TxInput', ['prev_txid', 'prev_vout', 'script_sig', 'sequence'])
+TxOutput = namedtuple('TxOutput', ['value', 'script_pubkey'])
+TxSummary = namedtuple('TxSummary', [
+    'txid', 'wtxid', 'version', 'inputs', 'outputs', 'locktime',
+    'segwit', 'size', 'weight', 'vsize',
+])
+
+
+class InvalidTransaction(ValueError):
+    """The raw transaction is not a structurally valid serialization"""
+
+
+class InvalidHex(InvalidTransaction):
+    """The raw transaction is not a hexadecimal string"""
+
+
+def double_sha256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def hex_to_bytes(raw_tx):
+    """Decode a hex string, raising InvalidHex on any non-hex character"""
+    if not isinstance(raw_tx, str) or not raw_tx:
+        raise InvalidHex('Raw transaction must be a non-empty hex string')
+    try:
+        return binascii.unhexlify(raw_tx)
+    except (binascii.Error, ValueError):
+        raise InvalidHex('Raw transaction must contain only hexadecimal characters')
+
+
+def is_hex(value):
+    """Check that a string is non-empty, even-length hexadecimal"""
+    try:
+        hex_to_bytes(value)
+        return True
+    except InvalidHex:
+        return False
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def read(self, n):
+        if self.pos + n > len(self.data):
+            raise InvalidTransaction('Unexpected end of transaction data')
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return chunk
+
+    def uint(self, n):
+        return int.from_bytes(self.read(n), 'little')
+
+    def varint(self):
+        prefix = self.uint(1)
+        if prefix < 0xfd:
+            return prefix
+        return self.uint({0xfd: 2, 0xfe: 4, 0xff: 8}[prefix])
+
+    def varbytes(self):
+        return self.read(self.varint())
+
+
+def decode_raw_tx(raw_tx):
+    """Decode a raw transaction hex string into a TxSummary.
+
+    Computes the txid over the non-witness serialization and the wtxid over
+    the full one, and checks that the serialization is well formed: at least
+    one input and output, valid segwit marker/flag, sane output values and
+    no trailing bytes. Raises InvalidTransaction otherwise.
+    """
+    data = hex_to_bytes(raw_tx)
+    if len(data) > MAX_TX_SIZE:
+        raise InvalidTransaction('Transaction is too large')
+    reader = _Reader(data)
+
+    version = reader.uint(4)
+    segwit = False
+    if len(data) > 5 and data[4] == 0 and data[5] != 0:
+        if data[5] != 1:
+            raise InvalidTransaction('Unknown segwit flag')
+        segwit = True
+        reader.read(2)
+    body_start = reader.pos
+
+    inputs = []
+    for _ in range(reader.varint()):
+        prev_txid = bytes(reader.read(32))[::-1].hex()
+        prev_vout = reader.uint(4)
+        script_sig = bytes(reader.varbytes())
+        inputs.append(TxInput(prev_txid, prev_vout, script_sig, reader.uint(4)))
+    if not inputs:
+        raise InvalidTransaction('Transaction has no inputs')
+
+    outputs = []
+    for _ in range(reader.varint()):
+        value = reader.uint(8)
+        if value > MAX_MONEY:
+            raise InvalidTransaction('Output value out of range')
+        outputs.append(TxOutput(value, bytes(reader.varbytes())))
+    if not outputs:
+        raise InvalidTransaction('Transaction has no outputs')
+    if sum(output.value for output in outputs) > MAX_MONEY:
+        raise InvalidTransaction('Total output value out of range')
+    body_end = reader.pos
+
+    if segwit:
+        has_witness = False
+        for _ in inputs:
+            for _ in range(reader.varint()):
+                has_witness = reader.varbytes() or has_witness
+        if not has_witness:
+            raise InvalidTransaction('Segwit transaction without witness data')
+    witness_end = reader.pos
+
+    locktime = reader.uint(4)
+    if reader.pos != len(data):
+        raise InvalidTransaction('Trailing data after transaction')
+
+    if segwit:
+        stripped = data[:4] + data[body_start:body_end] + data[witness_end:]
+    else:
+        stripped = data
+    base_size = len(stripped)
+    weight = base_size * 3 + len(data)
+    return TxSummary(
+        txid=double_sha256(stripped)[::-1].hex(),
+        wtxid=double_sha256(data)[::-1].hex(),
+        version=version,
+        inputs=inputs,
+        outputs=outputs,
+        locktime=locktime,
+        segwit=segwit,
+        size=len(data),
+        weight=weight,
+        vsize=(weight + 3) // 4,
+    )
+
+
+def compute_txid(raw_tx):
+    """Return the txid of a raw transaction hex string"""
+    return decode_raw_tx(raw_tx).txid
+
+
+def analyze_raw_tx(raw_tx):
+    """Full bitcoinlib decoding, for when detailed analysis is requested"""
+    from bitcoinlib.transactions import Transaction as BtcTransaction
+    with STAGE_LATENCY.time(stage='decode'):
+        return BtcTransaction.parse_hex(raw_tx).as_dict()
@@ -0,0 +1,5 @@
+"""ASGI entry point for production servers: WEB_SERVER=asgi gunicorn -c gunicorn.conf.py"""
+from app import create_app
+from app.asgi import AsgiApp
+
+app = AsgiApp(create_app())
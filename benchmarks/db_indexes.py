@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark list, stats and pending-scan queries with and without the
+indexes declared on the transaction table.
+
+Usage:
+    python benchmarks/db_indexes.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from tabulate import tabulate
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUS_WEIGHTS = {'confirmed': 70, 'success': 15, 'pending': 8, 'failed': 5, 'error': 2}
+NETWORKS = ('mainchain', 'testnetv3', 'testnetv4', 'signet')
+RAW_TX_SIZE = 500
+
+
+def populate(db, rows, batch_size=20000):
+    """Insert ``rows`` synthetic transactions spread over all networks"""
+    from app.blobs import pack_raw_tx
+    from app.models import Transaction, TransactionBlob
+
+    statuses = random.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=rows)
+    start = datetime.utcnow() - timedelta(days=365)
+    codec, data = pack_raw_tx(os.urandom(RAW_TX_SIZE).hex())
+    table = Transaction.__table__
+    for offset in range(0, rows, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, rows)):
+            created_at = start + timedelta(seconds=i * 30)
+            updated_at = created_at + timedelta(minutes=random.randint(0, 600))
+            batch.append({
+                'id': i + 1,
+                'txid': f'{i:064x}',
+                'network': NETWORKS[i % len(NETWORKS)],
+                'status': statuses[i],
+                'created_at': created_at,
+                'updated_at': updated_at,
+                'next_attempt_at': None if statuses[i] == 'confirmed' else updated_at,
+                'push_attempts': random.randint(0, 5),
+                'analysis_result': 'Transaction pushed successfully',
+            })
+        db.session.execute(table.insert(), batch)
+        db.session.execute(TransactionBlob.__table__.insert(), [
+            {'transaction_id': row['id'], 'codec': codec, 'data': data} for row in batch
+        ])
+    db.session.commit()
+
+
+def measure(func, repeat):
+    """Return the median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run_queries(db, repeat):
+    from app.models import Transaction, LIST_FIELDS
+    from app.stats import get_network_stats
+    from scripts.database import Database
+
+    network = 'mainchain'
+    database = Database(db.engine.url.database)
+    return {
+        'list (first page)': measure(
+            lambda: Transaction.page_by_network(network, 100, fields=LIST_FIELDS), repeat),
+        'list (status filter)': measure(
+            lambda: Transaction.page_by_network(network, 100, status='pending', fields=LIST_FIELDS), repeat),
+        'stats': measure(lambda: get_network_stats(network), repeat),
+        'pending scan': measure(lambda: database.get_rebroadcast_candidates(network), repeat),
+    }
+
+
+def set_indexes(db, enabled):
+    from app.models import Transaction
+
+    for index in Transaction.__table__.indexes:
+        if enabled:
+            index.create(db.engine, checkfirst=True)
+        else:
+            index.drop(db.engine, checkfirst=True)
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+
+def benchmark(size, repeat):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmpdir, "bench.db")}'
+        from app import create_app, db
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            populate(db, size)
+            set_indexes(db, False)
+            before = run_queries(db, repeat)
+            set_indexes(db, True)
+            after = run_queries(db, repeat)
+            db.session.remove()
+            db.engine.dispose()
+    return [
+        [size, query, f'{before[query]:.2f}', f'{after[query]:.2f}', f'{before[query] / after[query]:.1f}x']
+        for query in before
+    ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark transaction indexes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                       help='Table sizes to benchmark (default: 10000 100000 1000000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                       help='Runs per query, the median is reported (default: 5)')
+    args = parser.parse_args()
+
+    table = []
+    for size in args.sizes:
+        print(f'Benchmarking {size} rows...')
+        table.extend(benchmark(size, args.repeat))
+    print(tabulate(table, headers=['Rows', 'Query', 'Before (ms)', 'After (ms)', 'Speedup'], tablefmt='grid'))
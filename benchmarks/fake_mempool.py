@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Local stand-in for the mempool.space HTTP API.
+
+Serves the Esplora endpoints mempush uses for every network, backed by
+an in-memory FakeMempoolBackend per network, with configurable latency,
+server error rate and broadcast rejection rate. Point the app at it with
+MEMPOOL_BASE_URL.
+
+Usage:
+    python benchmarks/fake_mempool.py --port 8999 --latency 0.05 --error-rate 0.01
+    MEMPOOL_BASE_URL=http://127.0.0.1:8999/ flask run
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mempool import FakeMempoolBackend, MempoolError
+from app.network_config import NETWORK_URLS
+from app.validation import InvalidTransaction, decode_raw_tx
+
+# URL prefix of each network on mempool.space, e.g. 'signet/' -> 'signet'
+PREFIXES = {url[len('https://mempool.space/'):]: network for network, url in NETWORK_URLS.items()}
+ROUTES = [
+    ('GET', re.compile(r'api/tx/(?P<txid>[0-9a-f]{64})$'), 'tx'),
+    ('GET', re.compile(r'api/tx/(?P<txid>[0-9a-f]{64})/hex$'), 'tx_hex'),
+    ('POST', re.compile(r'api/tx$'), 'broadcast'),
+    ('POST', re.compile(r'api/txs/package$'), 'broadcast_package'),
+    ('GET', re.compile(r'api/blocks/tip/height$'), 'tip_height'),
+    ('GET', re.compile(r'api/block-height/(?P<height>\d+)$'), 'block_hash'),
+    ('GET', re.compile(r'api/block/(?P<block_hash>[0-9a-f]{64})/txids$'), 'block_txids'),
+    ('GET', re.compile(r'api/mempool/txids$'), 'mempool_txids'),
+]
+
+
+class FakeMempoolServer:
+    """Threaded HTTP server emulating mempool.space for all networks
+
+    Args:
+        latency (float): Mean added latency per request, in seconds
+        jitter (float): Latency is drawn uniformly from latency +/- jitter
+        error_rate (float): Fraction of requests answered with a 503
+        reject_rate (float): Fraction of broadcasts rejected with a 400
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, reject_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.backends = {network: FakeMempoolBackend() for network in NETWORK_URLS}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def mine(self, network, txids=None):
+        """Mine a block on ``network``, see FakeMempoolBackend.mine"""
+        return self.backends[network].mine(txids)
+
+    def evict(self, network, txids=None):
+        """Evict transactions from the mempool of ``network``, see FakeMempoolBackend.evict"""
+        return self.backends[network].evict(txids)
+
+    def handle(self, method, path, body):
+        """Return ``(status, content_type, payload)`` for a request"""
+        with self._lock:
+            self.requests += 1
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+        if random.random() < self.error_rate:
+            return 503, 'text/plain', 'Service Unavailable'
+
+        path = path.lstrip('/')
+        network = PREFIXES['']
+        for prefix, candidate in PREFIXES.items():
+            if prefix and path.startswith(prefix):
+                network, path = candidate, path[len(prefix):]
+                break
+        backend = self.backends[network]
+
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if route_method != method or not match:
+                continue
+            args = match.groupdict()
+            try:
+                if name == 'tx':
+                    data = backend.get_tx(args['txid'])
+                    return (404, 'text/plain', 'Transaction not found') if data is None \
+                        else (200, 'application/json', json.dumps(data))
+                if name == 'tx_hex':
+                    raw_tx = backend.get_tx_hex(args['txid'])
+                    return (404, 'text/plain', 'Transaction not found') if raw_tx is None \
+                        else (200, 'text/plain', raw_tx)
+                if name == 'broadcast':
+                    if random.random() < self.reject_rate:
+                        return 400, 'text/plain', 'sendrawtransaction RPC error: {"code":-26,"message":"rejected"}'
+                    accepted, text = backend.broadcast(body.strip())
+                    return (200 if accepted else 400), 'text/plain', text
+                if name == 'broadcast_package':
+                    return 200, 'application/json', json.dumps(self._submit_package(backend, json.loads(body)))
+                if name == 'tip_height':
+                    return 200, 'text/plain', str(backend.get_tip_height())
+                if name == 'block_hash':
+                    return 200, 'text/plain', backend.get_block_hash(int(args['height']))
+                if name == 'block_txids':
+                    return 200, 'application/json', json.dumps(backend.get_block_txids(args['block_hash']))
+                if name == 'mempool_txids':
+                    return 200, 'application/json', json.dumps(backend.get_mempool_txids())
+            except InvalidTransaction as e:
+                return 400, 'text/plain', f'sendrawtransaction RPC error: {e}'
+            except MempoolError as e:
+                return 404, 'text/plain', str(e)
+        return 404, 'text/plain', 'Not Found'
+
+    def _submit_package(self, backend, raw_txs):
+        """Answer like bitcoind's submitpackage"""
+        results = {}
+        for raw_tx in raw_txs:
+            summary = decode_raw_tx(raw_tx)
+            if random.random() < self.reject_rate:
+                results[summary.wtxid] = {'txid': summary.txid, 'error': 'package-rejected'}
+            else:
+                backend.broadcast(raw_tx)
+                results[summary.wtxid] = {'txid': summary.txid}
+        failed = any('error' in entry for entry in results.values())
+        return {'package_msg': 'transaction failed' if failed else 'success', 'tx-results': results}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, body=''):
+                status, content_type, payload = server.handle(self.command, self.path, body)
+                data = payload.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self._respond(self.rfile.read(length).decode())
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local mempool.space stand-in')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8999, help='Port to listen on (default: 8999)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean added latency in seconds (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Latency jitter in seconds (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 503 responses (default: 0)')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='Fraction of rejected broadcasts (default: 0)')
+    args = parser.parse_args()
+
+    server = FakeMempoolServer(args.host, args.port, args.latency, args.jitter, args.error_rate, args.reject_rate)
+    print(f'Fake mempool.space listening on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
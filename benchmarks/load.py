@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""End to end load test of the web app against a local mempool.space stand-in.
+
+Starts the fake mempool server (benchmarks/fake_mempool.py) and the app on
+a scratch database, then runs each scenario for a fixed time:
+
+- push: POST /<network>/api/transaction/push with fresh transactions
+- list: GET /<network>/api/transactions?limit=100
+- stats: GET /<network>/api/stats
+- rebroadcast: the push_transactions.py rebroadcast run over the stored rows
+
+The app is served by the threaded werkzeug server, like ``flask run``, or
+in a subprocess by the production entry points: --server gunicorn runs
+wsgi.py on threads, --server asgi runs asgi.py on asyncio workers
+(WEB_SERVER=asgi), both with gunicorn.conf.py.
+
+Reports req/s and p50/p95/p99 latency and saves them as JSON in
+benchmarks/results/, so runs can be compared over time with --compare.
+
+Usage:
+    python benchmarks/load.py --concurrency 16 --duration 10 --latency 0.05
+    python benchmarks/load.py --compare benchmarks/results/20261018-120000.json
+    python benchmarks/load.py --scenario push --server gunicorn --workers 4 --threads 16
+    python benchmarks/load.py --scenario push --server asgi --workers 4 --threads 16 --concurrency 128
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+from tabulate import tabulate
+from werkzeug.serving import make_server
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_mempool import FakeMempoolServer
+from benchmarks.txgen import make_raw_tx
+
+SCENARIOS = ['push', 'list', 'stats', 'rebroadcast']
+SERVERS = ['werkzeug', 'gunicorn', 'asgi']
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+
+class GunicornServer:
+    """A production entry point in a subprocess, on a free local port"""
+
+    def __init__(self, workers, threads, network, asgi=False):
+        self.asgi = asgi
+        self.workers = workers
+        self.threads = threads
+        self.network = network
+        self.process = None
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.server_port = sock.getsockname()[1]
+
+    def start(self, timeout=30):
+        env = dict(os.environ, WEB_BIND=f'127.0.0.1:{self.server_port}',
+                   WEB_CONCURRENCY=str(self.workers), WEB_THREADS=str(self.threads),
+                   WEB_SERVER='asgi' if self.asgi else 'wsgi')
+        self.process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                                        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {self.process.returncode}')
+            try:
+                requests.get(f'http://127.0.0.1:{self.server_port}/{self.network}/api/stats', timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.shutdown()
+        raise RuntimeError(f'gunicorn did not start within {timeout}s')
+
+    def shutdown(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def start_app(database_url, mempool_url, seed, network, server='werkzeug', workers=4, threads=16):
+    """Create the app on a fresh schema, seed it and serve it"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['MEMPOOL_BASE_URL'] = mempool_url
+    # Every simulated client shares one address: measure throughput, not the limiter
+    os.environ.setdefault('RATE_LIMIT_RATE', '0')
+    from app import create_app, db
+    from app.models import Transaction
+    from app.validation import compute_txid
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for _ in range(seed):
+            raw_tx = make_raw_tx()
+            db.session.add(Transaction(raw_tx=raw_tx, txid=compute_txid(raw_tx), network=network))
+        db.session.commit()
+
+    if server in ('gunicorn', 'asgi'):
+        with app.app_context():
+            # The workers open their own connections
+            db.engine.dispose()
+        return app, GunicornServer(workers, threads, network, asgi=server == 'asgi').start()
+
+    # Keep the werkzeug access log out of the report
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return app, server
+
+
+def run_http(base_url, scenario, network, concurrency, duration):
+    """Hammer one endpoint and return ``(latencies, errors, elapsed)``"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    started_at = time.monotonic()
+    deadline = started_at + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies, local_errors = [], []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if scenario == 'push':
+                    response = session.post(f'{base_url}/{network}/api/transaction/push',
+                                            json={'raw_tx': make_raw_tx()}, timeout=30)
+                elif scenario == 'list':
+                    response = session.get(f'{base_url}/{network}/api/transactions?limit=100', timeout=30)
+                else:
+                    response = session.get(f'{base_url}/{network}/api/stats', timeout=30)
+                error = f'HTTP {response.status_code}' if response.status_code >= 500 else None
+            except requests.RequestException as e:
+                error = str(e)[:100]
+            if error:
+                local_errors.append(error)
+            else:
+                local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            errors.extend(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.monotonic() - started_at
+
+
+def run_rebroadcast(database_url, network, concurrency):
+    """One rebroadcast run over the stored rows, as push_transactions.py does it"""
+    from scripts.database import Database
+    from scripts.rebroadcast import RebroadcastEngine
+
+    started_at = time.monotonic()
+    db = Database(database_url)
+    transactions = db.get_rebroadcast_candidates(network)
+    report = RebroadcastEngine(concurrency=concurrency, per_network=concurrency,
+                               per_host=concurrency).run(transactions)
+    db.save_push_results(report.results, report.latencies, report.backends)
+    errors = [result[3] for result in report.results if result[2] == 'error']
+    return report.latencies, errors, time.monotonic() - started_at
+
+
+def summarize(latencies, errors, elapsed):
+    from app.timing import latency_summary
+
+    summary = latency_summary(latencies)
+    summary['errors'] = len(errors)
+    summary['elapsed'] = elapsed
+    summary['rps'] = summary['count'] / elapsed if elapsed > 0 else 0.0
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(value):
+    return f'{value * 1000:.1f}' if value is not None else '-'
+
+
+def format_change(current, previous):
+    if current is None or not previous:
+        return ''
+    return f' ({(current - previous) / previous * 100:+.0f}%)'
+
+
+def format_table(results, baseline=None):
+    rows = []
+    for scenario, summary in results.items():
+        previous = (baseline or {}).get(scenario, {})
+        row = [scenario, summary['count'], f"{summary['rps']:.1f}" + format_change(summary['rps'], previous.get('rps'))]
+        for key in ('p50', 'p95', 'p99'):
+            row.append(format_ms(summary[key]) + format_change(summary[key], previous.get(key)))
+        row.append(summary['errors'])
+        rows.append(row)
+    return tabulate(rows, headers=['Scenario', 'Requests', 'Req/s', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Errors'],
+                    tablefmt='grid')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the app against a local mempool.space stand-in')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                       help='Scenario to run (repeatable, default: all)')
+    parser.add_argument('--network', default='signet', help='Network to load (default: signet)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients (default: 16)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per HTTP scenario (default: 10)')
+    parser.add_argument('--seed', type=int, default=2000, help='Transactions stored before the run (default: 2000)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Upstream latency in seconds (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Upstream latency jitter in seconds (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of upstream 503s (default: 0)')
+    parser.add_argument('--reject-rate', type=float, default=0.0,
+                       help='Fraction of rejected upstream broadcasts (default: 0)')
+    parser.add_argument('--server', choices=SERVERS, default='werkzeug',
+                       help='Server of the app: the threaded dev server, the gunicorn entry point on threads '
+                            'or on asyncio workers (default: werkzeug)')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes (default: 4)')
+    parser.add_argument('--threads', type=int, default=16, help='Threads per gunicorn worker (default: 16)')
+    parser.add_argument('--database-url',
+                       help='Scratch database to use instead of a temporary SQLite file (its tables are dropped)')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    args = parser.parse_args()
+
+    scenarios = args.scenario or SCENARIOS
+    fake = FakeMempoolServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             reject_rate=args.reject_rate).start()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database_url = args.database_url or f'sqlite:///{os.path.join(tmpdir, "load.db")}'
+        app, server = start_app(database_url, fake.url, args.seed, args.network, args.server,
+                                args.workers, args.threads)
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        results = {}
+        for scenario in scenarios:
+            if scenario == 'rebroadcast':
+                print('Running one rebroadcast run...')
+                measured = run_rebroadcast(database_url, args.network, args.concurrency)
+            else:
+                print(f'Running {scenario} for {args.duration:.0f}s...')
+                measured = run_http(base_url, scenario, args.network, args.concurrency, args.duration)
+            results[scenario] = summarize(*measured)
+        server.shutdown()
+        fake.stop()
+        from app import db
+        with app.app_context():
+            db.engine.dispose()
+
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+    config['database'] = database_url.split('://')[0]
+    record = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'commit': git_commit(),
+        'config': config,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, datetime.utcnow().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(record, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        baseline = previous['results']
+        print(f"\nCompared with {args.compare} (commit {previous.get('commit')}, {previous.get('timestamp')})")
+    print(format_table(results, baseline))
+    print(f'Results saved to {output}')
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Load test concurrent submits and list requests against storage backends.
+
+By default compares stock SQLite with the tuned profile (WAL,
+synchronous=NORMAL, busy timeout, mmap). Extra backends can be given as
+URLs; their transaction tables are dropped and recreated, so only point
+it at a scratch database.
+
+Usage:
+    python benchmarks/storage.py --writers 8 --readers 8 --duration 10
+    python benchmarks/storage.py --database-url postgresql://bench@localhost/mempush_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from tabulate import tabulate
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.txgen import make_raw_tx
+
+NETWORK = 'signet'
+SEED_ROWS = 2000
+
+
+def run_profile(url, sqlite_tuning, writers, readers, duration):
+    """Hammer one backend and return ``{operation: (latencies, errors)}``"""
+    os.environ['DATABASE_URL'] = url
+    os.environ['SQLITE_TUNING'] = 'true' if sqlite_tuning else 'false'
+    from app import create_app, db
+    from app.mempool import set_client_factory, FakeMempoolBackend
+
+    set_client_factory(lambda network: FakeMempoolBackend())
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        from app.models import Transaction
+        for i in range(SEED_ROWS):
+            db.session.add(Transaction(raw_tx=make_raw_tx(), txid=f'{i:064x}', network=NETWORK))
+        db.session.commit()
+
+    results = {'submit': ([], []), 'list': ([], [])}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(operation):
+        client = app.test_client()
+        latencies, errors = [], []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if operation == 'submit':
+                    response = client.post(f'/{NETWORK}/transaction/submit', json={'raw_tx': make_raw_tx()})
+                else:
+                    response = client.get(f'/{NETWORK}/api/transactions?limit=100')
+                failed = response.status_code >= 500
+                error = response.get_data(as_text=True)[:100] if failed else None
+            except Exception as e:
+                failed, error = True, str(e)[:100]
+            if failed:
+                errors.append(error)
+            else:
+                latencies.append(time.perf_counter() - started)
+        with lock:
+            results[operation][0].extend(latencies)
+            results[operation][1].extend(errors)
+
+    threads = ([threading.Thread(target=worker, args=('submit',)) for _ in range(writers)]
+               + [threading.Thread(target=worker, args=('list',)) for _ in range(readers)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    set_client_factory(None)
+    return results
+
+
+def format_rows(label, results, duration):
+    from app.timing import latency_summary
+
+    rows = []
+    for operation, (latencies, errors) in results.items():
+        summary = latency_summary(latencies)
+        rows.append([
+            label, operation, summary['count'], f"{summary['count'] / duration:.1f}",
+            f"{summary['p50'] * 1000:.1f}" if summary['count'] else '-',
+            f"{summary['p95'] * 1000:.1f}" if summary['count'] else '-',
+            f"{summary['p99'] * 1000:.1f}" if summary['count'] else '-',
+            len(errors),
+        ])
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test storage backends')
+    parser.add_argument('--writers', type=int, default=8,
+                       help='Threads submitting transactions (default: 8)')
+    parser.add_argument('--readers', type=int, default=8,
+                       help='Threads listing transactions (default: 8)')
+    parser.add_argument('--duration', type=float, default=10,
+                       help='Seconds per backend (default: 10)')
+    parser.add_argument('--database-url', action='append', default=[],
+                       help='Extra backend to test, e.g. a scratch PostgreSQL database (repeatable)')
+    args = parser.parse_args()
+
+    table = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        profiles = [
+            ('sqlite (stock)', f'sqlite:///{os.path.join(tmpdir, "stock.db")}', False),
+            ('sqlite (tuned)', f'sqlite:///{os.path.join(tmpdir, "tuned.db")}', True),
+        ] + [(url.split('://')[0], url, True) for url in args.database_url]
+        for label, url, sqlite_tuning in profiles:
+            print(f'Load testing {label} for {args.duration:.0f}s...')
+            results = run_profile(url, sqlite_tuning, args.writers, args.readers, args.duration)
+            table.extend(format_rows(label, results, args.duration))
+    print(tabulate(table, headers=['Backend', 'Operation', 'Requests', 'Req/s', 'p50 (ms)', 'p95 (ms)',
+                                   'p99 (ms)', 'Errors'], tablefmt='grid'))
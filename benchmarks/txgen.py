@@ -0,0 +1,49 @@
+"""Synthetic raw transaction generator for benchmarks"""
+import os
+import random
+import struct
+
+
+# Compressed secp256k1 generator point, a valid public key
+PUBKEY = bytes.fromhex('0279be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798')
+
+
+def _varint(n):
+    if n < 0xfd:
+        return bytes([n])
+    if n <= 0xffff:
+        return b'\xfd' + struct.pack('<H', n)
+    return b'\xfe' + struct.pack('<I', n)
+
+
+def _signature():
+    """A random DER encoded signature with SIGHASH_ALL"""
+    r = bytes([random.randint(1, 0x7f)]) + os.urandom(31)
+    s = bytes([random.randint(1, 0x7f)]) + os.urandom(31)
+    return b'\x30\x44\x02\x20' + r + b'\x02\x20' + s + b'\x01'
+
+
+def make_raw_tx(inputs=1, outputs=2, segwit=False, prevouts=None):
+    """Build a structurally valid raw transaction hex string.
+
+    Inputs spend random (or the given ``(txid, vout)``) outpoints and
+    outputs pay to random P2WPKH scripts. Signatures are random bytes, so
+    the transaction parses but would be rejected by a real node.
+    """
+    prevouts = prevouts or [(os.urandom(32)[::-1].hex(), random.randint(0, 3)) for _ in range(inputs)]
+    body = _varint(len(prevouts))
+    for txid, vout in prevouts:
+        script_sig = b'' if segwit else b'\x47' + _signature() + b'\x21' + PUBKEY
+        body += bytes.fromhex(txid)[::-1] + struct.pack('<I', vout)
+        body += _varint(len(script_sig)) + script_sig + b'\xfd\xff\xff\xff'
+    body += _varint(outputs)
+    for _ in range(outputs):
+        script_pubkey = b'\x00\x14' + os.urandom(20)
+        body += struct.pack('<q', random.randint(546, 10 ** 7)) + _varint(len(script_pubkey)) + script_pubkey
+
+    version = struct.pack('<i', 2)
+    locktime = b'\x00' * 4
+    if not segwit:
+        return (version + body + locktime).hex()
+    witness = b''.join(b'\x02\x47' + _signature() + b'\x21' + PUBKEY for _ in prevouts)
+    return (version + b'\x00\x01' + body + witness + locktime).hex()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of raw transaction validation: the former per-character
+hex check plus a full bitcoinlib parse against app.validation.
+
+Usage:
+    python benchmarks/validation.py --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+
+from tabulate import tabulate
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.validation import compute_txid
+from benchmarks.txgen import make_raw_tx
+
+
+def legacy_txid(raw_tx):
+    """The validation previously done by every submit path"""
+    from bitcoinlib.transactions import Transaction as BtcTransaction
+    if not all(c in '0123456789abcdefABCDEF' for c in raw_tx):
+        raise ValueError('Invalid hex format')
+    return BtcTransaction.parse_hex(raw_tx).txid
+
+
+def measure(func, raw_tx, repeat):
+    """Return the mean time per call in microseconds"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(raw_tx)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark raw transaction validation')
+    parser.add_argument('--repeat', type=int, default=200,
+                       help='Calls per transaction size (default: 200)')
+    args = parser.parse_args()
+
+    cases = [
+        ('1 in / 2 out', make_raw_tx(1, 2)),
+        ('10 in / 10 out', make_raw_tx(10, 10)),
+        ('10 in / 10 out segwit', make_raw_tx(10, 10, segwit=True)),
+        ('500 in / 20 out', make_raw_tx(500, 20)),
+    ]
+    table = []
+    for name, raw_tx in cases:
+        assert legacy_txid(raw_tx) == compute_txid(raw_tx)
+        legacy = measure(legacy_txid, raw_tx, args.repeat)
+        fast = measure(compute_txid, raw_tx, args.repeat)
+        table.append([name, len(raw_tx) // 2, f'{legacy:.1f}', f'{fast:.1f}', f'{legacy / fast:.1f}x'])
+    print(tabulate(table, headers=['Transaction', 'Bytes', 'Legacy (us)', 'Fast path (us)', 'Speedup'],
+                   tablefmt='grid'))
@@ -0,0 +1,60 @@
+"""Gunicorn settings of the production entry points, wsgi.py and asgi.py
+
+Every worker process has its own threads, database pool and upstream
+request slots (UPSTREAM_CONCURRENCY per worker). Set
+RATE_LIMIT_DB and MEMPOOL_CACHE_DB to share rate limits and the upstream
+cache between workers. Metrics are aggregated over the workers through
+snapshot files in METRICS_DIR.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv('WEB_BIND', '127.0.0.1:3000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# WEB_SERVER=asgi serves asgi:app on asyncio workers instead of wsgi:app on
+# threads: the upstream-bound routes then wait on the event loop without
+# holding a thread (app/asgi.py), the others still run on WEB_THREADS threads.
+asgi = os.getenv('WEB_SERVER', 'wsgi') == 'asgi'
+wsgi_app = 'asgi:app' if asgi else 'wsgi:app'
+worker_class = 'asgi' if asgi else 'gthread'
+# Requests served at once per worker; a request waiting upstream holds one
+# (unless served by asgi). Every open /<network>/events stream holds one too
+# for as long as its page is open: at most EVENTS_MAX_SUBSCRIBERS (default 8)
+# per worker, further streams get a 503, so keep it well below the thread count.
+web_threads = int(os.getenv('WEB_THREADS', '16'))
+# The asyncio workers run their thread pool themselves
+threads = 1 if asgi else web_threads
+# Longer than an upstream call with its retries and queueing
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+# Workers are replaced now and then to bound memory growth
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+
+# Every worker writes its metrics here, so that /metrics reports the whole server
+metrics_dir = os.environ.setdefault(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), f'mempush-metrics-{os.getpid()}'))
+
+
+def _clear_metrics():
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        os.remove(path)
+
+
+def on_starting(server):
+    # Counters start from zero with the server
+    os.makedirs(metrics_dir, exist_ok=True)
+    _clear_metrics()
+
+
+def worker_exit(server, worker):
+    # Keep the counts since the last periodic snapshot of a replaced worker
+    from app.metrics import write_snapshot
+    write_snapshot(metrics_dir)
+
+
+def on_exit(server):
+    _clear_metrics()
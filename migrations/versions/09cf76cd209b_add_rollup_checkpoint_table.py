@@ -0,0 +1,38 @@
+"""add rollup_checkpoint table
+
+Revision ID: 09cf76cd209b
+Revises: c9963e9995ec
+Create Date: 2026-10-18 20:05:31.417260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '09cf76cd209b'
+down_revision = 'c9963e9995ec'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rollup_checkpoint',
+    sa.Column('network', sa.String(length=20), nullable=False),
+    sa.Column('last_event_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('network')
+    )
+    # Networks rolled up before start after their existing events, which the
+    # hourly_stats rows computed from the transaction table already count
+    op.execute(
+        'INSERT INTO rollup_checkpoint (network, last_event_id, updated_at) '
+        'SELECT t.network, MAX(e.id), CURRENT_TIMESTAMP '
+        'FROM transaction_event e JOIN "transaction" t ON t.id = e.transaction_id '
+        'WHERE t.network IN (SELECT network FROM hourly_stats) '
+        'GROUP BY t.network'
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_checkpoint')
@@ -0,0 +1,42 @@
+"""add rebroadcast schedule columns
+
+Revision ID: 128445778a2b
+Revises: d304c40eec80
+Create Date: 2026-10-18 15:02:41.376204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '128445778a2b'
+down_revision = 'd304c40eec80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('failure_class', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+    # Everything not confirmed is due right away, least recently updated first;
+    # failures are classified on their next attempt
+    transaction = sa.table('transaction', sa.column('status', sa.String),
+                           sa.column('updated_at', sa.DateTime), sa.column('next_attempt_at', sa.DateTime))
+    op.execute(
+        transaction.update()
+        .where(sa.or_(transaction.c.status.is_(None), transaction.c.status != 'confirmed'))
+        .values(next_attempt_at=sa.func.coalesce(transaction.c.updated_at, sa.func.current_timestamp()))
+    )
+
+    op.create_index('ix_transaction_next_attempt_at', 'transaction',
+                    ['next_attempt_at', 'network'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_next_attempt_at', table_name='transaction')
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('failure_class')
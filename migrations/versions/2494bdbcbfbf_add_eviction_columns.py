@@ -0,0 +1,28 @@
+"""add eviction columns
+
+Revision ID: 2494bdbcbfbf
+Revises: 4195341f0469
+Create Date: 2026-10-18 17:12:44.903561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2494bdbcbfbf'
+down_revision = '4195341f0469'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('evicted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('eviction_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_column('eviction_count')
+        batch_op.drop_column('evicted_at')
@@ -0,0 +1,30 @@
+"""add sync_checkpoint table
+
+Revision ID: 25dc516ce077
+Revises: f7489e32261e
+Create Date: 2026-10-18 12:14:08.531962
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '25dc516ce077'
+down_revision = 'f7489e32261e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_checkpoint',
+    sa.Column('network', sa.String(length=20), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('block_hash', sa.String(length=64), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('network')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_checkpoint')
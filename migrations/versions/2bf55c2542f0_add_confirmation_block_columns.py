@@ -0,0 +1,64 @@
+"""add confirmation block columns
+
+Revision ID: 2bf55c2542f0
+Revises: b9784f291bcf
+Create Date: 2026-10-18 21:40:17.263509
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2bf55c2542f0'
+down_revision = 'b9784f291bcf'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+CONFIRMED_IN = re.compile(r'Confirmed in block (\d+) \(([0-9a-f]{64})\)')
+
+
+def upgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('block_height', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('block_hash', sa.String(length=64), nullable=True))
+
+    # Confirmations recorded by the block scan name their block in the analysis result
+    transaction = sa.table('transaction', sa.column('id', sa.Integer), sa.column('status', sa.String),
+                           sa.column('analysis_result', sa.Text), sa.column('block_height', sa.Integer),
+                           sa.column('block_hash', sa.String))
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(transaction.c.id, transaction.c.analysis_result)
+            .where(transaction.c.id > last_id, transaction.c.status == 'confirmed')
+            .order_by(transaction.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        params = [{'b_id': id, 'b_block_height': int(match.group(1)), 'b_block_hash': match.group(2)}
+                  for id, analysis_result in rows
+                  for match in (CONFIRMED_IN.match(analysis_result or ''),) if match]
+        if params:
+            conn.execute(
+                transaction.update()
+                .where(transaction.c.id == sa.bindparam('b_id'))
+                .values(block_height=sa.bindparam('b_block_height'), block_hash=sa.bindparam('b_block_hash')),
+                params,
+            )
+        last_id = rows[-1][0]
+
+    op.create_index('ix_transaction_network_block_height', 'transaction',
+                    ['network', 'block_height'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_network_block_height', table_name='transaction')
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_column('block_hash')
+        batch_op.drop_column('block_height')
@@ -0,0 +1,39 @@
+"""add hourly_stats table
+
+Revision ID: 336d569a9096
+Revises: 2494bdbcbfbf
+Create Date: 2026-10-18 17:58:20.117356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '336d569a9096'
+down_revision = '2494bdbcbfbf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask rollup-stats`
+    op.create_table(
+        'hourly_stats',
+        sa.Column('network', sa.String(length=20), nullable=False),
+        sa.Column('hour', sa.DateTime(), nullable=False),
+        sa.Column('submitted', sa.Integer(), nullable=False),
+        sa.Column('accepted', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.Integer(), nullable=False),
+        sa.Column('confirmed', sa.Integer(), nullable=False),
+        sa.Column('evicted', sa.Integer(), nullable=False),
+        sa.Column('confirmation_seconds', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('network', 'hour'),
+    )
+    op.create_index('ix_transaction_network_evicted_at', 'transaction', ['network', 'evicted_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_network_evicted_at', table_name='transaction')
+    op.drop_table('hourly_stats')
@@ -0,0 +1,45 @@
+"""add decoded analysis columns
+
+Revision ID: 4195341f0469
+Revises: cf956e3926b8
+Create Date: 2026-10-18 16:31:07.284519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4195341f0469'
+down_revision = 'cf956e3926b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are decoded by `flask backfill-analysis`
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('vsize', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('weight', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('input_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('output_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('output_value', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('fee', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('fee_rate', sa.Float(), nullable=True))
+
+    op.create_index('ix_transaction_network_fee_rate', 'transaction',
+                    ['network', 'fee_rate', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_network_fee_rate', table_name='transaction')
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_column('fee_rate')
+        batch_op.drop_column('fee')
+        batch_op.drop_column('output_value')
+        batch_op.drop_column('output_count')
+        batch_op.drop_column('input_count')
+        batch_op.drop_column('weight')
+        batch_op.drop_column('vsize')
+        batch_op.drop_column('size')
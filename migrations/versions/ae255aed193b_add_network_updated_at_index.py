@@ -0,0 +1,25 @@
+"""add network/updated_at index for incremental exports
+
+Revision ID: ae255aed193b
+Revises: e817c6fa4ec0
+Create Date: 2026-10-18 10:47:19.804412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ae255aed193b'
+down_revision = 'e817c6fa4ec0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_transaction_network_updated_at', 'transaction',
+                    ['network', 'updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_network_updated_at', table_name='transaction')
@@ -0,0 +1,35 @@
+"""add unique active push_job index
+
+Revision ID: b9784f291bcf
+Revises: 09cf76cd209b
+Create Date: 2026-10-18 21:12:08.904316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9784f291bcf'
+down_revision = '09cf76cd209b'
+branch_labels = None
+depends_on = None
+
+ACTIVE = "status IN ('queued', 'running')"
+
+
+def upgrade():
+    # Jobs queued twice for a transaction by concurrent requests: keep the oldest
+    op.execute(
+        'UPDATE push_job SET status = \'failed\', lease_owner = NULL, '
+        'result = \'{"http_status": 409, "response": {"error": "Duplicate of an earlier job"}}\' '
+        f'WHERE {ACTIVE} AND id NOT IN '
+        f'(SELECT MIN(id) FROM push_job WHERE {ACTIVE} GROUP BY network, txid)'
+    )
+    op.create_index('uq_push_job_active_network_txid', 'push_job', ['network', 'txid'], unique=True,
+                    sqlite_where=sa.text(ACTIVE), postgresql_where=sa.text(ACTIVE))
+
+
+def downgrade():
+    op.drop_index('uq_push_job_active_network_txid', table_name='push_job',
+                  sqlite_where=sa.text(ACTIVE), postgresql_where=sa.text(ACTIVE))
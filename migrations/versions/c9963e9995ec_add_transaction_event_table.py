@@ -0,0 +1,40 @@
+"""add transaction_event table
+
+Revision ID: c9963e9995ec
+Revises: 336d569a9096
+Create Date: 2026-10-18 18:41:07.523904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9963e9995ec'
+down_revision = '336d569a9096'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # History starts with the upgrade, existing rows keep only their current state
+    op.create_table(
+        'transaction_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('backend', sa.String(length=255), nullable=True),
+        sa.Column('latency', sa.Float(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['transaction_id'], ['transaction.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_transaction_event_transaction_id', 'transaction_event', ['transaction_id', 'id'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_event_transaction_id', table_name='transaction_event')
+    op.drop_table('transaction_event')
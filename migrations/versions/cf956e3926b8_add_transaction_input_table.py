@@ -0,0 +1,101 @@
+"""add transaction_input table
+
+Revision ID: cf956e3926b8
+Revises: 128445778a2b
+Create Date: 2026-10-18 15:48:12.530917
+
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf956e3926b8'
+down_revision = '128445778a2b'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _unpack(codec, data):
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'raw':
+        return bytes(data)
+    return None
+
+
+def _varint(data, pos):
+    prefix = data[pos]
+    if prefix < 0xfd:
+        return prefix, pos + 1
+    size = {0xfd: 2, 0xfe: 4, 0xff: 8}[prefix]
+    return int.from_bytes(data[pos + 1:pos + 1 + size], 'little'), pos + 1 + size
+
+
+def _outpoints(data):
+    """(prev_txid, prev_vout) of each input of a serialized transaction"""
+    pos = 4
+    if len(data) > 5 and data[4] == 0 and data[5] != 0:
+        pos += 2
+    count, pos = _varint(data, pos)
+    outpoints = []
+    for _ in range(count):
+        prev_txid = data[pos:pos + 32][::-1].hex()
+        prev_vout = int.from_bytes(data[pos + 32:pos + 36], 'little')
+        script_length, pos = _varint(data, pos + 36)
+        pos += script_length + 4
+        outpoints.append((prev_txid, prev_vout))
+    return outpoints
+
+
+def upgrade():
+    transaction_input = op.create_table(
+        'transaction_input',
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('vin', sa.Integer(), nullable=False),
+        sa.Column('prev_txid', sa.String(length=64), nullable=False),
+        sa.Column('prev_vout', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['transaction_id'], ['transaction.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('transaction_id', 'vin'),
+    )
+
+    # Decode the inputs of the stored transactions in batches
+    bind = op.get_bind()
+    blob = sa.table('transaction_blob', sa.column('transaction_id', sa.Integer),
+                    sa.column('codec', sa.String), sa.column('data', sa.LargeBinary))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(blob.c.transaction_id, blob.c.codec, blob.c.data)
+            .where(blob.c.transaction_id > last_id)
+            .order_by(blob.c.transaction_id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        values = []
+        for transaction_id, codec, data in rows:
+            try:
+                raw = _unpack(codec, data)
+                outpoints = _outpoints(raw) if raw else []
+            except (IndexError, KeyError, zlib.error):
+                outpoints = []
+            values.extend({'transaction_id': transaction_id, 'vin': vin, 'prev_txid': prev_txid,
+                           'prev_vout': prev_vout} for vin, (prev_txid, prev_vout) in enumerate(outpoints))
+        if values:
+            bind.execute(transaction_input.insert(), values)
+        last_id = rows[-1][0]
+
+    op.create_index('ix_transaction_input_prev_txid', 'transaction_input', ['prev_txid'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_input_prev_txid', table_name='transaction_input')
+    op.drop_table('transaction_input')
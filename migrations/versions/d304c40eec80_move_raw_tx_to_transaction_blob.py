@@ -0,0 +1,116 @@
+"""move raw_tx to transaction_blob
+
+Revision ID: d304c40eec80
+Revises: 25dc516ce077
+Create Date: 2026-10-18 12:52:31.604118
+
+"""
+import binascii
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd304c40eec80'
+down_revision = '25dc516ce077'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+transaction = sa.table('transaction', sa.column('id', sa.Integer), sa.column('raw_tx', sa.Text))
+transaction_blob = sa.table(
+    'transaction_blob',
+    sa.column('transaction_id', sa.Integer),
+    sa.column('codec', sa.String),
+    sa.column('data', sa.LargeBinary),
+)
+
+
+def _pack(raw_tx):
+    # Same encoding as app.blobs.pack_raw_tx with the zlib codec
+    try:
+        data = binascii.unhexlify(raw_tx)
+    except (binascii.Error, ValueError):
+        return 'text', raw_tx.encode()
+    compressed = zlib.compress(data, 9)
+    if len(compressed) < len(data):
+        return 'zlib', compressed
+    return 'raw', data
+
+
+def _unpack(codec, data):
+    if codec == 'zlib':
+        return zlib.decompress(data).hex()
+    if codec == 'text':
+        return bytes(data).decode()
+    if codec == 'raw':
+        return bytes(data).hex()
+    raise ValueError(f'Cannot downgrade {codec} compressed transactions, re-encode them as zlib first')
+
+
+def upgrade():
+    op.create_table('transaction_blob',
+    sa.Column('transaction_id', sa.Integer(), nullable=False),
+    sa.Column('codec', sa.String(length=10), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transaction.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('transaction_id')
+    )
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(transaction.c.id, transaction.c.raw_tx)
+            .where(transaction.c.id > last_id)
+            .order_by(transaction.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        blobs = []
+        for transaction_id, raw_tx in rows:
+            codec, data = _pack(raw_tx)
+            blobs.append({'transaction_id': transaction_id, 'codec': codec, 'data': data})
+        conn.execute(transaction_blob.insert(), blobs)
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_column('raw_tx')
+
+    if conn.dialect.name == 'sqlite':
+        # Give the space of the dropped hex column back to the filesystem
+        with op.get_context().autocommit_block():
+            op.execute('VACUUM')
+
+
+def downgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('raw_tx', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(transaction_blob.c.transaction_id, transaction_blob.c.codec, transaction_blob.c.data)
+            .where(transaction_blob.c.transaction_id > last_id)
+            .order_by(transaction_blob.c.transaction_id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for transaction_id, codec, data in rows:
+            conn.execute(
+                transaction.update()
+                .where(transaction.c.id == transaction_id)
+                .values(raw_tx=_unpack(codec, data))
+            )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.alter_column('raw_tx', existing_type=sa.Text(), nullable=False)
+
+    op.drop_table('transaction_blob')
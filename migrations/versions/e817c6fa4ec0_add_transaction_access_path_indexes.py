@@ -0,0 +1,31 @@
+"""add transaction access path indexes
+
+Revision ID: e817c6fa4ec0
+Revises: fb820ac0b805
+Create Date: 2026-10-18 10:02:41.530117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e817c6fa4ec0'
+down_revision = 'fb820ac0b805'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_transaction_network_created_at', 'transaction',
+                    ['network', 'created_at', 'id'], unique=False)
+    op.create_index('ix_transaction_network_status_updated_at', 'transaction',
+                    ['network', 'status', 'updated_at'], unique=False)
+    op.create_index('ix_transaction_network_stats', 'transaction',
+                    ['network', 'status', 'push_attempts', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_network_stats', table_name='transaction')
+    op.drop_index('ix_transaction_network_status_updated_at', table_name='transaction')
+    op.drop_index('ix_transaction_network_created_at', table_name='transaction')
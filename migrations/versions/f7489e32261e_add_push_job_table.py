@@ -0,0 +1,42 @@
+"""add push_job table
+
+Revision ID: f7489e32261e
+Revises: ae255aed193b
+Create Date: 2026-10-18 11:36:52.207741
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7489e32261e'
+down_revision = 'ae255aed193b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('push_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('network', sa.String(length=20), nullable=False),
+    sa.Column('txid', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('lease_owner', sa.String(length=64), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_push_job_status_available_at', 'push_job', ['status', 'available_at'], unique=False)
+    op.create_index('ix_push_job_network_txid', 'push_job', ['network', 'txid'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_push_job_network_txid', table_name='push_job')
+    op.drop_index('ix_push_job_status_available_at', table_name='push_job')
+    op.drop_table('push_job')
@@ -0,0 +1,33 @@
+"""add deleted_transaction table
+
+Revision ID: f8a9a92d8bf9
+Revises: 2bf55c2542f0
+Create Date: 2026-10-18 22:04:52.117830
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8a9a92d8bf9'
+down_revision = '2bf55c2542f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('deleted_transaction',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('network', sa.String(length=20), nullable=False),
+    sa.Column('txid', sa.String(length=64), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_deleted_transaction_network_deleted_at', 'deleted_transaction',
+                    ['network', 'deleted_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_deleted_transaction_network_deleted_at', table_name='deleted_transaction')
+    op.drop_table('deleted_transaction')
@@ -0,0 +1,40 @@
+"""add network_counter table
+
+Revision ID: fb820ac0b805
+Revises: a0bdc059621a
+Create Date: 2026-10-18 09:12:04.118320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fb820ac0b805'
+down_revision = 'a0bdc059621a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('network_counter',
+    sa.Column('network', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('tx_count', sa.Integer(), nullable=False),
+    sa.Column('attempted_count', sa.Integer(), nullable=False),
+    sa.Column('push_attempts', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('network', 'status')
+    )
+    # Seed the counters from the existing transactions
+    op.execute('''
+        INSERT INTO network_counter (network, status, tx_count, attempted_count, push_attempts)
+        SELECT network, COALESCE(status, 'pending'), COUNT(id),
+               SUM(CASE WHEN push_attempts > 0 THEN 1 ELSE 0 END),
+               COALESCE(SUM(push_attempts), 0)
+        FROM "transaction"
+        GROUP BY network, COALESCE(status, 'pending')
+    ''')
+
+
+def downgrade():
+    op.drop_table('network_counter')
@@ -0,0 +1,81 @@
+"""Confirmation tracker: follows new blocks instead of polling each transaction"""
+from collections import namedtuple
+
+from app.mempool import get_client
+
+# Blocks scanned on the first run of a network (about one day of blocks)
+INITIAL_LOOKBACK = 144
+# Upper bound of blocks scanned in a single run
+MAX_BLOCKS = 1000
+# Blocks rescanned when the checkpoint block is no longer in the best chain
+REORG_DEPTH = 6
+
+SyncReport = namedtuple('SyncReport', ['network', 'from_height', 'to_height', 'blocks', 'confirmed', 'reverted'])
+
+
+class ConfirmationTracker:
+    """Mark stored transactions confirmed by scanning the txids of new blocks.
+
+    Unconfirmed txids of a network are loaded once into a set and every new
+    block's txid list is matched against it in a single pass, so upstream
+    calls grow with the number of blocks rather than with the number of
+    pending transactions. The last scanned block is kept as a checkpoint.
+    """
+
+    def __init__(self, db, initial_lookback=INITIAL_LOOKBACK, max_blocks=MAX_BLOCKS,
+                 reorg_depth=REORG_DEPTH, client_func=get_client):
+        self.db = db
+        self.initial_lookback = initial_lookback
+        self.max_blocks = max_blocks
+        self.reorg_depth = reorg_depth
+        self.client_func = client_func
+
+    def _start_height(self, network, client, tip):
+        """First height to scan, and whether the checkpoint block was reorganized away"""
+        checkpoint = self.db.get_sync_checkpoint(network)
+        reorged = False
+        if checkpoint is None:
+            start = tip - self.initial_lookback + 1
+        else:
+            height, block_hash = checkpoint
+            if height <= tip and client.get_block_hash(height) == block_hash:
+                start = height + 1
+            else:
+                # The checkpoint block was reorganized away, rescan below it
+                start = min(height, tip) - self.reorg_depth + 1
+                reorged = True
+        return max(start, tip - self.max_blocks + 1, 0), reorged
+
+    def sync(self, network):
+        """Scan the blocks mined since the last run and return a SyncReport"""
+        client = self.client_func(network)
+        tip = client.get_tip_height()
+        start, reorged = self._start_height(network, client, tip)
+        if start > tip:
+            return SyncReport(network, start, tip, 0, [], [])
+
+        unconfirmed = self.db.get_unconfirmed_txids(network)
+        # After a reorg the confirmations of the rescanned heights are matched
+        # again: those whose block left the best chain are reverted
+        rescanned = self.db.get_confirmed_blocks(network, start) if reorged else {}
+        unconfirmed |= set(rescanned)
+        confirmations = []
+        block_hash = None
+        for height in range(start, tip + 1):
+            if not unconfirmed and height < tip:
+                # Nothing left to match, only the tip is needed for the checkpoint
+                continue
+            block_hash = client.get_block_hash(height)
+            if not unconfirmed:
+                continue
+            for txid in client.get_block_txids(block_hash):
+                if txid in unconfirmed:
+                    unconfirmed.discard(txid)
+                    confirmations.append((txid, height, block_hash))
+
+        found = {txid: confirmed_in for txid, _, confirmed_in in confirmations}
+        reverted = [(txid, confirmed_in) for txid, confirmed_in in rescanned.items() if found.get(txid) != confirmed_in]
+        confirmations = [confirmation for confirmation in confirmations
+                         if rescanned.get(confirmation[0]) != confirmation[2]]
+        self.db.save_confirmations(network, confirmations, tip, block_hash, reverted)
+        return SyncReport(network, start, tip, tip - start + 1, confirmations, reverted)
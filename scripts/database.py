@@ -1,64 +1,399 @@
-import sqlite3
+import os
 from datetime import datetime
 
+from sqlalchemy import bindparam, func, inspect, insert, select, update, case, delete
+from sqlalchemy.engine import make_url
+
+from app.audit import event_row, insert_events, push_backend, push_kind
+from app.blobs import unpack_raw_tx
+from app.models import Transaction, TransactionBlob, TransactionInput, NetworkCounter, SyncCheckpoint
+from app.scheduling import schedule
+from app.storage import create_storage_engine, database_url
+
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+
+transactions = Transaction.__table__
+blobs = TransactionBlob.__table__
+inputs = TransactionInput.__table__
+network_counters = NetworkCounter.__table__
+sync_checkpoints = SyncCheckpoint.__table__
+
+_engines = {}
+
+
+def resolve_database_url(db_path=None):
+    """Database URL for a path or URL, defaulting to the web app's database
+
+    Relative SQLite paths are resolved against the instance folder, like
+    Flask-SQLAlchemy does for the web app.
+    """
+    if db_path and '://' not in db_path:
+        return f'sqlite:///{os.path.abspath(db_path)}'
+    url = make_url(database_url(db_path))
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(INSTANCE_PATH, url.database))
+    return url.render_as_string(hide_password=False)
+
+
+def get_engine(url):
+    """Shared engine per URL, so every Database reuses one connection pool"""
+    if url not in _engines:
+        _engines[url] = create_storage_engine(url)
+    return _engines[url]
+
+
 class Database:
-    def __init__(self, db_path='instance/mempush.db'):
-        self.db_path = db_path
+    def __init__(self, db_path=None):
+        self.url = resolve_database_url(db_path)
+        self.engine = get_engine(self.url)
+        # Probe the schema once instead of on every query
+        inspector = inspect(self.engine)
+        self.has_network = 'network' in {column['name'] for column in inspector.get_columns('transaction')}
+        self.has_counters = inspector.has_table('network_counter')
+        self.has_events = inspector.has_table('transaction_event')
 
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
+    def _list_query(self, network=None):
+        columns = [transactions.c.txid, transactions.c.status, transactions.c.push_attempts,
+                   transactions.c.created_at, transactions.c.updated_at]
+        if self.has_network:
+            columns.insert(1, transactions.c.network)
+        query = select(*columns).order_by(transactions.c.created_at.desc())
+        if network and self.has_network:
+            query = query.where(transactions.c.network == network)
+        return query
+
+    def _list(self, network=None):
+        with self.engine.connect() as conn:
+            rows = conn.execute(self._list_query(network)).all()
+        if self.has_network:
+            return [tuple(row) for row in rows]
+        # Old schema without network column: every record is on mainchain
+        return [(tx[0], 'mainchain', tx[1], tx[2], tx[3], tx[4]) for tx in rows]
 
     def get_all_transactions(self):
         """Get all transactions from the database"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            # Check if network column exists
-            try:
-                cursor.execute('''
-                    SELECT txid, network, status, push_attempts, created_at, updated_at
-                    FROM "transaction"
-                    ORDER BY created_at DESC
-                ''')
-            except sqlite3.OperationalError:
-                # Fallback for old schema without network column
-                cursor.execute('''
-                    SELECT txid, status, push_attempts, created_at, updated_at
-                    FROM "transaction"
-                    ORDER BY created_at DESC
-                ''')
-                # Add 'mainchain' as default network for old records
-                results = cursor.fetchall()
-                return [(tx[0], 'mainchain', tx[1], tx[2], tx[3], tx[4]) for tx in results]
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        return self._list()
 
     def get_transactions_by_network(self, network):
         """Get transactions for a specific network"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            # Check if network column exists
-            try:
-                cursor.execute('''
-                    SELECT txid, network, status, push_attempts, created_at, updated_at
-                    FROM "transaction"
-                    WHERE network = ?
-                    ORDER BY created_at DESC
-                ''', (network,))
-            except sqlite3.OperationalError:
-                # Fallback for old schema without network column
-                if network == 'mainchain':
-                    cursor.execute('''
-                        SELECT txid, status, push_attempts, created_at, updated_at
-                        FROM "transaction"
-                        ORDER BY created_at DESC
-                    ''')
-                    results = cursor.fetchall()
-                    return [(tx[0], 'mainchain', tx[1], tx[2], tx[3], tx[4]) for tx in results]
-                else:
-                    return []
-            return cursor.fetchall()
-        finally:
-            conn.close() 
\ No newline at end of file
+        if not self.has_network and network != 'mainchain':
+            return []
+        return self._list(network)
+
+    def get_rebroadcast_candidates(self, network=None, force=False):
+        """Get transactions due for a rebroadcast, with their raw hex
+
+        Args:
+            network (str): Network to filter by (optional)
+            force (bool): Ignore the schedule and return every non-confirmed
+                transaction, including parked ones
+        """
+        query = (select(transactions.c.txid, transactions.c.network, blobs.c.codec, blobs.c.data)
+                 .join(blobs, blobs.c.transaction_id == transactions.c.id))
+        if force:
+            # Least recently updated first, served by the network/status/updated_at index
+            query = (query.where(transactions.c.status.in_(('pending', 'success', 'failed', 'error')))
+                     .order_by(transactions.c.updated_at))
+        else:
+            # Only due rows, served by the next_attempt_at index
+            query = (query.where(transactions.c.next_attempt_at <= datetime.utcnow())
+                     .order_by(transactions.c.next_attempt_at))
+        if network:
+            query = query.where(transactions.c.network == network)
+        with self.engine.connect() as conn:
+            return [(txid, network_name, unpack_raw_tx(codec, data))
+                    for txid, network_name, codec, data in conn.execute(query)]
+
+    def count_scheduled(self, network=None):
+        """Number of transactions waiting for a later attempt and parked ones"""
+        now = datetime.utcnow()
+        query = select(
+            func.sum(case((transactions.c.next_attempt_at > now, 1), else_=0)),
+            func.sum(case(((transactions.c.failure_class == 'terminal') & transactions.c.next_attempt_at.is_(None),
+                           1), else_=0)),
+        )
+        if network:
+            query = query.where(transactions.c.network == network)
+        with self.engine.connect() as conn:
+            waiting, parked = conn.execute(query).one()
+        return waiting or 0, parked or 0
+
+    def get_parent_links(self, candidates):
+        """Map ``(network, txid)`` to the unconfirmed stored transactions it spends from
+
+        Args:
+            candidates (list): (txid, network, ...) tuples, e.g. rebroadcast candidates
+        """
+        parent = transactions.alias('parent')
+        links = {}
+        by_network = {}
+        for candidate in candidates:
+            by_network.setdefault(candidate[1], []).append(candidate[0])
+        with self.engine.connect() as conn:
+            for network, txids in by_network.items():
+                for start in range(0, len(txids), 500):
+                    query = (
+                        select(transactions.c.txid, inputs.c.prev_txid)
+                        .join(inputs, inputs.c.transaction_id == transactions.c.id)
+                        .join(parent, (parent.c.txid == inputs.c.prev_txid) & (parent.c.network == network))
+                        .where(transactions.c.network == network, transactions.c.txid.in_(txids[start:start + 500]),
+                               (parent.c.status.is_(None)) | (parent.c.status != 'confirmed'))
+                    )
+                    for txid, prev_txid in conn.execute(query):
+                        links.setdefault((network, txid), set()).add(prev_txid)
+        return links
+
+    def _current_rows(self, conn, keys):
+        """Row id and current push attempts of ``(txid, network)`` keys"""
+        rows = {}
+        by_network = {}
+        for txid, network in keys:
+            by_network.setdefault(network, []).append(txid)
+        for network, txids in by_network.items():
+            for start in range(0, len(txids), 500):
+                query = select(transactions.c.txid, transactions.c.id, transactions.c.push_attempts).where(
+                    transactions.c.network == network, transactions.c.txid.in_(txids[start:start + 500]))
+                for txid, id, push_attempts in conn.execute(query):
+                    rows[(txid, network)] = (id, push_attempts or 0)
+        return rows
+
+    def _transaction_ids(self, conn, network, txids, status=None, exclude_status=None):
+        """``{txid: id}`` of the stored transactions among ``txids``, optionally
+        with or without a status"""
+        ids = {}
+        txids = list(txids)
+        for start in range(0, len(txids), 500):
+            query = select(transactions.c.txid, transactions.c.id).where(
+                transactions.c.network == network, transactions.c.txid.in_(txids[start:start + 500]))
+            if status:
+                query = query.where(transactions.c.status == status)
+            if exclude_status:
+                query = query.where(transactions.c.status.is_(None) | (transactions.c.status != exclude_status))
+            ids.update(conn.execute(query).all())
+        return ids
+
+    def save_push_results(self, results, latencies=None, backends=None):
+        """Store the outcome of a rebroadcast run in a single transaction
+
+        Each transaction is rescheduled from its outcome, see app.scheduling,
+        and the outcome is appended to its history.
+
+        Args:
+            results (list): (txid, network, status, analysis_result, attempted) tuples
+            latencies (list): Seconds spent on each result, in the same order
+            backends (list): Backend that answered each result, in the same order
+        """
+        if not results:
+            return
+        latencies = latencies or [None] * len(results)
+        backends = backends or [None] * len(results)
+        now = datetime.utcnow()
+        statement = (
+            update(transactions)
+            .where(transactions.c.txid == bindparam('b_txid'),
+                   transactions.c.network == bindparam('b_network'))
+            .values(status=bindparam('b_status'), analysis_result=bindparam('b_analysis_result'),
+                    push_attempts=func.coalesce(transactions.c.push_attempts, 0) + bindparam('b_attempted'),
+                    failure_class=bindparam('b_failure_class'), next_attempt_at=bindparam('b_next_attempt_at'),
+                    updated_at=now)
+        )
+        with self.engine.begin() as conn:
+            current = self._current_rows(conn, [(result[0], result[1]) for result in results])
+            params, events = [], []
+            for (txid, network, status, analysis_result, attempted), latency, backend in zip(
+                    results, latencies, backends):
+                if (txid, network) not in current:
+                    continue
+                id, attempts = current[(txid, network)]
+                total = attempts + (1 if attempted else 0)
+                next_attempt_at, failure_class = schedule(status, analysis_result, total, now)
+                params.append({'b_txid': txid, 'b_network': network, 'b_status': status,
+                               'b_analysis_result': analysis_result, 'b_attempted': 1 if attempted else 0,
+                               'b_failure_class': failure_class, 'b_next_attempt_at': next_attempt_at})
+                events.append(event_row(id, push_kind(attempted), status, analysis_result,
+                                        backend or push_backend(network), latency, now))
+            if not params:
+                return
+            conn.execute(statement, params)
+            self._insert_events(conn, events)
+            self.refresh_network_counters(conn, {result[1] for result in results})
+
+    def get_unconfirmed_txids(self, network):
+        """Set of txids of a network that are not confirmed yet"""
+        query = select(transactions.c.txid).where(
+            transactions.c.network == network,
+            (transactions.c.status.is_(None)) | (transactions.c.status != 'confirmed'),
+        )
+        with self.engine.connect() as conn:
+            return set(conn.execute(query).scalars())
+
+    def get_accepted_txids(self, network, before):
+        """Set of txids of a network accepted by the mempool (``success``) before a time"""
+        query = select(transactions.c.txid).where(
+            transactions.c.network == network,
+            transactions.c.status == 'success',
+            transactions.c.updated_at < before,
+        )
+        with self.engine.connect() as conn:
+            return set(conn.execute(query).scalars())
+
+    def save_evictions(self, network, evicted, confirmed):
+        """Make evicted transactions due again and mark confirmed ones, atomically
+
+        Only rows still ``success`` are changed, so a concurrent push wins.
+
+        Args:
+            network (str): Network of the transactions
+            evicted (list): Txids no longer known to the mempool backend
+            confirmed (list): (txid, block_height, block_hash) tuples
+        """
+        if not evicted and not confirmed:
+            return
+        now = datetime.utcnow()
+        still_accepted = (transactions.c.txid == bindparam('b_txid'), transactions.c.network == network,
+                          transactions.c.status == 'success')
+        backend = push_backend(network)
+        with self.engine.begin() as conn:
+            ids = self._transaction_ids(conn, network, set(evicted) | {txid for txid, _, _ in confirmed},
+                                        status='success')
+            events = []
+            evicted = [txid for txid in evicted if txid in ids]
+            if evicted:
+                conn.execute(
+                    update(transactions)
+                    .where(*still_accepted)
+                    .values(status='pending', analysis_result='Evicted from the mempool',
+                            failure_class=None, next_attempt_at=now, evicted_at=now,
+                            eviction_count=func.coalesce(transactions.c.eviction_count, 0) + 1, updated_at=now),
+                    [{'b_txid': txid} for txid in evicted],
+                )
+                events.extend(event_row(ids[txid], 'evict', 'pending', 'Evicted from the mempool', backend,
+                                        created_at=now) for txid in evicted)
+            confirmed = [{'b_txid': txid, 'b_block_height': block_height, 'b_block_hash': block_hash,
+                          'b_analysis_result': f'Confirmed in block {block_height} ({block_hash})'
+                          if block_height is not None else 'Transaction is already confirmed in the blockchain'}
+                         for txid, block_height, block_hash in confirmed if txid in ids]
+            if confirmed:
+                conn.execute(
+                    update(transactions)
+                    .where(*still_accepted)
+                    .values(status='confirmed', analysis_result=bindparam('b_analysis_result'),
+                            block_height=bindparam('b_block_height'), block_hash=bindparam('b_block_hash'),
+                            failure_class=None, next_attempt_at=None, updated_at=now),
+                    confirmed,
+                )
+                events.extend(event_row(ids[param['b_txid']], 'confirm', 'confirmed', param['b_analysis_result'],
+                                        backend, created_at=now) for param in confirmed)
+            self._insert_events(conn, events)
+            self.refresh_network_counters(conn, {network})
+
+    def get_sync_checkpoint(self, network):
+        """Last scanned ``(height, block_hash)`` of a network, or None"""
+        query = select(sync_checkpoints.c.height, sync_checkpoints.c.block_hash).where(
+            sync_checkpoints.c.network == network)
+        with self.engine.connect() as conn:
+            row = conn.execute(query).first()
+        return tuple(row) if row else None
+
+    def get_confirmed_blocks(self, network, from_height):
+        """``{txid: block_hash}`` of the transactions confirmed at ``from_height`` or above"""
+        query = select(transactions.c.txid, transactions.c.block_hash).where(
+            transactions.c.network == network,
+            transactions.c.status == 'confirmed',
+            transactions.c.block_height >= from_height,
+        )
+        with self.engine.connect() as conn:
+            return dict(conn.execute(query).all())
+
+    def save_confirmations(self, network, confirmations, height, block_hash, reverted=()):
+        """Mark transactions confirmed, revert reorganized ones and move the checkpoint, atomically
+
+        Only transactions not confirmed yet are confirmed, and only those still
+        confirmed in the reorganized block are reverted, so each change is
+        applied and recorded once.
+
+        Args:
+            network (str): Network of the transactions
+            confirmations (list): (txid, block_height, block_hash) tuples
+            height (int): Height of the last scanned block
+            block_hash (str): Hash of the last scanned block
+            reverted (list): (txid, block_hash) tuples of confirmations whose
+                block is no longer in the best chain
+        """
+        now = datetime.utcnow()
+        backend = push_backend(network)
+        with self.engine.begin() as conn:
+            events = []
+            if reverted:
+                ids = self._transaction_ids(conn, network, [txid for txid, _ in reverted], status='confirmed')
+                params = [{'b_txid': txid, 'b_block_hash': orphaned,
+                           'b_analysis_result': f'Block {orphaned} was reorganized away'}
+                          for txid, orphaned in reverted if txid in ids]
+                if params:
+                    # Back to accepted and due right away: the next run checks whether
+                    # it is still in the mempool and pushes it again if not
+                    conn.execute(
+                        update(transactions)
+                        .where(transactions.c.txid == bindparam('b_txid'), transactions.c.network == network,
+                               transactions.c.status == 'confirmed',
+                               transactions.c.block_hash == bindparam('b_block_hash'))
+                        .values(status='success', analysis_result=bindparam('b_analysis_result'),
+                                block_height=None, block_hash=None, failure_class=None,
+                                next_attempt_at=now, updated_at=now),
+                        params,
+                    )
+                    events.extend(event_row(ids[param['b_txid']], 'reorg', 'success', param['b_analysis_result'],
+                                            backend, created_at=now) for param in params)
+            if confirmations:
+                ids = self._transaction_ids(conn, network, [txid for txid, _, _ in confirmations],
+                                            exclude_status='confirmed')
+                params = [{'b_txid': txid, 'b_block_height': block_height, 'b_block_hash': confirmed_in,
+                           'b_analysis_result': f'Confirmed in block {block_height} ({confirmed_in})'}
+                          for txid, block_height, confirmed_in in confirmations if txid in ids]
+                if params:
+                    conn.execute(
+                        update(transactions)
+                        .where(transactions.c.txid == bindparam('b_txid'), transactions.c.network == network,
+                               transactions.c.status.is_(None) | (transactions.c.status != 'confirmed'))
+                        .values(status='confirmed', analysis_result=bindparam('b_analysis_result'),
+                                block_height=bindparam('b_block_height'), block_hash=bindparam('b_block_hash'),
+                                failure_class=None, next_attempt_at=None, updated_at=now),
+                        params,
+                    )
+                    events.extend(event_row(ids[param['b_txid']], 'confirm', 'confirmed', param['b_analysis_result'],
+                                            backend, created_at=now) for param in params)
+            self._insert_events(conn, events)
+            moved = conn.execute(
+                update(sync_checkpoints)
+                .where(sync_checkpoints.c.network == network)
+                .values(height=height, block_hash=block_hash, updated_at=now)
+            )
+            if not moved.rowcount:
+                conn.execute(insert(sync_checkpoints).values(
+                    network=network, height=height, block_hash=block_hash, updated_at=now))
+            if events:
+                self.refresh_network_counters(conn, {network})
+
+    def _insert_events(self, conn, rows):
+        """Append to the transaction history, if the table exists"""
+        if self.has_events:
+            insert_events(conn, rows)
+
+    def refresh_network_counters(self, conn, networks):
+        """Recompute the materialized network counters, if the table exists"""
+        if not self.has_counters:
+            return
+        status = func.coalesce(transactions.c.status, 'pending')
+        for network in networks:
+            conn.execute(delete(network_counters).where(network_counters.c.network == network))
+            conn.execute(insert(network_counters).from_select(
+                ['network', 'status', 'tx_count', 'attempted_count', 'push_attempts'],
+                select(
+                    transactions.c.network, status, func.count(transactions.c.id),
+                    func.sum(case((transactions.c.push_attempts > 0, 1), else_=0)),
+                    func.coalesce(func.sum(transactions.c.push_attempts), 0),
+                )
+                .where(transactions.c.network == network)
+                .group_by(transactions.c.network, status)
+            ))
@@ -0,0 +1,60 @@
+"""Eviction watcher: finds accepted transactions the mempool has dropped"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app.mempool import get_client
+from app.metrics import EVICTIONS
+
+# Transactions accepted this recently may not have reached the mempool snapshot yet
+GRACE_PERIOD = 60
+# Concurrent status lookups of the transactions missing from the snapshot
+LOOKUP_WORKERS = 8
+
+EvictionReport = namedtuple('EvictionReport', ['network', 'watched', 'missing', 'evicted', 'confirmed'])
+
+
+class EvictionWatcher:
+    """Diff the accepted (``success``) transactions of a network against the
+    upstream mempool.
+
+    The txids of the whole mempool are fetched in one request and compared
+    with the stored set, so only the transactions missing from it are looked
+    up one by one: those confirmed meanwhile are marked confirmed, the
+    unknown ones are evicted and due for a rebroadcast right away.
+    """
+
+    def __init__(self, db, grace_period=GRACE_PERIOD, lookup_workers=LOOKUP_WORKERS, client_func=get_client):
+        self.db = db
+        self.grace_period = grace_period
+        self.lookup_workers = lookup_workers
+        self.client_func = client_func
+
+    def _lookup(self, client, txid):
+        data = client.get_tx(txid)
+        if data is None:
+            return txid, None
+        return txid, data.get('status', {})
+
+    def check(self, network):
+        """Compare the accepted transactions with the mempool and return an EvictionReport"""
+        accepted = self.db.get_accepted_txids(network, datetime.utcnow() - timedelta(seconds=self.grace_period))
+        if not accepted:
+            return EvictionReport(network, 0, 0, [], [])
+
+        client = self.client_func(network)
+        missing = accepted - set(client.get_mempool_txids())
+        evicted, confirmed = [], []
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.lookup_workers) as executor:
+                for txid, status in executor.map(lambda txid: self._lookup(client, txid), sorted(missing)):
+                    if status is None:
+                        evicted.append(txid)
+                    elif status.get('confirmed'):
+                        confirmed.append((txid, status.get('block_height'), status.get('block_hash')))
+                    # Otherwise it entered the mempool after the snapshot
+
+        self.db.save_evictions(network, evicted, confirmed)
+        if evicted:
+            EVICTIONS.inc(len(evicted), network=network)
+        return EvictionReport(network, len(accepted), len(missing), evicted, confirmed)
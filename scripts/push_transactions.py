@@ -2,7 +2,6 @@
 import sys
 import os
 from tabulate import tabulate
-import requests
 import argparse
 
 # Add the app directory to the Python path
@@ -10,13 +9,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.database import Database
 from scripts.formatters import TransactionFormatter
+from scripts.rebroadcast import RebroadcastEngine
+from scripts.confirmations import ConfirmationTracker, MAX_BLOCKS
+from scripts.evictions import EvictionWatcher
 from app.network_config import VALID_NETWORKS, is_valid_network
+from app.metrics import REGISTRY
 
-def list_transactions(db_path='instance/mempush.db', network=None, show_confirmed=True):
+def list_transactions(db_path=None, network=None, show_confirmed=True):
     """List all transactions from the database in a formatted table
     
     Args:
-        db_path (str): Path to the database file
+        db_path (str): Database path or URL (default: the web app's DATABASE_URL)
         network (str): Network to filter by (optional)
         show_confirmed (bool): If False, hide confirmed transactions from the list
     """
@@ -70,47 +73,97 @@ def list_transactions(db_path='instance/mempush.db', network=None, show_confirme
     except Exception as e:
         print(f"Error: {e}")
 
-def update_transactions(db_path='instance/mempush.db', network=None, base_url='http://localhost:5000'):
-    """Update all transactions
-    
+def sync_confirmations(db_path=None, network=None, max_blocks=MAX_BLOCKS):
+    """Mark transactions confirmed by scanning the blocks mined since the last run
+
+    Args:
+        db_path (str): Database path or URL (default: the web app's DATABASE_URL)
+        network (str): Network to sync (optional, all networks by default)
+        max_blocks (int): Maximum number of blocks scanned per network
+    """
+    tracker = ConfirmationTracker(Database(db_path), max_blocks=max_blocks)
+    formatter = TransactionFormatter()
+    for network_name in [network] if network else VALID_NETWORKS:
+        try:
+            report = tracker.sync(network_name)
+        except Exception as e:
+            print(f"Error syncing confirmations for {network_name}: {e}")
+            continue
+        if not report.blocks:
+            print(f"No new blocks on {network_name} (tip {report.to_height})")
+            continue
+        print(f"Scanned {report.blocks} blocks on {network_name} "
+              f"({report.from_height}-{report.to_height}): {len(report.confirmed)} confirmed")
+        for txid, block_hash in report.reverted:
+            print(f"  {formatter.format_txid(txid)} no longer confirmed, block {block_hash} was reorganized away")
+        for txid, height, block_hash in report.confirmed:
+            print(f"  {formatter.format_txid(txid)} confirmed in block {height}")
+
+def watch_evictions(db_path=None, network=None):
+    """Make accepted transactions that the mempool dropped due for a rebroadcast
+
     Args:
-        db_path (str): Path to the database file
+        db_path (str): Database path or URL (default: the web app's DATABASE_URL)
+        network (str): Network to check (optional, all networks by default)
+    """
+    watcher = EvictionWatcher(Database(db_path))
+    formatter = TransactionFormatter()
+    for network_name in [network] if network else VALID_NETWORKS:
+        try:
+            report = watcher.check(network_name)
+        except Exception as e:
+            print(f"Error checking evictions for {network_name}: {e}")
+            continue
+        if not report.watched:
+            continue
+        print(f"Checked {report.watched} accepted transactions on {network_name} against the mempool: "
+              f"{len(report.evicted)} evicted, {len(report.confirmed)} confirmed")
+        for txid in report.evicted:
+            print(f"  {formatter.format_txid(txid)} was evicted, pushing it again")
+
+def update_transactions(db_path=None, network=None, concurrency=16,
+                        per_network=8, per_host=8, force=False):
+    """Rebroadcast the transactions that are due directly to the mempool backend
+
+    Args:
+        db_path (str): Database path or URL (default: the web app's DATABASE_URL)
         network (str): Network to filter by (optional)
-        base_url (str): Base URL of the Flask application
+        concurrency (int): Maximum number of transactions pushed at the same time
+        per_network (int): Maximum number of concurrent pushes for a single network
+        per_host (int): Maximum number of concurrent requests to a single upstream host
+        force (bool): Push every non-confirmed transaction, ignoring backoff and parking
     """
     try:
         # Initialize components
         db = Database(db_path)
         formatter = TransactionFormatter()
-        
-        # Get transactions
-        if network:
-            if not is_valid_network(network):
-                print(f"Error: Invalid network '{network}'. Valid networks are: {VALID_NETWORKS}")
-                return
-            transactions = db.get_transactions_by_network(network)
-        else:
-            transactions = db.get_all_transactions()
-        
+
+        if network and not is_valid_network(network):
+            print(f"Error: Invalid network '{network}'. Valid networks are: {VALID_NETWORKS}")
+            return
+
+        transactions = db.get_rebroadcast_candidates(network, force=force)
+        waiting, parked = db.count_scheduled(network)
+        if not force and (waiting or parked):
+            print(f"Skipping {waiting} transactions not due yet and {parked} parked (use --force to push them)")
         if not transactions:
             network_msg = f" for network '{network}'" if network else ""
-            print(f"No transactions found in the database{network_msg}.")
+            print(f"No transactions to push in the database{network_msg}.")
             return
-        
-        for tx in transactions:
-            txid, network_name, status, push_attempts, created_at, updated_at = tx
-            if status not in ['confirmed', 'error']:
-                try:
-                    # Use network-specific endpoint
-                    network_to_use = network_name if network_name else (network if network else 'mainchain')
-                    response = requests.post(
-                        f'{base_url}/{network_to_use}/transaction/{txid}/push',
-                        headers={'Content-Type': 'application/json'}
-                    )
-                    response.raise_for_status()
-                    print(f"Push request sent for {txid} ({network_name}): {response.status_code}")
-                except requests.exceptions.RequestException as e:
-                    print(f"Failed to push transaction {txid} ({network_name}): {e}")
+
+        def print_result(result, latency):
+            txid, network_name, status, analysis_result, attempted = result
+            action = 'Pushed' if attempted else 'Checked'
+            print(f"{action} {formatter.format_txid(txid)} ({network_name}): "
+                  f"{formatter.format_status(status)} in {latency:.3f}s")
+
+        # Chains of stored transactions are pushed parents first, as packages
+        parents = db.get_parent_links(transactions)
+        engine = RebroadcastEngine(concurrency=concurrency, per_network=per_network, per_host=per_host)
+        report = engine.run(transactions, on_result=print_result, parents=parents)
+        db.save_push_results(report.results, report.latencies, report.backends)
+        print()
+        print(report.format())
 
     except Exception as e:
         print(f"Error: {e}")
@@ -121,9 +174,32 @@ if __name__ == "__main__":
                        help='Hide confirmed transactions from the list')
     parser.add_argument('--network', type=str, choices=VALID_NETWORKS,
                        help='Filter by network (mainchain, testnetv3, testnetv4, signet)')
-    parser.add_argument('--base-url', type=str, default='http://localhost:5000',
-                       help='Base URL of the Flask application (default: http://localhost:5000)')
+    parser.add_argument('--base-url', type=str,
+                       help='Deprecated and ignored: transactions are pushed directly to the mempool backend')
+    parser.add_argument('--concurrency', type=int, default=16,
+                       help='Maximum number of transactions pushed at the same time (default: 16)')
+    parser.add_argument('--per-network', type=int, default=8,
+                       help='Maximum concurrent pushes for a single network (default: 8)')
+    parser.add_argument('--per-host', type=int, default=8,
+                       help='Maximum concurrent requests to a single upstream host (default: 8)')
+    parser.add_argument('--force', action='store_true',
+                       help='Push every non-confirmed transaction, ignoring backoff and parked failures')
+    parser.add_argument('--metrics-file', type=str,
+                       help='Write Prometheus metrics of the run to this file (for the node_exporter textfile collector)')
+    parser.add_argument('--skip-sync', action='store_true',
+                       help='Do not scan new blocks for confirmations before pushing')
+    parser.add_argument('--skip-evictions', action='store_true',
+                       help='Do not check accepted transactions against the mempool before pushing')
+    parser.add_argument('--max-blocks', type=int, default=MAX_BLOCKS,
+                       help=f'Maximum number of blocks scanned per network (default: {MAX_BLOCKS})')
     args = parser.parse_args()
     
+    if not args.skip_sync:
+        sync_confirmations(network=args.network, max_blocks=args.max_blocks)
+    if not args.skip_evictions:
+        watch_evictions(network=args.network)
     list_transactions(show_confirmed=not args.hide_confirmed, network=args.network)
-    update_transactions(network=args.network, base_url=args.base_url)
+    update_transactions(network=args.network, concurrency=args.concurrency,
+                        per_network=args.per_network, per_host=args.per_host, force=args.force)
+    if args.metrics_file:
+        REGISTRY.write_textfile(args.metrics_file)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Drain the push job queue filled by the web app when PUSH_MODE=queue"""
+import sys
+import os
+import argparse
+import signal
+import socket
+import threading
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.jobs import claim_jobs, process_job, VISIBILITY_TIMEOUT, MAX_ATTEMPTS
+
+
+def run_worker(concurrency=4, visibility_timeout=VISIBILITY_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+               poll_interval=1.0, once=False):
+    """Process push jobs with ``concurrency`` threads until stopped
+
+    Args:
+        concurrency (int): Number of jobs processed at the same time
+        visibility_timeout (int): Seconds a claimed job stays invisible to other workers
+        max_attempts (int): Attempts before a job is marked as failed
+        poll_interval (float): Seconds to wait when the queue is empty
+        once (bool): Exit once the queue is empty instead of polling forever
+    """
+    app = create_app()
+    stop = threading.Event()
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+    def loop(index):
+        owner = f'{worker_id}:{index}'
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    jobs = claim_jobs(owner, 1, visibility_timeout, max_attempts)
+                    if not jobs:
+                        if once:
+                            return
+                        stop.wait(poll_interval)
+                        continue
+                    for job in jobs:
+                        process_job(job, owner, max_attempts)
+                        print(f"Job {job.id} ({job.kind} {job.txid} on {job.network}) processed by {owner}")
+                except Exception:
+                    # Keep the thread alive; an unfinished job is claimed again once its lease expires
+                    app.logger.exception('Push worker %s failed', owner)
+                    db.session.rollback()
+                    stop.wait(poll_interval)
+
+    def shutdown(signum, frame):
+        print("Stopping after the current jobs...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    threads = [threading.Thread(target=loop, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Process queued push jobs')
+    parser.add_argument('--concurrency', type=int, default=4,
+                       help='Number of jobs processed at the same time (default: 4)')
+    parser.add_argument('--visibility-timeout', type=int, default=VISIBILITY_TIMEOUT,
+                       help=f'Seconds a claimed job stays invisible to other workers (default: {VISIBILITY_TIMEOUT})')
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                       help=f'Attempts before a job is marked as failed (default: {MAX_ATTEMPTS})')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                       help='Seconds to wait when the queue is empty (default: 1.0)')
+    parser.add_argument('--once', action='store_true',
+                       help='Exit once the queue is empty')
+    args = parser.parse_args()
+
+    run_worker(concurrency=args.concurrency, visibility_timeout=args.visibility_timeout,
+               max_attempts=args.max_attempts, poll_interval=args.poll_interval, once=args.once)
@@ -0,0 +1,189 @@
+"""Concurrent rebroadcast engine for stored transactions"""
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from app.audit import push_backend
+from app.mempool import NotSent, check_and_push, check_and_push_package
+from app.network_config import get_mempool_url
+from app.metrics import Gauge, Histogram
+from app.timing import latency_summary
+
+PUSH_LATENCY = Histogram(
+    'mempush_rebroadcast_push_duration_seconds', 'Check-and-push latency per transaction during rebroadcast',
+    ('network',))
+LAST_RUN = Gauge('mempush_rebroadcast_last_run_timestamp_seconds', 'Unix time the last rebroadcast run finished')
+RUN_DURATION = Gauge('mempush_rebroadcast_run_duration_seconds', 'Wall time of the last rebroadcast run')
+
+
+class RebroadcastReport:
+    """Outcome of a rebroadcast run"""
+
+    def __init__(self, results, latencies, elapsed, backends=None):
+        self.results = results
+        self.latencies = latencies
+        self.elapsed = elapsed
+        # Backend that answered each result, in the same order
+        self.backends = backends or [None] * len(results)
+
+    @property
+    def throughput(self):
+        """Processed transactions per second"""
+        return len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def status_counts(self):
+        return Counter(result[2] for result in self.results)
+
+    def format(self):
+        """Human readable summary of the run"""
+        summary = latency_summary(self.latencies)
+        lines = [
+            f"Processed {len(self.results)} transactions in {self.elapsed:.2f}s "
+            f"({self.throughput:.1f} tx/s)",
+            "Statuses: " + ', '.join(f"{status}={count}" for status, count in sorted(self.status_counts().items())),
+        ]
+        if summary['count']:
+            lines.append(
+                "Latency: p50={p50:.3f}s p95={p95:.3f}s p99={p99:.3f}s max={max:.3f}s".format(**summary)
+            )
+        return '\n'.join(lines)
+
+
+def package_groups(transactions, parents):
+    """Split transactions into groups connected by parent/child links.
+
+    ``transactions`` are ``(txid, network, raw_tx)`` tuples and ``parents``
+    maps ``(network, txid)`` to the txids it spends from. Each group is a
+    list of transactions in topological order, parents first.
+    """
+    by_key = {(network, txid): (txid, network, raw_tx) for txid, network, raw_tx in transactions}
+    links = {key: [(key[0], parent) for parent in parents.get(key, ()) if (key[0], parent) in by_key]
+             for key in by_key}
+
+    # Union-find over the links inside the candidate set
+    roots = {key: key for key in by_key}
+
+    def find(key):
+        while roots[key] != key:
+            roots[key] = roots[roots[key]]
+            key = roots[key]
+        return key
+
+    for key, key_parents in links.items():
+        for parent in key_parents:
+            roots[find(parent)] = find(key)
+
+    components = defaultdict(list)
+    for key in by_key:
+        components[find(key)].append(key)
+
+    groups = []
+    for keys in components.values():
+        # Kahn's algorithm, keeping the incoming order among ready transactions
+        pending = {key: set(links[key]) for key in keys}
+        ordered = []
+        while pending:
+            ready = [key for key, waiting in pending.items() if not waiting] or list(pending)[:1]
+            for key in ready:
+                del pending[key]
+                ordered.append(by_key[key])
+            for waiting in pending.values():
+                waiting.difference_update(ready)
+        groups.append(ordered)
+    return groups
+
+
+class RebroadcastEngine:
+    """Push transactions to their mempool backend with bounded concurrency.
+
+    ``concurrency`` caps the total number of in-flight transactions while
+    ``per_network`` and ``per_host`` cap them for a single network and a
+    single upstream host (all networks may share the same host).
+    Transactions that spend each other are pushed together by one worker,
+    parents first, with ``package_func``.
+    """
+
+    def __init__(self, concurrency=16, per_network=8, per_host=8, push_func=check_and_push,
+                 package_func=check_and_push_package):
+        self.concurrency = concurrency
+        self.per_network = per_network
+        self.per_host = per_host
+        self.push_func = push_func
+        self.package_func = package_func
+        self._lock = threading.Lock()
+        self._network_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_network))
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+
+    def _slots_for(self, network):
+        host = urlparse(get_mempool_url(network)).netloc
+        with self._lock:
+            return self._network_slots[network], self._host_slots[host]
+
+    def _push_one(self, txid, network, raw_tx):
+        network_slot, host_slot = self._slots_for(network)
+        with network_slot, host_slot:
+            started = time.perf_counter()
+            try:
+                status, analysis_result, attempted = self.push_func(network, txid, raw_tx)
+            except Exception as e:
+                # Failures before the broadcast went out are rescheduled
+                # without counting an attempt
+                status, analysis_result, attempted = 'error', str(e), not isinstance(e, NotSent)
+            latency = time.perf_counter() - started
+            # Read in the worker thread that pushed, see app.broadcast
+            backend = push_backend(network, attempted)
+        return [((txid, network, status, analysis_result, attempted), latency, backend)]
+
+    def _push_group(self, group, parents):
+        network = group[0][1]
+        network_slot, host_slot = self._slots_for(network)
+        txids = {txid for txid, _, _ in group}
+        # Only the links inside the group matter for the push order
+        parents = {txid: [parent for parent in parents.get((network, txid), ()) if parent in txids]
+                   for txid, _, _ in group}
+        with network_slot, host_slot:
+            started = time.perf_counter()
+            try:
+                outcomes = self.package_func(network, [(txid, raw_tx) for txid, _, raw_tx in group], parents)
+            except Exception as e:
+                outcomes = [(txid, 'error', str(e), not isinstance(e, NotSent)) for txid, _, _ in group]
+            # The group shares one round of upstream calls
+            latency = (time.perf_counter() - started) / len(group)
+        backend = push_backend(network)
+        return [((txid, network, status, analysis_result, attempted), latency, backend)
+                for txid, status, analysis_result, attempted in outcomes]
+
+    def run(self, transactions, on_result=None, parents=None):
+        """Rebroadcast ``(txid, network, raw_tx)`` tuples and return a report
+
+        ``parents`` maps ``(network, txid)`` to the stored txids that
+        transaction spends from, so chains are pushed parents first.
+        ``on_result`` is called from the calling thread for every finished
+        transaction, so it may safely print or touch the database.
+        """
+        results = []
+        latencies = []
+        backends = []
+        parents = parents or {}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = []
+            for group in package_groups(transactions, parents):
+                if len(group) == 1:
+                    futures.append(executor.submit(self._push_one, *group[0]))
+                else:
+                    futures.append(executor.submit(self._push_group, group, parents))
+            for future in as_completed(futures):
+                for result, latency, backend in future.result():
+                    PUSH_LATENCY.observe(latency, network=result[1])
+                    results.append(result)
+                    latencies.append(latency)
+                    backends.append(backend)
+                    if on_result:
+                        on_result(result, latency)
+        elapsed = time.perf_counter() - started
+        LAST_RUN.set(time.time())
+        RUN_DURATION.set(elapsed)
+        return RebroadcastReport(results, latencies, elapsed, backends)
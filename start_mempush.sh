@@ -4,5 +4,5 @@ cd /opt/mempush
 
 . ./venv/bin/activate
 flask db migrate
-flask run -h localhost -p 3000
+WEB_BIND=localhost:3000 gunicorn -c gunicorn.conf.py
 deactivate
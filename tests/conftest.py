@@ -0,0 +1,29 @@
+import pytest
+
+from app import create_app, db
+from app.mempool import FakeMempoolBackend, set_client_factory
+
+
+@pytest.fixture
+def backend():
+    """In-memory mempool backend shared by every network"""
+    backend = FakeMempoolBackend()
+    set_client_factory(lambda network: backend)
+    yield backend
+    set_client_factory(None)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, backend):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'mempush.db'}")
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app import aio, ratelimit
+from app.aio import AsyncMempoolClient
+from app.asgi import AsgiApp
+from app.mempool import MempoolClient, MempoolError, NotSent, set_client_factory
+from app.models import Transaction
+from app.validation import compute_txid
+from benchmarks.fake_mempool import FakeMempoolServer
+from benchmarks.txgen import make_raw_tx
+
+
+@pytest.fixture
+def upstream(app, monkeypatch):
+    """The real clients, against a local mempool.space stand-in"""
+    server = FakeMempoolServer().start()
+    monkeypatch.setenv('MEMPOOL_BASE_URL', server.url)
+    set_client_factory(None)
+    yield server
+    server.stop()
+
+
+def serve(app, *requests, threads=4):
+    """Send ``(method, url, json)`` requests at once through the ASGI app"""
+    async def send_all():
+        asgi = AsgiApp(app, threads=threads)
+        transport = httpx.ASGITransport(app=asgi)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url='http://mempush') as client:
+                return await asyncio.gather(*(client.request(method, url, json=body)
+                                              for method, url, body in requests))
+        finally:
+            await aio.close_clients()
+            asgi.executor.shutdown()
+    return asyncio.run(send_all())
+
+
+def test_upstream_waits_hold_no_thread(app, upstream, monkeypatch):
+    upstream.latency = 0.3
+    monkeypatch.setattr(MempoolClient, '_request', lambda *args, **kwargs: pytest.fail('Sent from a thread'))
+    raw_txs = [make_raw_tx() for _ in range(8)]
+    started = time.perf_counter()
+    responses = serve(app, *[('POST', '/signet/api/transaction/push', {'raw_tx': raw_tx}) for raw_tx in raw_txs],
+                      threads=1)
+    # One after the other on the single thread they would take 2.4s
+    assert time.perf_counter() - started < 1.5
+    assert [response.status_code for response in responses] == [201] * 8
+    assert {response.json()['status'] for response in responses} == {'success'}
+    assert len(upstream.backends['signet'].broadcasts) == 8
+
+
+def test_push_and_fetch_through_the_async_client(app, upstream):
+    raw_tx = make_raw_tx()
+    txid = compute_txid(raw_tx)
+    [submitted] = serve(app, ('POST', '/signet/transaction/submit', {'raw_tx': raw_tx}))
+    assert submitted.status_code == 201
+
+    [pushed] = serve(app, ('POST', f'/signet/transaction/{txid}/push', None))
+    assert pushed.json() == {'status': 'success', 'analysis_result': txid, 'push_attempts': 1}
+    [checked] = serve(app, ('POST', f'/signet/transaction/{txid}/push', None))
+    assert checked.json()['analysis_result'] == 'Transaction is already present in mempool'
+    assert len(upstream.backends['signet'].broadcasts) == 1
+
+    fetched = upstream.backends['signet'].add_tx(make_raw_tx())
+    [stored, missing] = serve(app, ('POST', '/signet/api/transaction', {'txid': fetched}),
+                              ('POST', '/signet/api/transaction', {'txid': '00' * 32}))
+    assert (stored.status_code, missing.status_code) == (201, 404)
+    assert Transaction.get_by_txid_and_network(fetched, 'signet').raw_tx == upstream.backends['signet'].get_tx_hex(
+        fetched)
+
+
+def test_other_requests_go_through_flask(app, backend):
+    serve(app, *[('POST', '/signet/api/transaction/push', {'raw_tx': make_raw_tx()}) for _ in range(3)])
+    listed, exported, invalid = serve(app, ('GET', '/signet/api/transactions', None),
+                                      ('GET', '/signet/api/transactions/export?format=csv', None),
+                                      ('POST', '/nonet/api/transaction/push', {'raw_tx': make_raw_tx()}))
+    assert [tx['status'] for tx in listed.json()] == ['success'] * 3
+    assert len(exported.text.splitlines()) == 4
+    assert invalid.status_code == 404
+
+    app.config['PUSH_MODE'] = 'queue'
+    [queued] = serve(app, ('POST', '/signet/api/transaction/push', {'raw_tx': make_raw_tx()}))
+    assert queued.status_code == 202
+    assert len(backend.broadcasts) == 3
+
+
+def test_admission_control_applies(app, backend, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'RATE', 0.001)
+    monkeypatch.setattr(ratelimit, 'BURST', 1)
+    monkeypatch.setattr(ratelimit, '_limiter', None)
+    [first] = serve(app, ('POST', '/signet/api/transaction/push', {'raw_tx': make_raw_tx()}))
+    [second] = serve(app, ('POST', '/signet/api/transaction/push', {'raw_tx': make_raw_tx()}))
+    assert first.status_code == 201
+    assert second.status_code == 429
+    assert int(second.headers['Retry-After']) > 0
+    assert Transaction.query.count() == 1
+
+
+def scripted_client(handler):
+    client = AsyncMempoolClient('http://upstream', retries=2, backoff=0)
+    client.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_broadcast_is_not_retried_once_sent():
+    calls = []
+
+    def unavailable(request):
+        calls.append(request.url.path)
+        return httpx.Response(503, text='Service Unavailable')
+
+    async def run():
+        client = scripted_client(unavailable)
+        with pytest.raises(MempoolError) as error:
+            await client.broadcast(make_raw_tx())
+        assert not isinstance(error.value, NotSent)
+        with pytest.raises(MempoolError):
+            await client.get_tx('00' * 32)
+    asyncio.run(run())
+    assert calls == ['/api/tx'] + ['/api/tx/' + '00' * 32] * 3
+
+
+def test_broadcast_that_never_connected_is_retried():
+    calls = []
+
+    def refused(request):
+        calls.append(request.url.path)
+        raise httpx.ConnectError('Connection refused', request=request)
+
+    async def run():
+        with pytest.raises(NotSent):
+            await scripted_client(refused).broadcast(make_raw_tx())
+    asyncio.run(run())
+    assert len(calls) == 3
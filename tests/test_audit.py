@@ -0,0 +1,47 @@
+from app import audit
+from app.mempool import MempoolError
+from benchmarks.txgen import make_raw_tx
+
+
+def history(client, txid, query=''):
+    response = client.get(f'/signet/api/transaction/{txid}/events{query}')
+    assert response.status_code == 200
+    return response.get_json()['events']
+
+
+def test_every_step_is_recorded(client, backend):
+    txid = client.post('/signet/transaction/submit', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+    client.post(f'/signet/transaction/{txid}/push')
+    # Known upstream now: checked, not sent again
+    client.post(f'/signet/transaction/{txid}/push')
+
+    events = history(client, txid)
+    assert [(event['kind'], event['status']) for event in events] == [
+        ('submit', 'pending'), ('push', 'success'), ('check', 'success')]
+    assert events[0]['backend'] is None
+    assert all(event['backend'] == 'mempool.space/signet' and event['latency'] >= 0 for event in events[1:])
+    assert events[1]['response'] == txid
+    assert [event['kind'] for event in history(client, txid, '?limit=2')] == ['push', 'check']
+
+
+def test_rejections_and_errors_are_recorded(client, backend, monkeypatch):
+    backend.reject_with = 'x' * (audit.MAX_RESPONSE_LENGTH + 100)
+    txid = client.post('/signet/api/transaction/push', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+
+    def unavailable(txid):
+        raise MempoolError('backend down')
+    monkeypatch.setattr(backend, 'get_tx', unavailable)
+    client.post(f'/signet/transaction/{txid}/push')
+
+    rejected, failed = history(client, txid)[1:]
+    assert (rejected['kind'], rejected['status']) == ('push', 'failed')
+    assert len(rejected['response']) == audit.MAX_RESPONSE_LENGTH
+    # The lookup failed, nothing was sent
+    assert (failed['kind'], failed['status'], failed['response']) == ('check', 'error', 'backend down')
+
+
+def test_events_of_unknown_transactions(client):
+    assert client.get(f"/signet/api/transaction/{'00' * 32}/events").status_code == 404
+    txid = client.post('/signet/transaction/submit', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+    for limit in ('x', '-1'):
+        assert client.get(f'/signet/api/transaction/{txid}/events?limit={limit}').status_code == 400
@@ -0,0 +1,69 @@
+import pytest
+
+from app import batch, db, ratelimit, routes
+from app.batch import submit_batch
+from app.models import Transaction, TransactionEvent
+from app.validation import compute_txid
+from benchmarks.txgen import make_raw_tx
+
+
+def test_created_exists_and_errors(client, backend):
+    stored = make_raw_tx()
+    client.post('/signet/transaction/submit', json={'raw_tx': stored})
+    fetched = make_raw_tx()
+    backend.add_tx(fetched)
+    new = make_raw_tx()
+
+    response = client.post('/signet/api/transactions/batch', json={
+        'raw_txs': [new, stored, new, 'zz'],
+        'txids': [compute_txid(fetched), '00' * 32],
+    })
+    data = response.get_json()
+    assert [result['status'] for result in data['results']] == [
+        'created', 'exists', 'exists', 'error', 'created', 'error']
+    assert (data['created'], data['existing'], data['errors']) == (2, 2, 2)
+    assert Transaction.query.count() == 3
+    assert TransactionEvent.query.filter_by(kind='submit').count() == 3
+
+
+def test_rows_stored_concurrently_are_reported_as_existing(app, monkeypatch):
+    raw_txs = [make_raw_tx() for _ in range(3)]
+    insert = batch._insert_transactions
+
+    def racing_insert(rows):
+        # Another request stores the first transaction after the dedupe query
+        db.session.add(Transaction(raw_tx=raw_txs[0], txid=rows[0]['txid'], network='signet'))
+        db.session.flush()
+        return insert(rows)
+
+    monkeypatch.setattr(batch, '_insert_transactions', racing_insert)
+    results = submit_batch('signet', [{'raw_tx': raw_tx} for raw_tx in raw_txs])
+    assert [result['status'] for result in results] == ['exists', 'created', 'created']
+    assert Transaction.query.count() == 3
+    assert all(tx.raw_tx in raw_txs for tx in Transaction.query)
+
+
+def test_insert_without_returning_reads_the_ids_back(app, monkeypatch):
+    monkeypatch.setattr(db.session.get_bind().dialect, 'insert_returning', False)
+    raw_txs = [make_raw_tx() for _ in range(2)]
+    results = submit_batch('signet', [{'raw_tx': raw_tx} for raw_tx in raw_txs])
+    assert [result['status'] for result in results] == ['created', 'created']
+    assert sorted(tx.raw_tx for tx in Transaction.query) == sorted(raw_txs)
+
+
+@pytest.mark.parametrize('body', [
+    {'transactions': 5},
+    ['raw_tx'],
+    {'raw_txs': 'ab'},
+    {'txids': [1, 2]},
+    {'transactions': ['ab']},
+])
+def test_malformed_body_is_rejected_before_it_is_charged(client, monkeypatch, body):
+    cost = []
+    monkeypatch.setattr(ratelimit, 'RATE', 1)
+    monkeypatch.setattr(ratelimit, '_limiter', None)
+    monkeypatch.setattr(routes, '_batch_items', lambda: cost.append(1) or [])
+    response = client.post('/signet/api/transactions/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert cost == []
@@ -0,0 +1,50 @@
+import pytest
+
+from app import blobs, db
+from app.blobs import pack_raw_tx, unpack_raw_tx
+from app.models import Transaction, TransactionBlob
+from app.validation import InvalidHex, compute_txid
+from benchmarks.txgen import make_raw_tx
+
+CODECS = ['raw', 'zlib', pytest.param('zstd', marks=pytest.mark.skipif(blobs.zstandard is None,
+                                                                      reason='zstandard is not installed'))]
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_round_trip(codec):
+    # Repeated outpoints and scripts compress, random ones may not
+    raw_tx = make_raw_tx(inputs=20, prevouts=[('11' * 32, 0)] * 20)
+    stored_codec, data = pack_raw_tx(raw_tx, codec)
+    assert stored_codec == codec
+    assert len(data) <= len(raw_tx) // 2
+    assert unpack_raw_tx(stored_codec, data) == raw_tx
+
+
+def test_incompressible_data_is_stored_raw():
+    stored_codec, data = pack_raw_tx('00ff', 'zlib')
+    assert (stored_codec, data) == ('raw', b'\x00\xff')
+
+
+def test_invalid_input():
+    with pytest.raises(InvalidHex):
+        pack_raw_tx('not hex')
+    assert unpack_raw_tx('text', b'legacy row') == 'legacy row'
+    with pytest.raises(ValueError):
+        unpack_raw_tx('lz4', b'')
+
+
+def test_raw_tx_lives_in_the_blob_table(app):
+    raw_tx = make_raw_tx()
+    tx = Transaction(raw_tx=raw_tx, txid=compute_txid(raw_tx), network='signet')
+    db.session.add(tx)
+    db.session.commit()
+    tx_id = tx.id
+    db.session.expunge_all()
+
+    blob = db.session.get(TransactionBlob, tx_id)
+    assert unpack_raw_tx(blob.codec, blob.data) == raw_tx
+    assert Transaction.query.first().raw_tx == raw_tx
+
+    db.session.delete(Transaction.query.first())
+    db.session.commit()
+    assert TransactionBlob.query.count() == 0
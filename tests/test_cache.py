@@ -0,0 +1,102 @@
+from app.cache import CachedMempoolClient, LRUCache, MISS, SQLiteCacheBackend, UpstreamCache
+from app.mempool import FakeMempoolBackend
+from benchmarks.txgen import make_raw_tx
+
+
+class CountingBackend(FakeMempoolBackend):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def get_tx(self, txid):
+        self.lookups += 1
+        return super().get_tx(txid)
+
+
+def cached(backend, **ttls):
+    return CachedMempoolClient(backend, 'signet', UpstreamCache(maxsize=100), **ttls)
+
+
+def test_confirmed_status_outlives_unconfirmed():
+    backend = CountingBackend()
+    confirmed = backend.add_tx(make_raw_tx(), confirmed=True)
+    unconfirmed = backend.add_tx(make_raw_tx())
+    client = cached(backend, confirmed_ttl=3600, unconfirmed_ttl=0)
+
+    for _ in range(3):
+        assert client.get_tx(confirmed)['status']['confirmed']
+        assert not client.get_tx(unconfirmed)['status']['confirmed']
+    # The confirmed status is fetched once, the expired unconfirmed one every time
+    assert backend.lookups == 1 + 3
+
+
+def test_unknown_transactions_are_not_cached():
+    backend = CountingBackend()
+    client = cached(backend)
+    raw_tx = make_raw_tx()
+    txid = backend.add_tx(raw_tx)
+    backend.evict([txid])
+
+    assert client.get_tx(txid) is None
+    backend.add_tx(raw_tx)
+    assert client.get_tx(txid) is not None
+
+
+def test_broadcast_forgets_the_cached_status():
+    backend = CountingBackend()
+    raw_tx = make_raw_tx()
+    txid = backend.add_tx(raw_tx)
+    client = cached(backend, unconfirmed_ttl=3600)
+    client.get_tx(txid)
+    client.get_tx(txid)
+    assert backend.lookups == 1
+
+    assert client.broadcast(raw_tx) == (True, txid)
+    client.get_tx(txid)
+    assert backend.lookups == 2
+
+
+def test_rejected_broadcast_keeps_the_cache():
+    backend = CountingBackend()
+    raw_tx = make_raw_tx()
+    txid = backend.add_tx(raw_tx)
+    client = cached(backend, unconfirmed_ttl=3600)
+    client.get_tx(txid)
+    backend.reject_with = 'txn-already-in-mempool'
+    assert client.broadcast(raw_tx) == (False, 'txn-already-in-mempool')
+    client.get_tx(txid)
+    assert backend.lookups == 1
+
+
+def test_hex_is_cached():
+    backend = FakeMempoolBackend()
+    raw_tx = make_raw_tx()
+    txid = backend.add_tx(raw_tx)
+    client = cached(backend)
+    assert client.get_tx_hex(txid) == raw_tx
+    backend.evict([txid])
+    assert client.get_tx_hex(txid) == raw_tx
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1, 60)
+    cache.set('b', 2, 60)
+    cache.get('a')
+    cache.set('c', 3, 60)
+    assert cache.get('b') is MISS
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_shared_backend_fills_the_local_cache(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = UpstreamCache(maxsize=10, shared=SQLiteCacheBackend(path))
+    reader = UpstreamCache(maxsize=10, shared=SQLiteCacheBackend(path))
+    key = ('signet', '00' * 32, 'tx')
+    writer.set(key, {'status': {'confirmed': True}}, 60)
+
+    assert reader.get(key) == {'status': {'confirmed': True}}
+    assert reader.get(key) == {'status': {'confirmed': True}}
+    stats = reader.stats('signet')
+    assert (stats['shared_hits'], stats['hits'], stats['misses']) == (1, 1, 0)
@@ -0,0 +1,95 @@
+import pytest
+
+from app import db
+from app.models import Transaction, TransactionEvent
+from benchmarks.txgen import make_raw_tx
+from scripts.confirmations import ConfirmationTracker
+from scripts.database import Database
+
+
+@pytest.fixture
+def tracker(app):
+    return ConfirmationTracker(Database())
+
+
+def submit(client, backend):
+    raw_tx = make_raw_tx()
+    backend.add_tx(raw_tx)
+    return client.post('/signet/transaction/submit', json={'raw_tx': raw_tx}).get_json()['txid']
+
+
+def stored(txid):
+    db.session.expire_all()
+    return Transaction.get_by_txid_and_network(txid, 'signet')
+
+
+def events(txid):
+    return [(event.kind, event.status) for event in stored(txid).events]
+
+
+def test_new_blocks_confirm_stored_transactions(client, backend, tracker):
+    first, second = submit(client, backend), submit(client, backend)
+    block_hash = backend.mine([first])
+
+    report = tracker.sync('signet')
+    assert report.confirmed == [(first, 0, block_hash)]
+    tx = stored(first)
+    assert (tx.status, tx.block_height, tx.block_hash) == ('confirmed', 0, block_hash)
+    assert stored(second).status == 'pending'
+
+    # Nothing new: the checkpoint is at the tip
+    assert tracker.sync('signet').blocks == 0
+
+
+def test_reorganized_confirmation_is_reverted(client, backend, tracker):
+    dropped, kept = submit(client, backend), submit(client, backend)
+    backend.mine([kept])
+    orphaned = backend.mine([dropped])
+    tracker.sync('signet')
+    assert stored(dropped).status == 'confirmed'
+
+    # The block confirming it is replaced by two blocks without it
+    backend.reorg(1)
+    backend.mine([])
+    backend.mine([])
+    report = tracker.sync('signet')
+
+    assert report.reverted == [(dropped, orphaned)]
+    assert report.confirmed == []
+    tx = stored(dropped)
+    assert (tx.status, tx.block_height, tx.block_hash) == ('success', None, None)
+    assert tx.next_attempt_at is not None
+    assert events(dropped)[-2:] == [('confirm', 'confirmed'), ('reorg', 'success')]
+    # A confirmation whose block is still in the best chain is untouched
+    assert events(kept)[-1] == ('confirm', 'confirmed')
+    assert stored(kept).block_height == 0
+
+
+def test_transaction_mined_again_moves_block(client, backend, tracker):
+    txid = submit(client, backend)
+    backend.mine([])
+    backend.mine([txid])
+    tracker.sync('signet')
+
+    backend.reorg(2)
+    backend.mine([])
+    backend.mine([])
+    block_hash = backend.mine([txid])
+    report = tracker.sync('signet')
+
+    assert report.confirmed == [(txid, 2, block_hash)]
+    tx = stored(txid)
+    assert (tx.status, tx.block_height, tx.block_hash) == ('confirmed', 2, block_hash)
+    assert events(txid)[-3:] == [('confirm', 'confirmed'), ('reorg', 'success'), ('confirm', 'confirmed')]
+
+
+def test_confirmations_are_applied_once(client, backend, tracker):
+    txid = submit(client, backend)
+    block_hash = backend.mine([txid])
+    tracker.db.save_confirmations('signet', [(txid, 0, block_hash)], 0, block_hash)
+    tracker.db.save_confirmations('signet', [(txid, 0, block_hash)], 0, block_hash)
+    assert TransactionEvent.query.filter_by(kind='confirm').count() == 1
+
+    # A stale revert naming another block does not undo the confirmation
+    tracker.db.save_confirmations('signet', [], 0, block_hash, reverted=[(txid, '00' * 32)])
+    assert stored(txid).status == 'confirmed'
@@ -0,0 +1,77 @@
+import queue
+
+import pytest
+
+from app import db, events
+from app.events import BrokerFull, EventBroker
+from app.models import DeletedTransaction
+from benchmarks.txgen import make_raw_tx
+
+
+def received(subscription):
+    messages = []
+    while True:
+        try:
+            messages.append(subscription.get_nowait())
+        except queue.Empty:
+            return messages
+
+
+def submit(client):
+    return client.post('/signet/transaction/submit', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+
+
+def failed(client, backend):
+    """A stored transaction whose push was rejected, so it can be deleted"""
+    backend.reject_with = 'bad-txns-inputs-missingorspent'
+    return client.post('/signet/api/transaction/push', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+
+
+def test_poller_publishes_changed_transactions(client):
+    broker = EventBroker()
+    subscription = broker.subscribe('signet')
+    other = broker.subscribe('mainchain')
+    txid = submit(client)
+
+    assert broker._poll_network('signet') == 1
+    [(event_type, data)] = received(subscription)
+    assert (event_type, data['txid'], data['status']) == ('transaction', txid, 'pending')
+    # Rows already sent are not sent again, other networks see nothing
+    assert broker._poll_network('signet') == 0
+    assert received(other) == []
+
+
+def test_deletions_reach_every_process(client, backend):
+    # The broker of another worker process only sees the database
+    broker = EventBroker()
+    subscription = broker.subscribe('signet')
+    txid = failed(client, backend)
+    broker._poll_network('signet')
+    received(subscription)
+
+    assert client.post(f'/signet/transaction/{txid}/delete').get_json()['status'] == 'success'
+    assert broker._poll_deletions('signet') == 1
+    assert received(subscription) == [('deleted', {'txid': txid})]
+    assert broker._poll_deletions('signet') == 0
+    assert DeletedTransaction.query.count() == 1
+
+
+def test_old_tombstones_are_dropped(client, backend):
+    db.session.add(DeletedTransaction(network='signet', txid='00' * 32,
+                                      deleted_at=events.datetime.utcnow() - 2 * events.TOMBSTONE_TTL))
+    db.session.commit()
+    txid = failed(client, backend)
+    client.post(f'/signet/transaction/{txid}/delete')
+    assert [row.txid for row in DeletedTransaction.query] == [txid]
+
+
+def test_full_broker_turns_streams_away(client, monkeypatch):
+    broker = EventBroker(max_subscribers=1)
+    broker.subscribe('signet')
+    with pytest.raises(BrokerFull):
+        broker.subscribe('mainchain')
+
+    monkeypatch.setattr('app.routes.broker', broker)
+    response = client.get('/signet/events')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(events.FULL_RETRY_AFTER)
@@ -0,0 +1,63 @@
+import pytest
+
+from app import db
+from app.models import Transaction
+from benchmarks.txgen import make_raw_tx
+from scripts.database import Database
+from scripts.evictions import EvictionWatcher
+
+
+@pytest.fixture
+def watcher(app):
+    return EvictionWatcher(Database(), grace_period=0)
+
+
+def push(client):
+    return client.post('/signet/api/transaction/push', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+
+
+def stored(txid):
+    db.session.expire_all()
+    return Transaction.get_by_txid_and_network(txid, 'signet')
+
+
+def test_evicted_transactions_are_due_again(client, backend, watcher):
+    evicted, mined, kept = push(client), push(client), push(client)
+    backend.evict([evicted])
+    backend.mine([mined])
+
+    report = watcher.check('signet')
+    assert (report.watched, report.missing) == (3, 2)
+    assert report.evicted == [evicted]
+    assert report.confirmed == [(mined, None, None)]
+
+    tx = stored(evicted)
+    assert (tx.status, tx.eviction_count) == ('pending', 1)
+    assert tx.next_attempt_at is not None and tx.evicted_at is not None
+    assert [event.kind for event in tx.events][-1] == 'evict'
+    assert stored(mined).status == 'confirmed'
+    assert stored(kept).status == 'success'
+
+    # Pushed again and evicted once more
+    client.post(f'/signet/transaction/{evicted}/push')
+    assert stored(evicted).status == 'success'
+    backend.evict([evicted])
+    assert watcher.check('signet').evicted == [evicted]
+    assert stored(evicted).eviction_count == 2
+
+
+def test_recent_acceptances_are_left_alone(client, backend, app):
+    txid = push(client)
+    backend.evict([txid])
+    assert EvictionWatcher(Database()).check('signet').watched == 0
+    assert stored(txid).status == 'success'
+
+
+def test_concurrent_push_wins(client, backend, app):
+    txid = push(client)
+    # A push moved the transaction on before the evictions were saved
+    stored(txid).status = 'failed'
+    db.session.commit()
+    Database().save_evictions('signet', [txid], [])
+    tx = stored(txid)
+    assert (tx.status, tx.eviction_count) == ('failed', 0)
@@ -0,0 +1,30 @@
+import gzip
+import json
+
+from benchmarks.txgen import make_raw_tx
+
+
+def submit(client, count):
+    return [client.post('/signet/transaction/submit', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+            for _ in range(count)]
+
+
+def test_export_streams_every_row(client):
+    txids = submit(client, 3)
+    response = client.get('/signet/api/transactions/export?fields=txid,status&limit=5000&cursor=bogus')
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert rows == [{'txid': txid, 'status': 'pending'} for txid in txids]
+
+
+def test_export_csv_gzip(client):
+    [txid] = submit(client, 1)
+    response = client.get('/signet/api/transactions/export?format=csv&fields=txid&compress=gzip')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).decode().split() == ['txid', txid]
+
+
+def test_export_rejects_unknown_fields(client):
+    response = client.get('/signet/api/transactions/export?fields=txid,nope')
+    assert response.status_code == 400
+    assert 'nope' in response.get_json()['error']
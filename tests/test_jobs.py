@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from app import db, jobs
+from app.jobs import claim_jobs, enqueue_push, process_job
+from app.models import PushJob, Transaction
+from app.validation import compute_txid
+from benchmarks.txgen import make_raw_tx
+from scripts import push_worker
+
+
+def store(network='signet'):
+    raw_tx = make_raw_tx()
+    tx = Transaction(raw_tx=raw_tx, txid=compute_txid(raw_tx), network=network)
+    db.session.add(tx)
+    db.session.commit()
+    return tx
+
+
+def test_enqueue_reuses_pending_job(app):
+    tx = store()
+    job = enqueue_push(tx)
+    assert enqueue_push(tx).id == job.id
+    assert PushJob.query.count() == 1
+
+
+def test_claimed_jobs_are_invisible_to_other_workers(app):
+    jobs = [enqueue_push(store()) for _ in range(3)]
+    first = claim_jobs('worker-1', limit=2)
+    assert [job.id for job in first] == [job.id for job in jobs[:2]]
+    assert all(job.status == 'running' and job.lease_owner == 'worker-1' for job in first)
+
+    second = claim_jobs('worker-2', limit=5)
+    assert [job.id for job in second] == [jobs[2].id]
+    assert claim_jobs('worker-3', limit=5) == []
+
+
+def test_expired_lease_is_claimed_again(app):
+    job = enqueue_push(store())
+    [claimed] = claim_jobs('worker-1')
+    assert claimed.attempts == 1
+
+    # The first worker died and its lease ran out
+    claimed.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    [reclaimed] = claim_jobs('worker-2')
+    assert reclaimed.id == job.id
+    assert reclaimed.lease_owner == 'worker-2'
+    assert reclaimed.attempts == 2
+
+
+def test_finishing_needs_the_lease(app, backend):
+    job = enqueue_push(store())
+    [claimed] = claim_jobs('worker-1')
+    claimed.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    claim_jobs('worker-2')
+
+    # The stale worker cannot overwrite the new owner's job
+    assert not process_job(claimed, 'worker-1')
+    db.session.refresh(claimed)
+    assert claimed.status == 'running'
+    assert claimed.lease_owner == 'worker-2'
+    assert len(backend.broadcasts) == 1
+
+
+def test_lease_expired_on_the_last_attempt_fails_the_job(app):
+    job = enqueue_push(store())
+    for attempt in range(2):
+        [claimed] = claim_jobs(f'worker-{attempt}', max_attempts=2)
+        claimed.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    assert claim_jobs('worker-2', max_attempts=2) == []
+    db.session.refresh(job)
+    assert (job.status, job.attempts, job.lease_owner) == ('failed', 2, None)
+    assert 'Lease expired' in job.result
+
+
+def test_concurrent_enqueue_reuses_the_stored_job(app, monkeypatch):
+    tx = store()
+    job = enqueue_push(tx)
+    # The lookup missed the job a concurrent request queued meanwhile
+    lookups = iter([None, job])
+    monkeypatch.setattr(jobs, '_active_job', lambda network, txid: next(lookups))
+    assert enqueue_push(tx).id == job.id
+    assert PushJob.query.count() == 1
+
+
+def test_worker_survives_a_failing_job(app, monkeypatch):
+    tx = store()
+    enqueue_push(tx)
+    enqueue_push(store())
+    calls = []
+
+    def flaky_process(job, worker_id, max_attempts):
+        calls.append(job.id)
+        if len(calls) == 1:
+            raise RuntimeError('database went away')
+        return process_job(job, worker_id, max_attempts)
+
+    monkeypatch.setattr(push_worker, 'create_app', lambda: app)
+    monkeypatch.setattr(push_worker, 'process_job', flaky_process)
+    push_worker.run_worker(concurrency=1, poll_interval=0, once=True)
+    # The first job is left running until its lease expires, the second one is done
+    assert [job.status for job in PushJob.query.order_by(PushJob.id)] == ['running', 'done']
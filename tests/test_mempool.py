@@ -0,0 +1,180 @@
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from app.mempool import (FakeMempoolBackend, MempoolClient, MempoolError, NotSent, PackageNotSupported,
+                         check_and_push, check_and_push_package, set_client_factory)
+from app.validation import compute_txid
+from benchmarks.txgen import make_raw_tx
+
+
+class NoPackageBackend(FakeMempoolBackend):
+    def __init__(self):
+        super().__init__()
+        self.package_calls = 0
+
+    def broadcast_package(self, raw_txs):
+        self.package_calls += 1
+        raise PackageNotSupported('no package endpoint')
+
+
+class RejectingBackend(NoPackageBackend):
+    """Rejects the broadcast of the given transactions only"""
+
+    def __init__(self, rejected):
+        super().__init__()
+        self.rejected = set(rejected)
+
+    def broadcast(self, raw_tx):
+        if compute_txid(raw_tx) in self.rejected:
+            self.broadcasts.append(raw_tx)
+            return False, 'min relay fee not met'
+        return super().broadcast(raw_tx)
+
+
+class FailingLookupBackend(FakeMempoolBackend):
+    """Fails the upstream lookup of the given transactions"""
+
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = set(failing)
+
+    def get_tx(self, txid):
+        if txid in self.failing:
+            raise MempoolError('lookup timed out')
+        return super().get_tx(txid)
+
+
+def make_chain(length):
+    """``(items, parents)`` of a chain of transactions, each spending the previous one"""
+    items, parents = [], {}
+    raw_tx = make_raw_tx()
+    for _ in range(length):
+        txid = compute_txid(raw_tx)
+        if items:
+            parents[txid] = [items[-1][0]]
+        items.append((txid, raw_tx))
+        raw_tx = make_raw_tx(prevouts=[(txid, 0)])
+    return items, parents
+
+
+def use(backend):
+    set_client_factory(lambda network: backend)
+    return backend
+
+
+@pytest.fixture(autouse=True)
+def restore_client_factory():
+    yield
+    set_client_factory(None)
+
+
+def test_package_is_sent_parents_first():
+    backend = use(FakeMempoolBackend())
+    items, parents = make_chain(3)
+    results = check_and_push_package('signet', items, parents)
+    assert [result[0] for result in results] == [txid for txid, _ in items]
+    assert all(result[1:] == ('success', result[0], True) for result in results)
+    assert backend.broadcasts == [raw_tx for _, raw_tx in items]
+
+
+def test_only_unknown_transactions_are_sent():
+    backend = use(FakeMempoolBackend())
+    items, parents = make_chain(3)
+    backend.add_tx(items[0][1])
+    results = check_and_push_package('signet', items, parents)
+    assert results[0][1:] == ('success', 'Transaction is already present in mempool', False)
+    assert backend.broadcasts == [raw_tx for _, raw_tx in items[1:]]
+
+
+def test_falls_back_to_one_by_one_in_order():
+    backend = use(NoPackageBackend())
+    items, parents = make_chain(3)
+    results = check_and_push_package('signet', items, parents)
+    assert [status for _, status, _, _ in results] == ['success'] * 3
+    assert backend.broadcasts == [raw_tx for _, raw_tx in items]
+
+    # The missing endpoint is remembered for the network
+    check_and_push_package('signet', *make_chain(2))
+    assert backend.package_calls == 1
+
+
+def test_children_of_a_rejected_parent_are_not_sent():
+    items, parents = make_chain(3)
+    backend = use(RejectingBackend([items[0][0]]))
+    results = check_and_push_package('signet', items, parents)
+    assert results[0][1:] == ('failed', 'min relay fee not met', True)
+    assert [result[1] for result in results[1:]] == ['failed', 'failed']
+    assert not any(result[3] for result in results[1:])
+    assert backend.broadcasts == [items[0][1]]
+
+
+def test_children_of_an_unchecked_parent_are_held_back():
+    items, parents = make_chain(3)
+    backend = use(FailingLookupBackend([items[0][0]]))
+    results = check_and_push_package('signet', items, parents)
+    assert [(status, attempted) for _, status, _, attempted in results] == [('error', False)] * 3
+    assert results[1][2] == f'Parent transaction {items[0][0]} could not be checked'
+    assert backend.broadcasts == []
+
+
+def test_check_and_push_lookup_failure_is_not_sent():
+    backend = use(FakeMempoolBackend())
+    backend.fail_with = 'connection refused'
+    with pytest.raises(NotSent):
+        check_and_push('signet', '00' * 32, make_raw_tx())
+
+
+class ScriptedSession:
+    """Session answering each request with the next response or exception"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code, response._content = outcome, b'error'
+        return response
+
+
+def scripted_client(*outcomes):
+    client = MempoolClient('http://mempool.invalid', retries=3, backoff=0)
+    client.session = ScriptedSession(*outcomes)
+    return client
+
+
+def refused():
+    return requests.exceptions.ConnectionError(MaxRetryError(
+        None, '/api/tx', NewConnectionError(None, 'refused')))
+
+
+@pytest.mark.parametrize('outcome', [502, requests.exceptions.ConnectionError('reset'),
+                                     requests.exceptions.ReadTimeout('slow')])
+def test_broadcast_is_not_retried_once_sent(outcome):
+    client = scripted_client(outcome, 200)
+    with pytest.raises(MempoolError) as error:
+        client.broadcast(make_raw_tx())
+    assert not isinstance(error.value, NotSent)
+    assert client.session.calls == 1
+
+
+def test_broadcast_is_retried_while_never_connected():
+    client = scripted_client(refused(), refused(), 200)
+    assert client.broadcast(make_raw_tx())[0]
+    assert client.session.calls == 3
+
+    client = scripted_client(refused(), 502, 200)
+    with pytest.raises(MempoolError):
+        client.broadcast_package([make_raw_tx()])
+    assert client.session.calls == 2
+
+
+def test_lookups_are_retried_after_5xx():
+    client = scripted_client(502, requests.exceptions.ConnectionError('reset'), 404)
+    assert client.get_tx('00' * 32) is None
+    assert client.session.calls == 3
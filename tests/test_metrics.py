@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import metrics
+from app.metrics import Counter, Gauge, Histogram, Registry, read_snapshots, write_snapshot
+
+
+@pytest.fixture
+def registry():
+    registry = Registry()
+    Counter('requests_total', 'Requests', ('route',), registry=registry)
+    Histogram('latency_seconds', 'Latency', registry=registry, buckets=(1,))
+    Gauge('in_flight', 'Requests in flight', registry=registry)
+    Gauge('queue_depth', 'Jobs', registry=registry, function=lambda: 7, multiprocess='local')
+    return registry
+
+
+def metric(registry, name):
+    return next(metric for metric in registry.metrics() if metric.name == name)
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def other_process(directory, pid, requests, in_flight):
+    with open(os.path.join(directory, f'{pid}.json'), 'w') as f:
+        json.dump({'pid': pid, 'metrics': {
+            'requests_total': [[['/'], requests]],
+            'latency_seconds': [[[], [[requests, 0], 0.5 * requests]]],
+            'in_flight': [[[], in_flight]],
+        }}, f)
+
+
+def test_workers_are_added_up(registry, tmp_path):
+    metric(registry, 'requests_total').inc(route='/')
+    metric(registry, 'latency_seconds').observe(2)
+    metric(registry, 'in_flight').set(1)
+    write_snapshot(str(tmp_path), registry)
+    other_process(str(tmp_path), os.getppid(), requests=4, in_flight=3)
+
+    text = registry.render(read_snapshots(str(tmp_path), registry))
+    assert 'requests_total{route="/"} 5' in text
+    assert 'latency_seconds_bucket{le="1.0"} 4' in text
+    assert 'latency_seconds_count 5' in text
+    # Process state is reported per worker, database state once
+    assert f'in_flight{{pid="{os.getpid()}"}} 1' in text
+    assert f'in_flight{{pid="{os.getppid()}"}} 3' in text
+    assert text.count('queue_depth') == 3
+
+
+def test_exited_workers_keep_their_counts(registry, tmp_path):
+    directory = str(tmp_path)
+    for pid in (exited_pid(), exited_pid()):
+        other_process(directory, pid, requests=2, in_flight=1)
+
+    for _ in range(2):
+        merged = read_snapshots(directory, registry)
+        assert merged['requests_total'] == {('/',): 4}
+        assert 'in_flight' not in merged
+    assert sorted(os.listdir(directory)) == ['.lock', 'archive.json']
+
+
+def test_metrics_route_aggregates_with_a_directory(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, '_flusher_pid', os.getpid())
+    client.get('/signet/api/transactions')
+    response = client.get('/metrics')
+    assert f'pid="{os.getpid()}"' in response.get_data(as_text=True)
+    assert os.path.exists(tmp_path / f'{os.getpid()}.json')
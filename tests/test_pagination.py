@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from app import db
+from app.models import Transaction
+from benchmarks.txgen import make_raw_tx
+
+
+def submit(client, count):
+    return [client.post('/signet/transaction/submit', json={'raw_tx': make_raw_tx()}).get_json()['txid']
+            for _ in range(count)]
+
+
+def test_cursor_walks_every_row_once(client):
+    txids = submit(client, 5)
+    # Rows created in the same instant are told apart by their id
+    Transaction.query.update({'created_at': datetime(2024, 1, 1)})
+    db.session.commit()
+
+    seen, url = [], '/signet/api/transactions?limit=2&fields=txid'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.append([tx['txid'] for tx in response.get_json()])
+        link = response.headers.get('Link')
+        url = link[1:link.index('>')] if link else None
+        if url:
+            assert 'limit=2' in url and 'fields=txid' in url
+            assert f"cursor={response.headers['X-Next-Cursor']}" in url
+    assert seen == [txids[4:2:-1], txids[2:0:-1], txids[:1]]
+
+
+def test_fields_are_projected(client):
+    submit(client, 1)
+    [tx] = client.get('/signet/api/transactions?fields=txid,status').get_json()
+    assert set(tx) == {'txid', 'status'}
+
+
+def test_invalid_paging_arguments(client):
+    for query in ('limit=0', 'limit=x', 'cursor=bogus', 'fields=txid,nope', 'sort=size'):
+        response = client.get(f'/signet/api/transactions?{query}')
+        assert response.status_code == 400, query
@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+from app import ratelimit
+from app.metrics import RATE_LIMIT_ERRORS
+from app.ratelimit import LocalBuckets, RateLimiter, SQLiteBuckets
+from benchmarks.txgen import make_raw_tx
+
+
+@pytest.fixture(params=['local', 'sqlite'])
+def buckets(request, tmp_path):
+    if request.param == 'local':
+        return LocalBuckets()
+    return SQLiteBuckets(str(tmp_path / 'ratelimit.db'))
+
+
+def test_burst_then_refill(buckets):
+    key = ('signet', '10.0.0.1')
+    for _ in range(5):
+        assert buckets.take(key, rate=2, burst=5, now=100.0) == 0
+    assert buckets.take(key, rate=2, burst=5, now=100.0) == pytest.approx(0.5)
+
+    # Two tokens a second
+    assert buckets.take(key, rate=2, burst=5, now=100.5) == 0
+    assert buckets.take(key, rate=2, burst=5, now=100.5) > 0
+
+    # Idle buckets refill up to the burst only
+    for _ in range(5):
+        assert buckets.take(key, rate=2, burst=5, now=1000.0) == 0
+    assert buckets.take(key, rate=2, burst=5, now=1000.0) > 0
+
+
+def test_buckets_are_per_client_and_network(buckets):
+    assert buckets.take(('signet', 'a'), rate=1, burst=1, now=0.0) == 0
+    assert buckets.take(('signet', 'a'), rate=1, burst=1, now=0.0) > 0
+    assert buckets.take(('signet', 'b'), rate=1, burst=1, now=0.0) == 0
+    assert buckets.take(('mainchain', 'a'), rate=1, burst=1, now=0.0) == 0
+
+
+def test_cost_above_burst_leaves_debt(buckets):
+    key = ('signet', 'batch')
+    assert buckets.take(key, rate=1, burst=5, cost=10, now=0.0) == 0
+    # 5 tokens of debt plus the one needed
+    assert buckets.take(key, rate=1, burst=5, now=0.0) == pytest.approx(6)
+    assert buckets.take(key, rate=1, burst=5, now=6.0) == 0
+
+
+def test_local_buckets_forget_least_recently_used():
+    buckets = LocalBuckets(maxsize=2)
+    limiter = RateLimiter(rate=1, burst=1, buckets=buckets)
+    assert limiter.check('signet', 'a') == 0
+    assert limiter.check('signet', 'b') == 0
+    assert limiter.check('signet', 'c') == 0
+    # 'a' was dropped with a full bucket
+    assert limiter.check('signet', 'a') == 0
+    assert limiter.check('signet', 'a') > 0
+
+
+def test_batch_is_charged_per_transaction(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'RATE', 0.001)
+    monkeypatch.setattr(ratelimit, 'BURST', 5)
+    monkeypatch.setattr(ratelimit, '_limiter', None)
+
+    batch = {'raw_txs': [make_raw_tx() for _ in range(3)]}
+    assert client.post('/signet/api/transactions/batch', json=batch).status_code == 200
+    response = client.post('/signet/api/transactions/batch', json=batch)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    # A single submission still fits in the bucket
+    assert client.post('/signet/transaction/submit', json={'raw_tx': make_raw_tx()}).status_code == 201
+
+
+def test_locked_store_admits_the_request(tmp_path):
+    path = str(tmp_path / 'ratelimit.db')
+    buckets = SQLiteBuckets(path)
+    buckets._connection().execute('PRAGMA busy_timeout = 0')
+    locker = sqlite3.connect(path, isolation_level=None)
+    locker.execute('BEGIN IMMEDIATE')
+    before = RATE_LIMIT_ERRORS._values.get(('signet',), 0)
+
+    for _ in range(3):
+        assert buckets.take(('signet', 'a'), rate=1, burst=1) == 0
+    assert RATE_LIMIT_ERRORS._values[('signet',)] == before + 3
+
+    locker.execute('ROLLBACK')
+    assert buckets.take(('signet', 'a'), rate=1, burst=1) == 0
+    assert buckets.take(('signet', 'a'), rate=1, burst=1) > 0
@@ -0,0 +1,72 @@
+from app.models import Transaction
+from benchmarks.txgen import make_raw_tx
+
+
+def test_push_stores_and_broadcasts(client, backend):
+    raw_tx = make_raw_tx()
+    response = client.post('/signet/api/transaction/push', json={'raw_tx': raw_tx})
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['status'] == 'success'
+    assert data['push_attempts'] == 1
+    assert backend.broadcasts == [raw_tx]
+    assert Transaction.get_by_txid_and_network(data['txid'], 'signet').status == 'success'
+
+
+def test_push_rejected(client, backend):
+    backend.reject_with = 'bad-txns-inputs-missingorspent'
+    response = client.post('/signet/api/transaction/push', json={'raw_tx': make_raw_tx()})
+    data = response.get_json()
+    assert data['status'] == 'failed'
+    assert data['analysis_result'] == 'bad-txns-inputs-missingorspent'
+    assert data['failure_class'] == 'retryable'
+
+
+def test_stored_push_checks_upstream_first(client, backend):
+    raw_tx = make_raw_tx()
+    txid = client.post('/signet/transaction/submit', json={'raw_tx': raw_tx}).get_json()['txid']
+    backend.add_tx(raw_tx)
+    data = client.post(f'/signet/transaction/{txid}/push').get_json()
+    assert data['status'] == 'success'
+    assert data['analysis_result'] == 'Transaction is already present in mempool'
+    assert backend.broadcasts == []
+
+
+def test_submit_raw_tx(client):
+    raw_tx = make_raw_tx(segwit=True)
+    response = client.post('/signet/transaction/submit', json={'raw_tx': raw_tx})
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['status'] == 'pending'
+    assert Transaction.get_by_txid_and_network(data['txid'], 'signet').raw_tx == raw_tx
+
+    # Submitting it again returns the stored row
+    again = client.post('/signet/transaction/submit', json={'raw_tx': raw_tx})
+    assert again.status_code == 200
+    assert again.get_json()['id'] == data['id']
+
+
+def test_submit_txid_fetches_hex(client, backend):
+    raw_tx = make_raw_tx()
+    txid = backend.add_tx(raw_tx)
+    response = client.post('/signet/transaction/submit', json={'txid': txid})
+    assert response.status_code == 201
+    assert Transaction.get_by_txid_and_network(txid, 'signet').raw_tx == raw_tx
+
+
+def test_submit_unknown_txid(client):
+    response = client.post('/signet/transaction/submit', json={'txid': '00' * 32})
+    assert response.status_code == 404
+
+
+def test_invalid_hex(client, backend):
+    for path in ('/signet/transaction/submit', '/signet/api/transaction/push'):
+        response = client.post(path, json={'raw_tx': 'not hex'})
+        assert response.status_code == 400
+    assert Transaction.query.count() == 0
+    assert backend.broadcasts == []
+
+
+def test_unknown_network(client):
+    response = client.post('/nope/api/transaction/push', json={'raw_tx': make_raw_tx()})
+    assert response.status_code == 404
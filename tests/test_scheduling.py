@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from app import scheduling
+from app.models import Transaction
+from app.scheduling import RETRYABLE, TERMINAL, apply_schedule, backoff_delay, classify_failure, schedule
+
+NOW = datetime(2026, 1, 1)
+
+
+def test_classify_failure():
+    assert classify_failure('success', 'Transaction pushed successfully') is None
+    assert classify_failure('confirmed', None) is None
+    assert classify_failure('error', 'connection refused') == RETRYABLE
+    assert classify_failure('failed', 'sendrawtransaction RPC error: txn-mempool-conflict') == TERMINAL
+    assert classify_failure('failed', 'bad-txns-in-belowout') == TERMINAL
+    assert classify_failure('failed', 'dust') == TERMINAL
+    # Inputs may still show up, a parent may be pushed later
+    assert classify_failure('failed', 'bad-txns-inputs-missingorspent') == RETRYABLE
+    assert classify_failure('failed', 'min relay fee not met') == RETRYABLE
+
+
+def test_backoff_doubles_up_to_the_maximum(monkeypatch):
+    monkeypatch.setattr(scheduling, 'BACKOFF_BASE', 100)
+    monkeypatch.setattr(scheduling, 'BACKOFF_MAX', 1000)
+    for attempts, delay in ((0, 100), (1, 100), (2, 200), (3, 400), (4, 800), (5, 1000), (30, 1000)):
+        for _ in range(20):
+            assert delay / 2 <= backoff_delay(attempts) <= delay
+
+
+def test_schedule(monkeypatch):
+    monkeypatch.setattr(scheduling, 'BACKOFF_BASE', 100)
+    monkeypatch.setattr(scheduling, 'MAX_ATTEMPTS', 5)
+    monkeypatch.setattr(scheduling, 'RECHECK_INTERVAL', 0)
+    assert schedule('pending', None, 0, NOW) == (NOW, None)
+    assert schedule('confirmed', None, 1, NOW) == (None, None)
+    assert schedule('success', 'ok', 1, NOW) == (None, None)
+    assert schedule('failed', 'txn-mempool-conflict', 1, NOW) == (None, TERMINAL)
+
+    next_attempt_at, failure_class = schedule('failed', 'min relay fee not met', 2, NOW)
+    assert failure_class == RETRYABLE
+    assert NOW + timedelta(seconds=100) <= next_attempt_at <= NOW + timedelta(seconds=200)
+
+    # Parked once the attempts run out, whatever the reason
+    assert schedule('error', 'connection refused', 5, NOW) == (None, TERMINAL)
+
+
+def test_schedule_rechecks_accepted_transactions(monkeypatch):
+    monkeypatch.setattr(scheduling, 'RECHECK_INTERVAL', 600)
+    assert schedule('success', 'ok', 1, NOW) == (NOW + timedelta(seconds=600), None)
+
+
+def test_apply_schedule():
+    tx = Transaction(txid='00' * 32, network='signet', status='failed',
+                     analysis_result='non-mandatory-script-verify-flag', push_attempts=1)
+    apply_schedule(tx, NOW)
+    assert (tx.next_attempt_at, tx.failure_class) == (None, TERMINAL)
+
+    tx.status, tx.analysis_result = 'error', 'connection refused'
+    apply_schedule(tx, NOW)
+    assert tx.failure_class == RETRYABLE
+    assert tx.next_attempt_at > NOW
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import HourlyStats, RollupCheckpoint, Transaction, TransactionEvent
+from app.stats import get_timeseries, rollup_stats
+from benchmarks.txgen import make_raw_tx
+
+HOUR = datetime(2026, 1, 1, 12)
+
+
+def age_events(offset):
+    """Move every event (and transaction) back by ``offset``, out of the rollup lag"""
+    for event in TransactionEvent.query:
+        event.created_at -= offset
+    for tx in Transaction.query:
+        tx.created_at -= offset
+    db.session.commit()
+
+
+def test_rollup_counts_every_event_once(client, backend):
+    for _ in range(3):
+        client.post('/signet/api/transaction/push', json={'raw_tx': make_raw_tx()})
+    backend.reject_with = 'min relay fee not met'
+    client.post('/signet/api/transaction/push', json={'raw_tx': make_raw_tx()})
+
+    # Too recent: they may still be joined by writes that took lower ids
+    assert rollup_stats() == 0
+    age_events(timedelta(hours=2))
+    assert rollup_stats() == 8
+    assert rollup_stats() == 0
+
+    [row] = HourlyStats.query.all()
+    assert (row.submitted, row.accepted, row.failed, row.errors) == (4, 3, 1, 0)
+    assert db.session.get(RollupCheckpoint, 'signet').last_event_id == 8
+
+
+def test_rollup_adds_to_existing_hours(app):
+    raw_tx = make_raw_tx()
+    tx = Transaction(raw_tx=raw_tx, txid='11' * 32, network='signet', created_at=HOUR)
+    db.session.add(tx)
+    db.session.commit()
+    TransactionEvent.query.update({'created_at': HOUR})
+    db.session.commit()
+    assert rollup_stats('signet') == 1
+
+    db.session.add(TransactionEvent(transaction=tx, kind='push', status='failed', created_at=HOUR))
+    db.session.add(TransactionEvent(transaction=tx, kind='push', status='success', created_at=HOUR))
+    db.session.add(TransactionEvent(transaction=tx, kind='confirm', status='confirmed',
+                                    created_at=HOUR + timedelta(minutes=30)))
+    db.session.commit()
+    assert rollup_stats('signet') == 3
+
+    [point] = get_timeseries('signet', HOUR, HOUR + timedelta(hours=1))
+    assert (point['submitted'], point['accepted'], point['failed'], point['confirmed']) == (1, 1, 1, 1)
+    assert point['failure_rate'] == 0.5
+    assert point['avg_confirmation_seconds'] == 1800
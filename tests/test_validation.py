@@ -0,0 +1,53 @@
+import pytest
+
+from app.validation import InvalidHex, InvalidTransaction, analyze_raw_tx, compute_txid, decode_raw_tx, is_hex
+from benchmarks.txgen import make_raw_tx
+
+# Coinbase transaction of the genesis block
+GENESIS_TX = ('01000000010000000000000000000000000000000000000000000000000000000000000000ffffffff4d04ffff001d0104455468'
+              '652054696d65732030332f4a616e2f32303039204368616e63656c6c6f72206f6e206272696e6b206f66207365636f6e6420'
+              '6261696c6f757420666f722062616e6b73ffffffff0100f2052a01000000434104678afdb0fe5548271967f1a67130b7105cd6'
+              'a828e03909a67962e0ea1f61deb649f6bc3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac00000000')
+
+
+def test_known_txid():
+    assert compute_txid(GENESIS_TX) == '4a5e1e4baab89f3a32518a88c31bc87f618f76673e2cc77ab2127b7afdeda33b'
+
+
+@pytest.mark.parametrize('segwit', [False, True])
+def test_matches_bitcoinlib(segwit):
+    raw_tx = make_raw_tx(inputs=2, outputs=3, segwit=segwit)
+    summary = decode_raw_tx(raw_tx)
+    analysis = analyze_raw_tx(raw_tx)
+    assert summary.txid == compute_txid(raw_tx) == analysis['txid']
+    assert (summary.size, summary.vsize) == (analysis['size'], analysis['vsize'])
+    assert summary.segwit == segwit
+    assert (summary.txid == summary.wtxid) == (not segwit)
+
+
+@pytest.mark.parametrize('raw_tx', ['', 'zz', 'abc', None])
+def test_invalid_hex(raw_tx):
+    with pytest.raises(InvalidHex):
+        compute_txid(raw_tx)
+    assert not is_hex(raw_tx)
+
+
+@pytest.mark.parametrize('raw_tx', [
+    GENESIS_TX[:-8],                                  # truncated
+    GENESIS_TX + '00',                                # trailing data
+    GENESIS_TX[:8] + '00' + GENESIS_TX[10:],          # no inputs
+    GENESIS_TX[:8] + '0002' + GENESIS_TX[8:],         # unknown segwit flag
+])
+def test_malformed_serialization(raw_tx):
+    with pytest.raises(InvalidTransaction) as error:
+        compute_txid(raw_tx)
+    assert not isinstance(error.value, InvalidHex)
+
+
+def test_submit_rejects_invalid_transactions(client):
+    invalid_hex = client.post('/signet/transaction/submit', json={'raw_tx': 'not hex'})
+    assert invalid_hex.status_code == 400
+    assert 'hexadecimal' in invalid_hex.get_json()['error']
+    truncated = client.post('/signet/transaction/submit', json={'raw_tx': GENESIS_TX[:-8]})
+    assert truncated.status_code == 400
+    assert truncated.get_json()['error'].startswith('Invalid transaction format')
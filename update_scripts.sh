@@ -4,6 +4,6 @@ cd /opt/mempush
 
 . ./venv/bin/activate
 date > log.txt
-python scripts/push_transactions.py --base-url https://mempush.com 2>&1 >> log.txt
+python scripts/push_transactions.py 2>&1 >> log.txt
 date >> log.txt
 deactivate